@@ -0,0 +1,355 @@
+"""
+Prueba de carga de la API del chat (/api/v1/chat/ask)
+
+Envía una mezcla realista de preguntas en español (sugerencias del motor,
+preguntas frecuentes y consultas sobre productos del catálogo) con N hilos
+concurrentes, por dos vías:
+
+- ``inproc``: ``chat_bp`` dentro de este proceso con el cliente de pruebas de
+  Flask (mide el pipeline sin red ni servidor HTTP).
+- ``http``: un servidor local levantado en un subproceso (Flask con hilos o
+  aiohttp, como ``bench_serving.py``) o el que indique ``--url``.
+
+Reporta solicitudes por segundo y latencias p50/p95/p99, en total y separadas
+en aciertos y fallos de cache según la cabecera ``X-Cache``. Con ``--output``
+guarda los resultados en JSON y con ``--compare`` muestra la diferencia
+contra una corrida anterior.
+
+El rate limiting se desactiva (salvo contra ``--url``, que debe estar
+configurado aparte) para medir el procesamiento y no el cupo por cliente.
+
+Uso:
+    python benchmarks/bench_chat_api.py [--modes inproc http] [--concurrency 1 8 32]
+        [--requests 2000] [--unique-ratio 0.2] [--output run.json] [--compare base.json]
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Antes de importar la configuración: sin cupo por cliente ni modelo de embeddings
+os.environ.setdefault('REQUESTS_PER_MINUTE', str(10 ** 9))
+os.environ.setdefault('EMBEDDING_BACKEND', 'none')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import bench_serving  # noqa: E402
+
+ASK_PATH = '/api/v1/chat/ask'
+
+PRODUCT_TEMPLATES = [
+    "¿Cuánto cuesta {nombre}?",
+    "¿Tienen {nombre} en talla M?",
+    "Quiero información sobre {nombre}",
+    "¿De qué colores viene {nombre}?",
+]
+
+
+def build_question_mix(engine, size: int, unique_ratio: float, seed: int) -> List[str]:
+    """
+    Preguntas a enviar: repetidas de un conjunto realista más una fracción únicas
+
+    Las únicas llevan una referencia aleatoria, así nunca están en cache y
+    recorren el pipeline completo.
+    """
+    snapshot = engine.snapshot
+    pool = [suggestion['text'] for suggestion in engine.suggestions]
+    pool += [faq.pregunta for faq in snapshot.faq_retriever.faqs]
+    pool += [template.format(nombre=product.nombre.lower())
+             for product in snapshot.product_index.products for template in PRODUCT_TEMPLATES]
+
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(size):
+        question = rng.choice(pool)
+        if rng.random() < unique_ratio:
+            question = f"{question} (ref {rng.getrandbits(40):010x})"
+        questions.append(question)
+    return questions
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Latencias en milisegundos"""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {'count': 0}
+    return {
+        'count': len(ordered),
+        'mean': round(sum(ordered) / len(ordered) * 1000, 3),
+        'p50': round(percentile(ordered, 50) * 1000, 3),
+        'p95': round(percentile(ordered, 95) * 1000, 3),
+        'p99': round(percentile(ordered, 99) * 1000, 3),
+        'max': round(ordered[-1] * 1000, 3)
+    }
+
+
+class InProcessClient:
+    """Cliente de pruebas de Flask sobre ``chat_bp``; uno por hilo"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def ask(self, question: str) -> Tuple[int, Optional[str]]:
+        response = self.client.post(ASK_PATH, json={"question": question})
+        response.get_data()
+        return response.status_code, response.headers.get('X-Cache')
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPClient:
+    """Conexión HTTP/1.1 reutilizada mientras el servidor la mantenga abierta; una por hilo"""
+
+    def __init__(self, base_url: str):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip('/')
+        self.connection: Optional[http.client.HTTPConnection] = None
+
+    def ask(self, question: str) -> Tuple[int, Optional[str]]:
+        body = json.dumps({"question": question}).encode('utf-8')
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request('POST', self.prefix + ASK_PATH, body=body,
+                                        headers={'Content-Type': 'application/json'})
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, response.getheader('X-Cache')
+            except (http.client.HTTPException, OSError):
+                # Conexión cerrada por el servidor entre solicitudes: reintentar una vez
+                self.close()
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def run_load(make_client, questions: List[str], concurrency: int) -> Dict[str, Any]:
+    """Envía todas las preguntas con ``concurrency`` hilos y resume los resultados"""
+    lock = threading.Lock()
+    next_index = 0
+    samples: List[Tuple[float, int, Optional[str]]] = []
+    errors = 0
+
+    def worker():
+        nonlocal next_index, errors
+        client = make_client()
+        local = []
+        try:
+            while True:
+                with lock:
+                    index = next_index
+                    next_index += 1
+                if index >= len(questions):
+                    break
+                start = time.perf_counter()
+                try:
+                    status, cache = client.ask(questions[index])
+                except Exception:
+                    with lock:
+                        errors += 1
+                    continue
+                local.append((time.perf_counter() - start, status, cache))
+        finally:
+            client.close()
+            with lock:
+                samples.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for _ in range(concurrency):
+            executor.submit(worker)
+    elapsed = time.perf_counter() - start
+
+    statuses: Dict[str, int] = {}
+    for _, status, _ in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    ok = [sample for sample in samples if sample[1] == 200]
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(samples),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'rps': round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        'status': statuses,
+        'latency_ms': {
+            'all': summarize([latency for latency, _, _ in ok]),
+            'hit': summarize([latency for latency, _, cache in ok if cache == 'HIT']),
+            'miss': summarize([latency for latency, _, cache in ok if cache != 'HIT'])
+        }
+    }
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _print_row(label: str, result: Dict[str, Any]) -> None:
+    for kind in ('all', 'hit', 'miss'):
+        stats = result['latency_ms'][kind]
+        if not stats.get('count'):
+            continue
+        rps = f"{result['rps']:>9.0f}" if kind == 'all' else f"{'':>9}"
+        print(f"{label if kind == 'all' else '':<14}{result['concurrency'] if kind == 'all' else '':>5}"
+              f"{rps}  {kind:<5}{stats['count']:>7}{stats['p50']:>9.2f}{stats['p95']:>9.2f}"
+              f"{stats['p99']:>9.2f}{stats['max']:>9.2f}")
+    failed = {status: count for status, count in result['status'].items() if status != '200'}
+    if failed or result['errors']:
+        print(f"{'':<19}  no-200: {failed}  errores de conexión: {result['errors']}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Diferencia porcentual de req/s y p50/p95/p99 contra una corrida anterior"""
+    print(f"\nComparación con {baseline['meta'].get('commit') or 'la corrida base'} "
+          f"({baseline['meta'].get('timestamp', '?')})")
+    print(f"{'modo':<14}{'conc':>5}  {'métrica':<10}{'base':>10}{'actual':>10}{'cambio':>9}")
+
+    base_runs = {(run['mode'], run['concurrency']): run for run in baseline['runs']}
+    for run in current['runs']:
+        base = base_runs.get((run['mode'], run['concurrency']))
+        if base is None:
+            continue
+        rows = [('req/s', base['rps'], run['rps'])]
+        for kind in ('hit', 'miss'):
+            for metric in ('p50', 'p95', 'p99'):
+                before = base['latency_ms'][kind].get(metric)
+                after = run['latency_ms'][kind].get(metric)
+                if before is not None and after is not None:
+                    rows.append((f"{kind} {metric}", before, after))
+        for metric, before, after in rows:
+            change = f"{(after - before) / before * 100:>+8.1f}%" if before else f"{'n/a':>9}"
+            print(f"{run['mode']:<14}{run['concurrency']:>5}  {metric:<10}{before:>10.2f}{after:>10.2f}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['inproc', 'http'], choices=['inproc', 'http'])
+    parser.add_argument('--server', default='flask', choices=['flask', 'async'],
+                        help="servidor local para el modo http")
+    parser.add_argument('--url', help="servidor ya levantado para el modo http (ej. http://127.0.0.1:5000)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=2000, help="solicitudes por nivel de concurrencia")
+    parser.add_argument('--unique-ratio', type=float, default=0.2,
+                        help="fracción de preguntas únicas (siempre fallos de cache)")
+    parser.add_argument('--warmup', type=int, default=200, help="solicitudes previas no medidas")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="archivo JSON donde guardar los resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    from flask import Flask
+    from src.api.chat_handlers import chat_engine
+    from src.api.chat_routes import chat_bp, metrics_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(chat_bp)
+    app.register_blueprint(metrics_bp)
+
+    # Cada nivel usa su propia mezcla: las preguntas únicas de uno no quedan en cache para el siguiente
+    mixes = {
+        concurrency: build_question_mix(chat_engine, args.requests, args.unique_ratio, args.seed + concurrency)
+        for concurrency in args.concurrency
+    }
+    warmup = build_question_mix(chat_engine, args.warmup, 0.0, args.seed)
+    sample = mixes[args.concurrency[0]]
+    print(f"Mezcla: {len(set(sample))} preguntas distintas en {len(sample)} solicitudes "
+          f"({args.unique_ratio:.0%} únicas)\n")
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'requests': args.requests,
+            'unique_ratio': args.unique_ratio,
+            'seed': args.seed,
+            'server': args.server if not args.url else args.url
+        },
+        'runs': []
+    }
+
+    print(f"{'modo':<14}{'conc':>5}{'req/s':>9}  {'tipo':<5}{'n':>7}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'p99 ms':>9}{'max ms':>9}")
+
+    for mode in args.modes:
+        server = None
+        if mode == 'inproc':
+            label = 'inproc'
+            make_client = lambda: InProcessClient(app)  # noqa: E731
+        else:
+            base_url = args.url
+            if base_url is None:
+                port = bench_serving._free_port()
+                server = subprocess.Popen(
+                    [sys.executable, bench_serving.__file__, '--serve', args.server, '--port', str(port)],
+                    cwd=ROOT, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+                bench_serving._wait_ready(port)
+                base_url = f'http://127.0.0.1:{port}'
+            label = f'http-{args.server}' if not args.url else 'http'
+            make_client = lambda: HTTPClient(base_url)  # noqa: E731
+
+        try:
+            run_load(make_client, warmup, max(args.concurrency))
+            for concurrency in args.concurrency:
+                result = run_load(make_client, mixes[concurrency], concurrency)
+                result['mode'] = label
+                results['runs'].append(result)
+                _print_row(label, result)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+"""
+Benchmark del endpoint heredado /api/chat (app_optimized.py y fashion_store_complete.py)
+
+Compara, dentro de este proceso y con el cliente de pruebas de Flask:
+
+- ``before``: el handler anterior, que reconstruía el diccionario de temas en
+  cada solicitud, recorría las palabras clave con búsquedas anidadas y
+  serializaba la respuesta con ``jsonify`` (reproducido aquí como referencia).
+- ``keywords``: ``app_optimized.app`` con el respondedor compilado.
+- ``engine``: el mismo servidor delegando en ``ChatEngine`` (cache e índices
+  de /api/v1/chat/ask).
+
+Con ``--url`` carga además un servidor ya levantado (por ejemplo, una copia
+del repositorio en otro commit). ``--output`` y ``--compare`` funcionan como
+en ``bench_chat_api.py``.
+
+Uso:
+    python benchmarks/bench_legacy_chat.py [--modes before keywords engine] [--concurrency 1 8]
+        [--requests 5000] [--url http://127.0.0.1:5000] [--output run.json] [--compare base.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.setdefault('EMBEDDING_BACKEND', 'none')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import bench_chat_api  # noqa: E402
+
+CHAT_PATH = '/api/chat'
+
+# Mensajes como los que envían los widgets de chat de la tienda
+MESSAGES = [
+    "hola",
+    "buenas tardes",
+    "¿qué venden?",
+    "quiero ver el catálogo de ropa",
+    "¿qué talla me queda?",
+    "¿tienen ofertas esta semana?",
+    "¿cuál es el precio de la casaca de cuero?",
+    "¿cuánto tarda el envío a provincia?",
+    "¿a qué hora abren?",
+    "quiero hacer una devolución",
+    "¿dónde está la tienda?",
+    "¿aceptan pago con tarjeta?",
+    "¿puedo pagar en cuotas?",
+    "necesito ayuda con mi pedido",
+]
+
+
+def build_message_mix(size: int, unique_ratio: float, seed: int) -> List[str]:
+    """Mensajes repetidos más una fracción únicos (fallos de cache en modo engine)"""
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(size):
+        message = rng.choice(MESSAGES)
+        if rng.random() < unique_ratio:
+            message = f"{message} (ref {rng.getrandbits(40):010x})"
+        messages.append(message)
+    return messages
+
+
+def legacy_chat_view():
+    """Handler de /api/chat anterior al respondedor compilado (reproducido como referencia)"""
+    import datetime
+    import app_optimized
+    from flask import jsonify, request
+    from src.core.legacy_responder import LEGACY_FALLBACK, LEGACY_TOPICS
+
+    def get_intelligent_response(message):
+        # El literal original: un diccionario nuevo con todos los temas por solicitud
+        responses = {
+            topic: {"keywords": list(keywords), "response": text}
+            for topic, (keywords, text) in LEGACY_TOPICS.items()
+        }
+        for category, info in responses.items():
+            for keyword in info["keywords"]:
+                if keyword in message:
+                    return info["response"]
+        return LEGACY_FALLBACK
+
+    def chat():
+        data = request.get_json()
+        user_message = data.get('message', '').strip().lower()
+        app_optimized.bot_status["conversations"] += 1
+        return jsonify({
+            "response": get_intelligent_response(user_message),
+            "status": "success",
+            "conversation_id": app_optimized.bot_status["conversations"],
+            "timestamp": datetime.datetime.now().isoformat()
+        }), 200
+
+    return chat
+
+
+def create_app(mode: str):
+    """
+    ``app_optimized.app`` con el handler de /api/chat del modo indicado
+
+    Todos los modos comparten el mismo servidor (CORS y hooks incluidos), así
+    solo cambia el handler.
+    """
+    import app_optimized
+    from src.core.legacy_responder import LegacyResponder
+
+    if mode == 'before':
+        app_optimized.app.view_functions['chat'] = legacy_chat_view()
+    else:
+        app_optimized.legacy_responder = LegacyResponder(mode)
+        app_optimized.app.view_functions['chat'] = app_optimized.chat
+    return app_optimized.app
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def ask(self, message: str) -> Tuple[int, Optional[str]]:
+        response = self.client.post(CHAT_PATH, json={"message": message})
+        response.get_data()
+        return response.status_code, None
+
+    def close(self) -> None:
+        pass
+
+
+class HTTPClient(bench_chat_api.HTTPClient):
+    """Como el de ``bench_chat_api`` pero contra /api/chat"""
+
+    def ask(self, message: str) -> Tuple[int, Optional[str]]:
+        body = json.dumps({"message": message}).encode('utf-8')
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            try:
+                self.connection.request('POST', self.prefix + CHAT_PATH, body=body,
+                                        headers={'Content-Type': 'application/json'})
+                response = self.connection.getresponse()
+                response.read()
+                if response.will_close:
+                    self.close()
+                return response.status, None
+            except (http.client.HTTPException, OSError):
+                self.close()
+                if attempt:
+                    raise
+        raise RuntimeError("unreachable")
+
+
+def _print_row(label: str, result: Dict[str, Any]) -> None:
+    stats = result['latency_ms']['all']
+    if not stats.get('count'):
+        print(f"{label:<10}{result['concurrency']:>5}  sin respuestas 200 ({result['status']})")
+        return
+    print(f"{label:<10}{result['concurrency']:>5}{result['rps']:>10.0f}{stats['count']:>8}"
+          f"{stats['mean']:>9.3f}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['p99']:>9.3f}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Diferencia porcentual de req/s y p50/p95/p99 contra una corrida anterior"""
+    print(f"\nComparación con {baseline['meta'].get('commit') or 'la corrida base'} "
+          f"({baseline['meta'].get('timestamp', '?')})")
+    print(f"{'modo':<10}{'conc':>5}  {'métrica':<8}{'base':>10}{'actual':>10}{'cambio':>9}")
+
+    base_runs = {(run['mode'], run['concurrency']): run for run in baseline['runs']}
+    for run in current['runs']:
+        base = base_runs.get((run['mode'], run['concurrency']))
+        if base is None:
+            continue
+        rows = [('req/s', base['rps'], run['rps'])]
+        rows += [(metric, base['latency_ms']['all'].get(metric), run['latency_ms']['all'].get(metric))
+                 for metric in ('p50', 'p95', 'p99')]
+        for metric, before, after in rows:
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before * 100:>+8.1f}%" if before else f"{'n/a':>9}"
+            print(f"{run['mode']:<10}{run['concurrency']:>5}  {metric:<8}{before:>10.3f}{after:>10.3f}{change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', default=['before', 'keywords', 'engine'],
+                        choices=['before', 'keywords', 'engine'])
+    parser.add_argument('--url', help="servidor ya levantado a cargar además (ej. http://127.0.0.1:5000)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8])
+    parser.add_argument('--requests', type=int, default=5000, help="solicitudes por nivel de concurrencia")
+    parser.add_argument('--unique-ratio', type=float, default=0.2,
+                        help="fracción de mensajes únicos (siempre fallos de cache en modo engine)")
+    parser.add_argument('--warmup', type=int, default=200, help="solicitudes previas no medidas")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="archivo JSON donde guardar los resultados")
+    parser.add_argument('--compare', help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    mixes = {
+        concurrency: build_message_mix(args.requests, args.unique_ratio, args.seed + concurrency)
+        for concurrency in args.concurrency
+    }
+    warmup = build_message_mix(args.warmup, 0.0, args.seed)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': bench_chat_api._git_commit(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'requests': args.requests,
+            'unique_ratio': args.unique_ratio,
+            'seed': args.seed
+        },
+        'runs': []
+    }
+
+    labels = list(args.modes) + (['http'] if args.url else [])
+
+    print(f"{'modo':<10}{'conc':>5}{'req/s':>10}{'n':>8}{'media ms':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for label in labels:
+        if label == 'http':
+            make_client = lambda: HTTPClient(args.url)  # noqa: E731
+        else:
+            app = create_app(label)
+            make_client = lambda: InProcessClient(app)  # noqa: E731
+
+        bench_chat_api.run_load(make_client, warmup, max(args.concurrency))
+        for concurrency in args.concurrency:
+            result = bench_chat_api.run_load(make_client, mixes[concurrency], concurrency)
+            result['mode'] = label
+            result['latency_ms'] = {'all': result['latency_ms']['all']}
+            results['runs'].append(result)
+            _print_row(label, result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Microbenchmark de normalize_text sobre texto en español
+
+Compara la normalización de referencia (NFD + categoría Unicode por carácter +
+dos regex) con la tabla de ``str.translate``, con y sin el memo LRU, y con el
+lote ``normalize_many``. El corpus sale del catálogo y de data/context: preguntas
+frecuentes, nombres y descripciones de productos, tiendas y ofertas.
+
+Antes de medir verifica, con el corpus y con textos aleatorios (acentos,
+puntuación, espacios Unicode y caracteres fuera de la tabla), que las nuevas
+rutas producen exactamente lo mismo que la de referencia, y que ``stem_token``
+reduce el singular y el plural de cada palabra del corpus a la misma raíz.
+
+Uso:
+    python benchmarks/bench_normalize.py [--repeat 5] [--fuzz 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.utils import text_utils  # noqa: E402
+from src.utils.text_utils import normalize_many, normalize_text, stem_token  # noqa: E402
+
+QUESTIONS = [
+    "¿Cuál es el horario de atención?",
+    "¿Dónde están ubicadas las tiendas?",
+    "¿Tienen ofertas esta semana?",
+    "¿Cuánto cuesta la casaca de cuero?",
+    "¿Cómo hago una devolución?",
+    "¿Qué tallas manejan para pantalones?",
+    "¿Hacen envíos a provincia?",
+    "¿Aceptan pago con tarjeta de crédito?",
+    "Hola, buenas tardes!!",
+    "Quiero información sobre la política de cambios…",
+]
+
+
+def _strings(value):
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _strings(item)
+
+
+def load_corpus():
+    """Todos los textos de los archivos de datos más preguntas típicas"""
+    paths = [os.path.join(ROOT, 'data', 'catalogue.json')]
+    context_dir = os.path.join(ROOT, 'data', 'context')
+    paths += [os.path.join(context_dir, name) for name in sorted(os.listdir(context_dir)) if name.endswith('.json')]
+
+    corpus = list(QUESTIONS)
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            corpus += [text for text in _strings(json.load(f)) if text.strip()]
+    return corpus
+
+
+FUZZ_ALPHABET = (
+    "abcdefghijklmnñopqrstuvwxyzABCDEFGHIJKLMNÑOPQRSTUVWXYZ0123456789_"
+    "áéíóúüÁÉÍÓÚÜàèçÇãõâêôİıßæœøÅ"
+    "¿?¡!.,;:-—–'\"“”‘’«»()[]{}@#$%&*/\\+=<>|~^`…·°ºª€£"
+    " \t\n\r\x0b\x0c\xa0   ​ \x1c\x00"
+)
+
+
+def fuzz_text(rng: random.Random) -> str:
+    length = rng.randint(0, 40)
+    chars = [rng.choice(FUZZ_ALPHABET) for _ in range(length)]
+    if rng.random() < 0.1:
+        # Fuera de la tabla: griego, cirílico, marcas combinantes sueltas, CJK, emoji
+        chars.insert(rng.randint(0, len(chars)), chr(rng.choice([
+            0x03A3, 0x0391, 0x0416, 0x0301, 0x0303, 0x4E2D, 0x1F600, 0x1E9E, 0xFB01, rng.randint(0x250, 0x2FFF)
+        ])))
+    return ''.join(chars)
+
+
+def check_equivalence(corpus, fuzz: int) -> int:
+    """Retorna el número de diferencias contra la normalización de referencia"""
+    rng = random.Random(1234)
+    samples = list(corpus) + [fuzz_text(rng) for _ in range(fuzz)]
+
+    mismatches = 0
+    for text in samples:
+        expected = text_utils._normalize_slow(text) if text else ""
+        if normalize_text(text) != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  normalize_text difiere: {text!r}")
+
+    for start in range(0, len(samples), 64):
+        batch = samples[start:start + 64]
+        expected = [text_utils._normalize_slow(text) if text else "" for text in batch]
+        if normalize_many(batch) != expected:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  normalize_many difiere en el lote que empieza en {start}")
+
+    return mismatches
+
+
+# Pares singular/plural que deben compartir raíz (plurales en -s y en -es)
+PLURAL_PAIRS = [
+    ("disponible", "disponibles"), ("talle", "talles"), ("talla", "tallas"), ("color", "colores"),
+    ("devolucion", "devoluciones"), ("camisa", "camisas"), ("verde", "verdes"), ("pared", "paredes"),
+    ("jean", "jeans"), ("precio", "precios"), ("oferta", "ofertas"), ("pantalon", "pantalones"),
+    ("clase", "clases"), ("mujer", "mujeres"), ("reloj", "relojes"), ("local", "locales"),
+]
+
+
+def plural_of(word: str) -> str:
+    """Plural regular: +s tras vocal, +es tras l, n, r, d o j"""
+    return word + ('s' if word[-1] in 'aeiou' else 'es')
+
+
+def check_stemming(corpus) -> int:
+    """Retorna el número de pares singular/plural que no comparten raíz"""
+    # Solo palabras con plural regular en español (quedan fuera "luz" -> "luces" y préstamos como "click")
+    words = {word for text in corpus for word in normalize_text(text).split()
+             if len(word) > 3 and word.isalpha() and word[-1] in 'aeioulnrdj'}
+    pairs = list(PLURAL_PAIRS) + [(word, plural_of(word)) for word in sorted(words)]
+
+    mismatches = 0
+    for singular, plural in pairs:
+        if stem_token(singular) != stem_token(plural):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  stem_token difiere: {singular!r} -> {stem_token(singular)!r}, "
+                      f"{plural!r} -> {stem_token(plural)!r}")
+    return mismatches
+
+
+def measure(label: str, fn, texts, repeat: int, baseline: float = None) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(texts)
+        best = min(best, time.perf_counter() - start)
+
+    rate = len(texts) / best
+    speedup = f"{rate / baseline:>8.1f}x" if baseline else f"{'':>9}"
+    print(f"{label:<34}{rate:>14,.0f}{best * 1000:>10.1f}{speedup}")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--fuzz', type=int, default=20000, help="textos aleatorios para la verificación")
+    parser.add_argument('--scale', type=int, default=20, help="veces que se repite el corpus por medición")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} textos, {sum(map(len, corpus)):,} caracteres")
+
+    mismatches = check_equivalence(corpus, args.fuzz)
+    print(f"Equivalencia con la referencia: {'OK' if not mismatches else f'{mismatches} diferencias'}")
+    stem_mismatches = check_stemming(corpus)
+    print(f"Raíz común singular/plural: {'OK' if not stem_mismatches else f'{stem_mismatches} diferencias'}\n")
+    mismatches += stem_mismatches
+
+    texts = corpus * args.scale
+    # Tráfico típico: pocas preguntas distintas que se repiten
+    queries = [random.Random(i).choice(QUESTIONS) for i in range(len(texts))]
+
+    print(f"{'ruta':<34}{'textos/s':>14}{'ms':>10}{'vs ref':>9}")
+    base = measure("referencia (NFD + unicodedata)", lambda ts: [text_utils._normalize_slow(t) for t in ts],
+                   texts, args.repeat)
+    measure("tabla de traducción (sin memo)", lambda ts: [text_utils._normalize(t) for t in ts],
+            texts, args.repeat, base)
+    measure("normalize_many (lotes de 64)",
+            lambda ts: [normalize_many(ts[i:i + 64]) for i in range(0, len(ts), 64)],
+            texts, args.repeat, base)
+
+    print()
+    base = measure("preguntas repetidas: referencia", lambda ts: [text_utils._normalize_slow(t) for t in ts],
+                   queries, args.repeat)
+    measure("preguntas repetidas: normalize_text", lambda ts: [normalize_text(t) for t in ts],
+            queries, args.repeat, base)
+    print(f"\nMemo: {text_utils.normalize_cache_info()}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
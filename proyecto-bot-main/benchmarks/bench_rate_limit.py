@@ -0,0 +1,95 @@
+"""
+Benchmark de contención del rate limiter
+
+Mide cuántas llamadas a ``is_allowed`` por segundo soporta cada backend con
+varios hilos compitiendo por los locks, y verifica que el backend SQLite
+aplique un único cupo por cliente entre procesos.
+
+Uso:
+    python benchmarks/bench_rate_limit.py [--threads 1 4 16] [--calls 20000] [--clients 1000]
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.rate_limit_backends import MemoryRateLimitBackend, SQLiteRateLimitBackend
+from src.services.rate_limit_service import RateLimitService
+
+
+def run_threads(service: RateLimitService, threads: int, calls: int, clients: int) -> float:
+    """Ejecuta ``calls`` llamadas repartidas entre ``threads`` hilos; retorna llamadas/s"""
+    per_thread = calls // threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(offset: int):
+        barrier.wait()
+        for i in range(per_thread):
+            service.is_allowed(f"10.0.{(offset + i) % clients // 256}.{(offset + i) % 256}")
+
+    workers = [threading.Thread(target=worker, args=(n * 7919,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+
+def _process_worker(db_path: str, calls: int, allowed_counter):
+    backend = SQLiteRateLimitBackend(db_path, max_clients=1000)
+    service = RateLimitService(requests_per_minute=50, reap_interval=0, backend=backend)
+    allowed = sum(1 for _ in range(calls) if service.is_allowed("shared-client")[0])
+    with allowed_counter.get_lock():
+        allowed_counter.value += allowed
+
+
+def check_shared_budget(db_path: str, processes: int = 4, calls: int = 40) -> None:
+    """Varios procesos golpeando al mismo cliente deben compartir un solo cupo"""
+    allowed_counter = multiprocessing.Value('i', 0)
+    workers = [
+        multiprocessing.Process(target=_process_worker, args=(db_path, calls, allowed_counter))
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    print(f"  {processes} procesos x {calls} solicitudes, límite 50 -> permitidas: {allowed_counter.value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--calls', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = {
+            'memory (1 stripe)': lambda: MemoryRateLimitBackend(10000, stripes=1),
+            'memory (16 stripes)': lambda: MemoryRateLimitBackend(10000, stripes=16),
+            'sqlite': lambda: SQLiteRateLimitBackend(os.path.join(tmp, f"rl-{time.monotonic_ns()}.sqlite3"), 10000),
+        }
+
+        print(f"{'backend':<22}" + ''.join(f"{f'{t} hilos':>14}" for t in args.threads))
+        for name, factory in backends.items():
+            row = f"{name:<22}"
+            for threads in args.threads:
+                service = RateLimitService(requests_per_minute=10 ** 9, reap_interval=0, backend=factory())
+                calls = args.calls if not name.startswith('sqlite') else max(threads, args.calls // 10)
+                row += f"{run_threads(service, threads, calls, args.clients):>10.0f} /s "
+            print(row)
+
+        print("\nCupo compartido (sqlite):")
+        check_shared_budget(os.path.join(tmp, "shared.sqlite3"))
+
+
+if __name__ == '__main__':
+    main()
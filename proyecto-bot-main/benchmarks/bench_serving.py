@@ -0,0 +1,177 @@
+"""
+Benchmark del modo de servicio: Flask con hilos vs asyncio (aiohttp)
+
+Levanta cada servidor en un subproceso con el rate limiting desactivado y lo
+carga con N conexiones concurrentes que envían preguntas a /api/v1/chat/ask.
+Reporta solicitudes por segundo, latencias p50/p99, solicitudes por segundo de
+CPU del servidor y cuántos hilos del sistema llegó a usar el servidor.
+
+Uso:
+    python benchmarks/bench_serving.py [--concurrency 10 100 400] [--duration 5]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+QUESTIONS = [
+    "¿Cuál es el horario de atención?",
+    "¿Dónde están ubicadas las tiendas?",
+    "¿Tienen ofertas esta semana?",
+    "¿Cuánto cuesta la casaca de cuero?",
+    "¿Cómo hago una devolución?",
+    "¿Qué tallas manejan?",
+    "¿Hacen envíos a provincia?",
+    "¿Aceptan pago con tarjeta?",
+]
+
+
+def serve(mode: str, port: int) -> None:
+    """Punto de entrada del subproceso servidor"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    if mode == 'flask':
+        from flask import Flask
+        from werkzeug.serving import run_simple
+        from src.api.chat_routes import chat_bp, metrics_bp
+
+        app = Flask(__name__)
+        app.register_blueprint(chat_bp)
+        app.register_blueprint(metrics_bp)
+        run_simple('127.0.0.1', port, app, threaded=True)
+    else:
+        from aiohttp import web
+        from src.api.async_app import create_async_app
+
+        web.run_app(create_async_app(), host='127.0.0.1', port=port, print=None, access_log=None)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _proc_stats(pid: int):
+    """(segundos de CPU, hilos) del proceso según /proc, o (None, None) si no está disponible"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f'/proc/{pid}/status') as f:
+            threads = next(int(line.split()[1]) for line in f if line.startswith('Threads:'))
+        return cpu, threads
+    except (OSError, ValueError, StopIteration):
+        return None, None
+
+
+async def _load(url: str, concurrency: int, duration: float, pid: int = None):
+    """Retorna (latencias, errores, pico de hilos del servidor)"""
+    import aiohttp
+
+    latencies = []
+    errors = 0
+    peak_threads = None
+    deadline = time.perf_counter() + duration
+
+    async def worker(session):
+        nonlocal errors
+        rng = random.Random()
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                async with session.post(url, json={"question": rng.choice(QUESTIONS)}) as response:
+                    await response.read()
+                    if response.status != 200:
+                        errors += 1
+            except aiohttp.ClientError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while time.perf_counter() < deadline:
+            threads = _proc_stats(pid)[1]
+            if threads is not None:
+                peak_threads = max(peak_threads or 0, threads)
+            await asyncio.sleep(0.1)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        tasks = [worker(session) for _ in range(concurrency)]
+        if pid is not None:
+            tasks.append(sample_threads())
+        await asyncio.gather(*tasks)
+    return latencies, errors, peak_threads
+
+
+def _wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"El servidor no respondió en el puerto {port}")
+
+
+def run_mode(mode: str, concurrency_levels, duration: float) -> None:
+    port = _free_port()
+    env = dict(os.environ, REQUESTS_PER_MINUTE=str(10 ** 9), LOG_LEVEL='CRITICAL',
+               EMBEDDING_BACKEND=os.environ.get('EMBEDDING_BACKEND', 'none'))
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), '--serve', mode, '--port', str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_ready(port)
+        url = f'http://127.0.0.1:{port}/api/v1/chat/ask'
+        asyncio.run(_load(url, 4, 1.0))  # calentar cache e índices
+
+        for concurrency in concurrency_levels:
+            cpu_before, _ = _proc_stats(server.pid)
+            latencies, errors, threads = asyncio.run(_load(url, concurrency, duration, server.pid))
+            cpu_after, _ = _proc_stats(server.pid)
+
+            latencies.sort()
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+            rps = len(latencies) / duration
+            per_cpu = (f"{len(latencies) / (cpu_after - cpu_before):>9.0f}"
+                       if cpu_before is not None and cpu_after > cpu_before else f"{'n/a':>9}")
+            print(f"{mode:<7}{concurrency:>6}{rps:>10.0f}{p50:>10.1f}{p99:>10.1f}{per_cpu}"
+                  f"{threads if threads is not None else 'n/a':>9}{errors:>8}")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 100, 400])
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--modes', nargs='+', default=['flask', 'async'], choices=['flask', 'async'])
+    parser.add_argument('--serve', choices=['flask', 'async'], help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    print(f"{'modo':<7}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'req/cpu-s':>10}{'hilos':>8}{'errores':>8}")
+    for mode in args.modes:
+        run_mode(mode, args.concurrency, args.duration)
+
+
+if __name__ == '__main__':
+    main()
@@ -23,25 +23,66 @@ class Config:
     # Configuración de archivos
     DATA_FILE = os.environ.get("DATA_FILE", str(DATA_DIR / "catalogue.json"))
     CONTEXT_DIR = os.environ.get("CONTEXT_DIR", str(DATA_DIR / "context"))
+    # Cada cuánto revisar si cambiaron los archivos del catálogo (segundos, 0 deshabilita la recarga)
+    CATALOGUE_RELOAD_INTERVAL = float(os.environ.get("CATALOGUE_RELOAD_INTERVAL", 5))
     
     # Configuración del modelo de IA
     MODEL_ID = os.environ.get("MODEL_ID", "google/flan-t5-small")
     EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    # 'auto' usa el modelo si está en la caché local; 'hashing' es el reemplazo determinista
+    EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "auto")
+    EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")
+    SEMANTIC_MATCH_THRESHOLD = float(os.environ.get("SEMANTIC_MATCH_THRESHOLD", 0.55))
     
     # Configuración de cache y rate limiting
     CACHE_TTL = int(os.environ.get("CACHE_TTL", 300))  # segundos
+    CACHE_SWEEP_INTERVAL = float(os.environ.get("CACHE_SWEEP_INTERVAL", 30))  # segundos, 0 deshabilita
+    CACHE_SHARDS = int(os.environ.get("CACHE_SHARDS", 8))  # 1 = LRU global con un solo lock
+    CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 16 * 1024 * 1024))  # presupuesto total del cache
+    # 'memory' (por proceso) o 'sqlite' (compartido entre los workers del host)
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+    CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", str(BASE_DIR / "cache_db" / "responses.sqlite3"))
     REQUESTS_PER_MINUTE = int(os.environ.get("REQUESTS_PER_MINUTE", 40))
+    RATE_LIMIT_MAX_CLIENTS = int(os.environ.get("RATE_LIMIT_MAX_CLIENTS", 10000))
+    RATE_LIMIT_STRIPES = int(os.environ.get("RATE_LIMIT_STRIPES", 16))
+    RATE_LIMIT_REAP_INTERVAL = float(os.environ.get("RATE_LIMIT_REAP_INTERVAL", 60))  # segundos, 0 deshabilita
+    # 'memory' (cupo por proceso) o 'sqlite' (un cupo por cliente para todos los workers del host)
+    RATE_LIMIT_BACKEND = os.environ.get("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_DB_PATH = os.environ.get("RATE_LIMIT_DB_PATH", str(BASE_DIR / "cache_db" / "rate_limit.sqlite3"))
     MAX_PROCESSING_TIME = int(os.environ.get("MAX_PROCESSING_TIME", 30))  # segundos
+
+    # Configuración del pool de procesamiento
+    MAX_CONCURRENT_QUESTIONS = int(os.environ.get("MAX_CONCURRENT_QUESTIONS", 8))
+    PROCESSING_QUEUE_SIZE = int(os.environ.get("PROCESSING_QUEUE_SIZE", 32))
+    # Máximo de preguntas por solicitud a /ask/batch (cada una consume cupo de rate limiting)
+    MAX_BATCH_QUESTIONS = int(os.environ.get("MAX_BATCH_QUESTIONS", 20))
+    # Solicitudes que superan este presupuesto se capturan (pila y etapas) en /history; 0 deshabilita
+    SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", 2.0))
+    SLOW_REQUEST_BUFFER_SIZE = int(os.environ.get("SLOW_REQUEST_BUFFER_SIZE", 50))
+    # Respuestas de /api/chat en los servidores heredados: 'keywords' (temas fijos) o 'engine' (ChatEngine)
+    LEGACY_CHAT_BACKEND = os.environ.get("LEGACY_CHAT_BACKEND", "keywords")
+
+    # Configuración de búsqueda en preguntas frecuentes
+    FAQ_MATCH_THRESHOLD = float(os.environ.get("FAQ_MATCH_THRESHOLD", 0.6))
+    FAQ_KEYWORD_BOOST = float(os.environ.get("FAQ_KEYWORD_BOOST", 0.3))
     
     # Configuración de base de datos vectorial
     CHROMA_DB_PATH = os.environ.get("CHROMA_DB_PATH", str(BASE_DIR / "chroma_db"))
     
+    # Configuración de archivos estáticos (servidor de la tienda, fashion_store_complete.py)
+    STATIC_MAX_FILE_BYTES = int(os.environ.get("STATIC_MAX_FILE_BYTES", 2 * 1024 * 1024))  # más grandes, desde disco
+    STATIC_CACHE_MAX_BYTES = int(os.environ.get("STATIC_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+    STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", 3600))  # segundos, archivos sin huella en el nombre
+    STATIC_REVALIDATE_SECONDS = float(os.environ.get("STATIC_REVALIDATE_SECONDS", 2))  # cada cuánto revisar el mtime
+    
     # Configuración de logging
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
     LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
     
     # Configuración de seguridad
     REBUILD_SECRET = os.environ.get("REBUILD_SECRET", "")
+    # Duración máxima de una sesión del perfilador (/api/v1/chat/admin/profile)
+    PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", 30))
     
     @classmethod
     def get_all_settings(cls) -> Dict[str, Any]:
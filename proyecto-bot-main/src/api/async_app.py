@@ -0,0 +1,299 @@
+"""
+Servidor asyncio (aiohttp) para el chat del Bot Asistente de Consultas
+
+Expone el mismo contrato que ``chat_routes.chat_bp`` bajo /api/v1/chat, pero
+atiende todas las conexiones desde un único event loop en lugar de un hilo del
+sistema por conexión. Con los backends en memoria, el rate limiting y las
+respuestas cacheadas se resuelven directamente en el loop; con los backends
+SQLite (que pueden esperar el lock de escritura hasta su timeout) esas
+llamadas van al executor por defecto. El procesamiento de preguntas
+(bloqueante y con CPU) se delega a un executor acotado al tamaño del pool de
+procesamiento.
+
+Uso:
+    python -m src.api.async_app [--host 0.0.0.0] [--port 5000]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+from config.settings import config
+from src.api import chat_handlers
+from src.api.chat_handlers import HandlerResult, chat_engine
+from src.services.cache_service import cache_service
+from src.services.processing_service import processing_service
+from src.services.rate_limit_service import rate_limit_service
+from src.utils.metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KEY = web.AppKey('executor', ThreadPoolExecutor)
+URL_PREFIX = '/api/v1/chat'
+
+
+def _respond(result: HandlerResult) -> web.Response:
+    """Convierte el resultado de un handler en respuesta aiohttp"""
+    if result.body is not None:
+        return web.Response(body=result.body, status=result.status,
+                            headers={**(result.headers or {}), 'Content-Type': result.content_type})
+    return web.json_response(
+        result.payload, status=result.status, headers=result.headers,
+        dumps=lambda payload: json.dumps(payload, ensure_ascii=False)
+    )
+
+
+async def _call(inline: bool, func, *args):
+    """Ejecuta ``func`` en el loop si ``inline``; si no, en el executor por defecto"""
+    if inline:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def _rate_limit_inline() -> bool:
+    return rate_limit_service.backend.name == 'memory'
+
+
+def _cache_inline() -> bool:
+    return cache_service.backend.name == 'memory'
+
+
+async def ask_question(request: web.Request) -> web.Response:
+    """POST /ask: mismo contrato que la ruta Flask"""
+    client_ip = request.remote or "unknown"
+    try:
+        rejected, rate_info = await _call(_rate_limit_inline(), chat_handlers.check_rate_limit, client_ip)
+        if rejected:
+            return _respond(rejected)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        rejected, question = chat_handlers.parse_question(data)
+        if rejected:
+            return _respond(rejected)
+
+        # Se analiza una vez (en el loop: es CPU breve): el cache y el procesamiento usan la misma consulta
+        query = chat_engine.analyze(question)
+        snapshot = chat_engine.current_snapshot()
+        # Los aciertos de cache no necesitan worker
+        cached = await _call(_cache_inline(), chat_handlers.cached_answer, query, rate_info, snapshot)
+        if cached:
+            return _respond(cached)
+
+        # Rechazar sin ocupar el executor si el pool y su cola están llenos
+        retry_after = processing_service.reject_if_saturated()
+        if retry_after is not None:
+            return _respond(chat_handlers.queue_full_result(retry_after, rate_info))
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            request.app[EXECUTOR_KEY], chat_handlers.answer_question, query, client_ip, rate_info, snapshot
+        )
+        return _respond(result)
+
+    except Exception as e:
+        return _respond(chat_handlers.unexpected_error(e))
+
+
+async def ask_question_stream(request: web.Request) -> web.StreamResponse:
+    """POST /ask/stream: mismo contrato que la ruta Flask"""
+    client_ip = request.remote or "unknown"
+    try:
+        rejected, rate_info = await _call(_rate_limit_inline(), chat_handlers.check_rate_limit, client_ip)
+        if rejected:
+            return _respond(rejected)
+
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        rejected, question = chat_handlers.parse_question(data)
+        if rejected:
+            return _respond(rejected)
+
+        retry_after = processing_service.reject_if_saturated()
+        if retry_after is not None:
+            return _respond(chat_handlers.queue_full_result(retry_after, rate_info))
+
+        loop = asyncio.get_running_loop()
+        executor = request.app[EXECUTOR_KEY]
+        stream = await loop.run_in_executor(
+            executor, chat_handlers.open_answer_stream, question, client_ip, rate_info
+        )
+        if isinstance(stream, HandlerResult):
+            return _respond(stream)
+
+    except Exception as e:
+        return _respond(chat_handlers.unexpected_error(e))
+
+    response = web.StreamResponse(headers=stream.headers)
+    response.content_type = 'text/event-stream'
+    response.charset = 'utf-8'
+    try:
+        await response.prepare(request)
+        # Cada etapa corre en el executor y su evento se envía apenas está lista
+        while True:
+            chunk = await loop.run_in_executor(executor, next, stream, None)
+            if chunk is None:
+                break
+            await response.write(chunk)
+        await response.write_eof()
+    except (ConnectionResetError, asyncio.CancelledError):
+        logger.info(f"Client {client_ip} disconnected during answer stream")
+        raise
+    finally:
+        # Si una etapa sigue en curso, close espera en el executor a que termine
+        loop.run_in_executor(executor, stream.close)
+    return response
+
+
+async def ask_batch(request: web.Request) -> web.Response:
+    """POST /ask/batch: mismo contrato que la ruta Flask"""
+    client_ip = request.remote or "unknown"
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        rejected, items = chat_handlers.parse_batch(data)
+        if rejected:
+            return _respond(rejected)
+
+        weight = sum(1 for item in items if isinstance(item, str))
+        rejected, rate_info = await _call(_rate_limit_inline(), chat_handlers.check_rate_limit,
+                                          client_ip, max(1, weight))
+        if rejected:
+            return _respond(rejected)
+
+        retry_after = processing_service.reject_if_saturated()
+        if retry_after is not None:
+            return _respond(chat_handlers.queue_full_result(retry_after, rate_info))
+
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            request.app[EXECUTOR_KEY], chat_handlers.answer_batch, items, client_ip, rate_info
+        )
+        return _respond(result)
+
+    except Exception as e:
+        return _respond(chat_handlers.unexpected_error(e))
+
+
+async def get_chat_status(request: web.Request) -> web.Response:
+    inline = _cache_inline() and _rate_limit_inline()
+    return _respond(await _call(inline, chat_handlers.handle_status))
+
+
+async def get_suggestions(request: web.Request) -> web.Response:
+    return _respond(chat_handlers.handle_suggestions(request.query))
+
+
+async def get_processing_history(request: web.Request) -> web.Response:
+    return _respond(chat_handlers.handle_history(request.query))
+
+
+async def get_cache_stats(request: web.Request) -> web.Response:
+    return _respond(await _call(_cache_inline(), chat_handlers.handle_cache_stats))
+
+
+async def clear_cache(request: web.Request) -> web.Response:
+    return _respond(await _call(_cache_inline(), chat_handlers.handle_cache_clear))
+
+
+async def profile_worker(request: web.Request) -> web.Response:
+    # Fuera del executor del chat: la sesión no debe ocupar un worker del pool
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(
+        None, chat_handlers.handle_profile, request.query, request.headers.get('X-Admin-Secret')
+    )
+    return _respond(result)
+
+
+async def prometheus_metrics(request: web.Request) -> web.Response:
+    return _respond(chat_handlers.handle_metrics())
+
+
+@web.middleware
+async def metrics_middleware(request: web.Request, handler):
+    """Registra duración y código de cada solicitud, con las mismas etiquetas que Flask"""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        endpoint = resource.canonical if resource is not None else 'unmatched'
+        observe_request(endpoint, request.method, status, time.perf_counter() - start)
+
+
+@web.middleware
+async def error_middleware(request: web.Request, handler):
+    """Traduce los errores HTTP a los mismos payloads JSON que el blueprint"""
+    try:
+        return await handler(request)
+    except web.HTTPNotFound:
+        return _respond(chat_handlers.NOT_FOUND)
+    except web.HTTPMethodNotAllowed:
+        return _respond(chat_handlers.METHOD_NOT_ALLOWED)
+    except web.HTTPException:
+        raise
+    except Exception:
+        logger.exception("Unhandled error in async chat server")
+        return _respond(chat_handlers.INTERNAL_ERROR)
+
+
+async def _shutdown_executor(app: web.Application) -> None:
+    app[EXECUTOR_KEY].shutdown(wait=False, cancel_futures=True)
+
+
+def create_async_app(max_workers: int = None) -> web.Application:
+    """
+    Crea la aplicación aiohttp
+
+    Args:
+        max_workers: Hilos del executor. Por defecto cubre los workers y la cola
+            del pool de procesamiento, que es quien acota la concurrencia real.
+    """
+    app = web.Application(middlewares=[metrics_middleware, error_middleware])
+    app[EXECUTOR_KEY] = ThreadPoolExecutor(
+        max_workers=max_workers or processing_service.max_concurrent + processing_service.max_queue_size,
+        thread_name_prefix="chat-worker"
+    )
+    app.on_cleanup.append(_shutdown_executor)
+
+    app.router.add_post(f'{URL_PREFIX}/ask', ask_question)
+    app.router.add_post(f'{URL_PREFIX}/ask/stream', ask_question_stream)
+    app.router.add_post(f'{URL_PREFIX}/ask/batch', ask_batch)
+    app.router.add_get(f'{URL_PREFIX}/status', get_chat_status)
+    app.router.add_get(f'{URL_PREFIX}/suggestions', get_suggestions)
+    app.router.add_get(f'{URL_PREFIX}/history', get_processing_history)
+    app.router.add_get(f'{URL_PREFIX}/cache/stats', get_cache_stats)
+    app.router.add_post(f'{URL_PREFIX}/cache/clear', clear_cache)
+    app.router.add_post(f'{URL_PREFIX}/admin/profile', profile_worker)
+    app.router.add_get('/metrics', prometheus_metrics)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor asyncio del chat")
+    parser.add_argument('--host', default=config.HOST)
+    parser.add_argument('--port', type=int, default=config.PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=config.LOG_LEVEL, format=config.LOG_FORMAT)
+    web.run_app(create_async_app(), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,687 @@
+"""
+Lógica de los endpoints del chat, independiente del framework web
+
+Cada handler retorna un ``HandlerResult`` (payload JSON, status y cabeceras) que
+los servidores Flask (``chat_routes``) y asyncio (``async_app``) convierten en
+su propio tipo de respuesta, de modo que ambos exponen el mismo contrato.
+"""
+from typing import Dict, Any, Iterator, List, Mapping, NamedTuple, Optional, Tuple, Union
+import hmac
+import logging
+import re
+import threading
+
+from config.settings import config
+from src.models.schemas import ChatMessage
+from src.services.cache_service import cache_service
+from src.services.rate_limit_service import rate_limit_service
+from src.services.processing_service import (
+    processing_service, ProcessingQueueFullError, ProcessingTimeoutError, ProcessingTicket
+)
+from src.services.slow_request_service import slow_request_watchdog
+from src.core.catalogue import CatalogueSnapshot
+from src.core.chat_engine import ChatEngine
+from src.utils.analyzed_query import AnalyzedQuery
+from src.utils.compiled_answer import CompiledAnswer, encode_json
+from src.utils.metrics import metrics
+from src.utils.request_trace import activate
+from src.utils.sampling_profiler import ProfilerBusyError, SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+# Instancia del motor de chat (recarga el catálogo cuando cambian sus archivos)
+chat_engine = ChatEngine()
+chat_engine.start_watcher()
+
+# Captura pila y etapas de las consultas que superan SLOW_REQUEST_SECONDS
+slow_request_watchdog.start()
+
+# Perfilador por muestreo para administradores (sin costo mientras no se usa)
+profiler = SamplingProfiler(max_duration=config.PROFILER_MAX_SECONDS)
+
+
+class HandlerResult(NamedTuple):
+    """
+    Respuesta de un handler: payload JSON, código HTTP y cabeceras extra
+
+    Si ``body`` está presente es el cuerpo ya codificado (JSON salvo que
+    ``content_type`` indique otra cosa) y se escribe tal cual.
+    """
+    payload: Optional[Dict[str, Any]]
+    status: int = 200
+    headers: Optional[Dict[str, str]] = None
+    body: Optional[bytes] = None
+    content_type: str = 'application/json'
+
+
+def rate_limit_headers(rate_info: Dict[str, Any]) -> Dict[str, str]:
+    """Cabeceras X-RateLimit-* (y Retry-After si se superó el límite)"""
+    headers = {
+        'X-RateLimit-Limit': str(rate_info.get('limit', '')),
+        'X-RateLimit-Remaining': str(rate_info.get('remaining', '')),
+        'X-RateLimit-Reset': str(rate_info.get('reset_in_seconds', ''))
+    }
+    if 'retry_after' in rate_info:
+        headers['Retry-After'] = str(rate_info['retry_after'])
+    return headers
+
+
+def _compiled_result(answer: CompiledAnswer, rate_info: Dict[str, Any], cache_status: str) -> HandlerResult:
+    """
+    Escribe la respuesta pre-serializada sin tocarla
+
+    La info de rate limiting viaja en cabeceras y se empalma en el cuerpo para
+    mantener el contrato de ``rate_limit_info``; la respuesta cacheada no se modifica.
+    ``X-Cache`` indica si se sirvió desde cache (HIT) o se procesó (MISS).
+    """
+    headers = rate_limit_headers(rate_info)
+    headers['X-Cache'] = cache_status
+    return HandlerResult(None, headers=headers, body=answer.render({"rate_limit_info": rate_info}))
+
+
+NOT_FOUND = HandlerResult({
+    "error": "Endpoint no encontrado",
+    "message": "El endpoint solicitado no existe"
+}, 404)
+
+METHOD_NOT_ALLOWED = HandlerResult({
+    "error": "Método no permitido",
+    "message": "El método HTTP no está permitido para este endpoint"
+}, 405)
+
+INTERNAL_ERROR = HandlerResult({
+    "error": "Error interno del servidor",
+    "message": "Ha ocurrido un error interno. Por favor, intenta de nuevo."
+}, 500)
+
+
+def _error_details(e: Exception) -> Optional[str]:
+    return str(e) if logger.level == logging.DEBUG else None
+
+
+def check_rate_limit(client_ip: str, weight: int = 1) -> Tuple[Optional[HandlerResult], Dict[str, Any]]:
+    """Retorna (respuesta 429 o None, info de rate limiting); ``weight`` es el cupo que consume"""
+    allowed, rate_info = rate_limit_service.is_allowed(client_ip, weight)
+    if not allowed:
+        logger.warning(f"Rate limit exceeded for client {client_ip}")
+        return HandlerResult({
+            "error": "Límite de solicitudes alcanzado. Intenta de nuevo en un minuto.",
+            "rate_limit_info": rate_info
+        }, 429, rate_limit_headers(rate_info)), rate_info
+    return None, rate_info
+
+
+def parse_question(data: Any) -> Tuple[Optional[HandlerResult], Optional[str]]:
+    """Valida el body de /ask; retorna (respuesta 400 o None, pregunta)"""
+    if not data:
+        return HandlerResult({
+            "error": "No se recibió ninguna pregunta. ¿En qué puedo ayudarte? 🤔"
+        }, 400), None
+
+    try:
+        # Validar usando Pydantic
+        return None, ChatMessage(**data).question
+    except Exception:
+        return HandlerResult({
+            "error": "Pregunta inválida. Por favor, proporciona una pregunta válida."
+        }, 400), None
+
+
+INVALID_BATCH_ITEM = CompiledAnswer({
+    "error": "Pregunta inválida. Por favor, proporciona una pregunta válida."
+})
+
+
+def parse_batch(data: Any) -> Tuple[Optional[HandlerResult], List[Union[str, CompiledAnswer]]]:
+    """
+    Valida el body de /ask/batch: ``{"questions": ["...", ...]}``
+
+    Retorna (respuesta 400 o None, elementos). Cada elemento es la pregunta
+    validada o, si esa pregunta es inválida, su respuesta de error ya compilada;
+    así un elemento inválido no rechaza el lote completo.
+    """
+    questions = data.get('questions') if isinstance(data, dict) else None
+    if not isinstance(questions, list) or not questions:
+        return HandlerResult({
+            "error": "Envía las preguntas como una lista no vacía en el campo 'questions'."
+        }, 400), []
+    if len(questions) > config.MAX_BATCH_QUESTIONS:
+        return HandlerResult({
+            "error": f"Máximo {config.MAX_BATCH_QUESTIONS} preguntas por solicitud.",
+            "max_questions": config.MAX_BATCH_QUESTIONS
+        }, 400), []
+
+    items: List[Union[str, CompiledAnswer]] = []
+    for question in questions:
+        try:
+            items.append(ChatMessage(question=question).question)
+        except Exception:
+            items.append(INVALID_BATCH_ITEM)
+    return None, items
+
+
+def queue_full_result(retry_after: int, rate_info: Dict[str, Any]) -> HandlerResult:
+    """Respuesta 503 con Retry-After cuando el pool y su cola están llenos"""
+    return HandlerResult({
+        "error": "El asistente está atendiendo muchas consultas. Intenta de nuevo en unos segundos. ⏳",
+        "processing": True,
+        "retry_after": retry_after,
+        "rate_limit_info": rate_info
+    }, 503, {'Retry-After': str(retry_after)})
+
+
+BUSY_MESSAGE = "Estoy ocupado en este momento, por favor intenta de nuevo en unos segundos... ⏳"
+
+# Respuesta de cada pregunta de un lote que no consiguió worker a tiempo
+BUSY_BATCH_ITEM = CompiledAnswer({"answer": BUSY_MESSAGE, "processing": True})
+
+
+def busy_result(rate_info: Dict[str, Any]) -> HandlerResult:
+    """
+    Respuesta 200 cuando se venció la espera de un worker
+
+    La cola tenía lugar pero el pool no se liberó a tiempo: no es un rechazo
+    (eso es ``queue_full_result``), así que /ask, /ask/batch y /ask/stream
+    responden igual, con ``processing`` en el cuerpo para que el cliente reintente.
+    """
+    return HandlerResult({
+        "answer": BUSY_MESSAGE,
+        "processing": True,
+        "rate_limit_info": rate_info
+    })
+
+
+def answer_question(query: AnalyzedQuery, client_ip: str, rate_info: Dict[str, Any],
+                    snapshot: Optional[CatalogueSnapshot] = None) -> HandlerResult:
+    """
+    Reserva un worker del pool (esperando en cola si hace falta) y procesa la pregunta
+
+    El llamador ya la buscó en el cache con ``cached_answer`` (sobre ``snapshot``),
+    así que el motor no vuelve a consultarlo. Es bloqueante: el servidor asyncio
+    lo ejecuta en su executor acotado.
+    """
+    try:
+        ticket = processing_service.start_processing(query.raw)
+    except ProcessingQueueFullError as e:
+        logger.info(f"Request rejected - processing queue full for client {client_ip}")
+        return queue_full_result(e.retry_after, rate_info)
+    except ProcessingTimeoutError:
+        logger.info(f"Request timed out waiting for a worker for client {client_ip}")
+        return busy_result(rate_info)
+
+    try:
+        # Procesar la pregunta (las etapas quedan en la traza del ticket)
+        with activate(ticket.trace):
+            answer = chat_engine.answer(query, client_ip, snapshot, checked_cache=True)
+
+        logger.info(f"Question processed successfully for client {client_ip}")
+        return _compiled_result(answer, rate_info, 'MISS')
+
+    except Exception:
+        logger.exception(f"Error processing question for client {client_ip}")
+        return HandlerResult({
+            "answer": "Disculpa la interrupción. Estoy teniendo algunas dificultades técnicas. ¿Podrías intentarlo de nuevo en un momento? 🔄",
+            "error": "Internal processing error",
+            "rate_limit_info": rate_info
+        }, 500)
+
+    finally:
+        # Siempre liberar el worker
+        processing_service.finish_processing(ticket)
+
+
+def answer_batch(items: List[Union[str, CompiledAnswer]], client_ip: str,
+                 rate_info: Dict[str, Any]) -> HandlerResult:
+    """
+    Procesa un lote ocupando un solo worker del pool
+
+    El cuerpo se arma empalmando los cuerpos pre-serializados de cada
+    respuesta, en el mismo orden que las preguntas. Si se vence la espera de
+    un worker, cada pregunta válida recibe la respuesta de ocupado de /ask.
+    """
+    questions = [item for item in items if isinstance(item, str)]
+    answers: List[CompiledAnswer] = []
+    if questions:
+        try:
+            ticket = processing_service.start_processing(f"[batch:{len(questions)}] {questions[0]}")
+        except ProcessingQueueFullError as e:
+            logger.info(f"Batch rejected - processing queue full for client {client_ip}")
+            return queue_full_result(e.retry_after, rate_info)
+        except ProcessingTimeoutError:
+            logger.info(f"Batch timed out waiting for a worker for client {client_ip}")
+            answers = [BUSY_BATCH_ITEM] * len(questions)
+        else:
+            try:
+                with activate(ticket.trace):
+                    answers = chat_engine.process_questions(questions, client_ip)
+            except Exception:
+                logger.exception(f"Error processing batch for client {client_ip}")
+                return HandlerResult({
+                    "error": "Internal processing error",
+                    "rate_limit_info": rate_info
+                }, 500)
+            finally:
+                processing_service.finish_processing(ticket)
+
+    answered = iter(answers)
+    results = [item if isinstance(item, CompiledAnswer) else next(answered) for item in items]
+    body = b''.join((
+        b'{"results":[', b','.join(result.body for result in results), b'],',
+        encode_json({"total": len(results), "rate_limit_info": rate_info})[1:]
+    ))
+    return HandlerResult(None, headers=rate_limit_headers(rate_info), body=body)
+
+
+# Tamaño aproximado (en caracteres) de cada evento 'chunk' del streaming
+STREAM_CHUNK_CHARS = 120
+
+_WORD_RE = re.compile(r'\S+\s*|\s+')
+
+
+def sse_event(event: str, payload: Optional[Dict[str, Any]] = None, body: Optional[bytes] = None) -> bytes:
+    """Codifica un evento Server-Sent Events (el JSON compacto nunca contiene saltos de línea)"""
+    data = body if body is not None else encode_json(payload)
+    return b''.join((b'event: ', event.encode('ascii'), b'\ndata: ', data, b'\n\n'))
+
+
+def split_answer(text: str, size: int = STREAM_CHUNK_CHARS) -> Iterator[str]:
+    """Divide el texto en trozos de ~``size`` caracteres sin cortar palabras; unidos dan el texto original"""
+    chunk = ''
+    for word in _WORD_RE.findall(text):
+        if chunk and len(chunk) + len(word) > size:
+            yield chunk
+            chunk = ''
+        chunk += word
+    if chunk:
+        yield chunk
+
+
+class AnswerStream:
+    """
+    Cuerpo de /ask/stream: iterable de eventos SSE ya codificados
+
+    Es dueño del worker del pool reservado para la pregunta y lo libera al
+    terminar, al fallar o en ``close`` (que Flask y aiohttp invocan cuando el
+    cliente se desconecta), lo que ocurra primero. Cada paso se produce con un
+    lock, así ``close`` desde otro hilo espera a que termine la etapa en curso
+    en lugar de interrumpirla.
+    """
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }
+
+    def __init__(self, query: AnalyzedQuery, snapshot: CatalogueSnapshot, client_ip: str,
+                 rate_info: Dict[str, Any], ticket: Optional[ProcessingTicket] = None,
+                 cached: Optional[CompiledAnswer] = None):
+        self.client_ip = client_ip
+        self.headers = {**self.headers, **rate_limit_headers(rate_info)}
+        self._ticket = ticket
+        # open_answer_stream ya buscó la pregunta en el cache: el motor no repite la consulta
+        self._events = chat_engine.answer_stream(query, client_ip, snapshot, cached, checked_cache=True)
+        self._chunks = self._encode(rate_info)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _encode(self, rate_info: Dict[str, Any]) -> Iterator[bytes]:
+        try:
+            for event, value in self._events:
+                if event == 'intent':
+                    yield sse_event('intent', value)
+                elif event == 'answer':
+                    for text in split_answer(value.get('answer') or ''):
+                        yield sse_event('chunk', {"text": text})
+                    # Respuesta completa (mismo cuerpo que /ask) para quien no arme los trozos
+                    yield sse_event('done', body=value.render({"rate_limit_info": rate_info}))
+        except Exception:
+            logger.exception(f"Error streaming answer for client {self.client_ip}")
+            yield sse_event('error', {
+                "error": "Internal processing error",
+                "rate_limit_info": rate_info
+            })
+
+    def __iter__(self) -> 'AnswerStream':
+        return self
+
+    def __next__(self) -> bytes:
+        with self._lock:
+            if self._closed:
+                raise StopIteration
+            try:
+                ticket = self._ticket
+                if ticket is None:
+                    return next(self._chunks)
+                # Cada paso puede correr en otro hilo del executor
+                ticket.thread_id = threading.get_ident()
+                with activate(ticket.trace):
+                    return next(self._chunks)
+            except BaseException:
+                self._release()
+                raise
+
+    def _release(self) -> None:
+        self._closed = True
+        self._chunks.close()
+        self._events.close()
+        if self._ticket is not None:
+            processing_service.finish_processing(self._ticket)
+            self._ticket = None
+
+    def close(self) -> None:
+        """Detiene el procesamiento y libera el worker (idempotente)"""
+        with self._lock:
+            if not self._closed:
+                logger.info(f"Answer stream closed early for client {self.client_ip}")
+            self._release()
+
+
+def open_answer_stream(question: str, client_ip: str,
+                       rate_info: Dict[str, Any]) -> Union[HandlerResult, AnswerStream]:
+    """
+    Reserva un worker (salvo acierto de cache) y retorna el stream de la respuesta
+
+    Los rechazos del pool se responden como en /ask, antes de empezar el
+    stream, para que lleven su código HTTP. Es bloqueante mientras espera en cola.
+    La pregunta se analiza y se busca en el cache una sola vez.
+    """
+    query = chat_engine.analyze(question)
+    snapshot = chat_engine.current_snapshot()
+    cached = chat_engine.get_cached_response(query, snapshot)
+    if cached is not None:
+        return AnswerStream(query, snapshot, client_ip, rate_info, cached=cached)
+
+    try:
+        ticket = processing_service.start_processing(question)
+    except ProcessingQueueFullError as e:
+        logger.info(f"Stream rejected - processing queue full for client {client_ip}")
+        return queue_full_result(e.retry_after, rate_info)
+    except ProcessingTimeoutError:
+        logger.info(f"Stream timed out waiting for a worker for client {client_ip}")
+        return busy_result(rate_info)
+
+    return AnswerStream(query, snapshot, client_ip, rate_info, ticket)
+
+
+def cached_answer(query: AnalyzedQuery, rate_info: Dict[str, Any],
+                  snapshot: Optional[CatalogueSnapshot] = None) -> Optional[HandlerResult]:
+    """
+    Respuesta desde cache sin reservar worker, o None si no está cacheada
+
+    ``query`` sale de ``chat_engine.analyze`` y se reutiliza en ``answer_question``.
+    """
+    answer = chat_engine.get_cached_response(query, snapshot)
+    if answer is None:
+        return None
+    return _compiled_result(answer, rate_info, 'HIT')
+
+
+def unexpected_error(e: Exception) -> HandlerResult:
+    logger.exception("Unexpected error in ask_question endpoint")
+    return HandlerResult({
+        "error": "Error interno del servidor. Por favor, intenta de nuevo.",
+        "details": _error_details(e)
+    }, 500)
+
+
+def handle_ask(data: Any, client_ip: str) -> HandlerResult:
+    """Flujo completo y bloqueante de /ask"""
+    try:
+        rejected, rate_info = check_rate_limit(client_ip)
+        if rejected:
+            return rejected
+
+        rejected, question = parse_question(data)
+        if rejected:
+            return rejected
+
+        # Se analiza una vez: el cache y el procesamiento usan la misma consulta y snapshot
+        query = chat_engine.analyze(question)
+        snapshot = chat_engine.current_snapshot()
+        # Los aciertos de cache no necesitan worker
+        return cached_answer(query, rate_info, snapshot) or answer_question(query, client_ip, rate_info, snapshot)
+
+    except Exception as e:
+        return unexpected_error(e)
+
+
+def handle_ask_stream(data: Any, client_ip: str) -> Union[HandlerResult, AnswerStream]:
+    """Validación y reserva de /ask/stream; el stream se consume después"""
+    try:
+        rejected, rate_info = check_rate_limit(client_ip)
+        if rejected:
+            return rejected
+
+        rejected, question = parse_question(data)
+        if rejected:
+            return rejected
+
+        return open_answer_stream(question, client_ip, rate_info)
+
+    except Exception as e:
+        return unexpected_error(e)
+
+
+def handle_ask_batch(data: Any, client_ip: str) -> HandlerResult:
+    """Flujo completo y bloqueante de /ask/batch"""
+    try:
+        rejected, items = parse_batch(data)
+        if rejected:
+            return rejected
+
+        # Una sola carga al rate limiter por el total de preguntas válidas
+        weight = sum(1 for item in items if isinstance(item, str))
+        rejected, rate_info = check_rate_limit(client_ip, max(1, weight))
+        if rejected:
+            return rejected
+
+        return answer_batch(items, client_ip, rate_info)
+
+    except Exception as e:
+        return unexpected_error(e)
+
+
+def _register_service_metrics() -> None:
+    """Expone en /metrics los contadores y el estado de motor, cache, rate limiting y pool"""
+    def numeric(stats: Dict[str, Any], names) -> Dict[Tuple[str, ...], float]:
+        return {(name,): stats[name] for name in names if name in stats}
+
+    metrics.register_callback(
+        'chat_engine_events_total', 'Eventos del motor de chat', 'counter',
+        lambda: {(name,): value for name, value in chat_engine.stats.as_dict().items()}, ['event']
+    )
+    metrics.register_callback(
+        'chat_cache_operations_total', 'Operaciones del cache de respuestas', 'counter',
+        lambda: numeric(cache_service.get_stats(), ('hits', 'misses', 'expired_misses', 'evictions',
+                                                    'expirations', 'rejected_oversize')), ['result']
+    )
+    metrics.register_callback(
+        'chat_cache_entries', 'Entradas en el cache de respuestas', 'gauge',
+        lambda: cache_service.get_stats()['size']
+    )
+    metrics.register_callback(
+        'chat_cache_bytes', 'Bytes ocupados por el cache de respuestas', 'gauge',
+        lambda: cache_service.get_stats()['bytes']
+    )
+    metrics.register_callback(
+        'chat_rate_limit_requests_total', 'Solicitudes evaluadas por el rate limiter', 'counter',
+        lambda: numeric(rate_limit_service.get_stats(), ('total_requests', 'blocked_requests')), ['result']
+    )
+    metrics.register_callback(
+        'chat_rate_limit_active_clients', 'Clientes con actividad reciente en el rate limiter', 'gauge',
+        lambda: rate_limit_service.get_stats()['active_clients']
+    )
+    metrics.register_callback(
+        'chat_pool_in_flight', 'Consultas procesándose en el pool', 'gauge',
+        lambda: processing_service.get_current_status()['in_flight']
+    )
+    metrics.register_callback(
+        'chat_pool_queue_depth', 'Consultas esperando un worker del pool', 'gauge',
+        lambda: processing_service.get_current_status()['queue_depth']
+    )
+    metrics.register_callback(
+        'chat_pool_events_total', 'Resultados de la admisión al pool de procesamiento', 'counter',
+        lambda: numeric(processing_service.get_stats(), ('successful_processes', 'rejected_queue_full',
+                                                         'wait_timeouts', 'timeout_recoveries')), ['result']
+    )
+
+
+_register_service_metrics()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def handle_metrics() -> HandlerResult:
+    """Métricas en formato de texto de Prometheus"""
+    try:
+        return HandlerResult(None, body=metrics.render_prometheus().encode('utf-8'),
+                             content_type=PROMETHEUS_CONTENT_TYPE)
+
+    except Exception:
+        logger.exception("Error rendering metrics")
+        return HandlerResult({"error": "Error obteniendo métricas"}, 500)
+
+
+def check_admin_secret(provided: Optional[str]) -> Optional[HandlerResult]:
+    """
+    Valida el secreto de administración (``config.REBUILD_SECRET``)
+
+    Sin secreto configurado los endpoints de administración quedan
+    deshabilitados. La comparación es de tiempo constante.
+    """
+    if not config.REBUILD_SECRET:
+        return HandlerResult({"error": "Endpoint de administración deshabilitado"}, 403)
+    if not provided or not hmac.compare_digest(provided.encode('utf-8'), config.REBUILD_SECRET.encode('utf-8')):
+        logger.warning("Rejected admin request with invalid secret")
+        return HandlerResult({"error": "No autorizado"}, 401)
+    return None
+
+
+def handle_profile(args: Mapping[str, str], secret: Optional[str]) -> HandlerResult:
+    """
+    Perfila el proceso durante unos segundos y retorna pilas colapsadas
+
+    Es bloqueante durante toda la sesión; no ocupa un worker del pool.
+    """
+    rejected = check_admin_secret(secret)
+    if rejected:
+        return rejected
+
+    try:
+        seconds = float(args.get('seconds', 5))
+        interval = float(args.get('interval_ms', 5)) / 1000
+        include_idle = args.get('idle', '').lower() in ('1', 'true', 'yes')
+        if seconds <= 0 or interval <= 0:
+            raise ValueError
+    except ValueError:
+        return HandlerResult({"error": "Parámetros inválidos: seconds e interval_ms deben ser positivos"}, 400)
+
+    try:
+        result = profiler.profile(seconds, interval, include_idle)
+    except ProfilerBusyError:
+        return HandlerResult({"error": "Ya hay una sesión de perfilado en curso"}, 409)
+    except Exception:
+        logger.exception("Error running sampling profiler")
+        return HandlerResult({"error": "Error ejecutando el perfilador"}, 500)
+
+    summary = result.summary()
+    return HandlerResult(None, headers={
+        'X-Profile-Samples': str(summary['samples']),
+        'X-Profile-Duration': str(summary['duration']),
+        'X-Profile-Interval': str(summary['interval'])
+    }, body=result.collapsed().encode('utf-8'), content_type='text/plain; charset=utf-8')
+
+
+def handle_status() -> HandlerResult:
+    try:
+        return HandlerResult({
+            "processing_status": processing_service.get_current_status(),
+            "processing_stats": processing_service.get_stats(),
+            "system_health": chat_engine.get_health_status(),
+            "cache_stats": cache_service.get_stats(),
+            "rate_limit_stats": rate_limit_service.get_stats(),
+            "profiler_stats": profiler.get_stats()
+        })
+
+    except Exception as e:
+        logger.exception("Error getting chat status")
+        return HandlerResult({
+            "error": "Error obteniendo estado del sistema",
+            "details": _error_details(e)
+        }, 500)
+
+
+def handle_suggestions(args: Mapping[str, str]) -> HandlerResult:
+    try:
+        query = args.get('query', '').strip()
+        limit = min(int(args.get('limit', 5)), 10)  # Máximo 10
+
+        suggestions = chat_engine.get_suggestions(query, limit)
+
+        return HandlerResult({
+            "suggestions": suggestions,
+            "total": len(suggestions)
+        })
+
+    except Exception:
+        logger.exception("Error getting suggestions")
+        return HandlerResult({
+            "error": "Error obteniendo sugerencias",
+            "suggestions": []
+        }, 500)
+
+
+def handle_history(args: Mapping[str, str]) -> HandlerResult:
+    try:
+        limit = min(int(args.get('limit', 10)), 50)  # Máximo 50
+
+        history = processing_service.get_processing_history()
+        stats = processing_service.get_stats()
+
+        return HandlerResult({
+            "history": history[-limit:] if history else [],
+            "stats": stats,
+            "total_entries": len(history),
+            "slow_requests": slow_request_watchdog.get_entries(limit),
+            "slow_request_stats": slow_request_watchdog.get_stats()
+        })
+
+    except Exception:
+        logger.exception("Error getting processing history")
+        return HandlerResult({
+            "error": "Error obteniendo historial",
+            "history": [],
+            "stats": {},
+            "slow_requests": []
+        }, 500)
+
+
+def handle_cache_stats() -> HandlerResult:
+    try:
+        return HandlerResult(cache_service.get_cache_info())
+
+    except Exception:
+        logger.exception("Error getting cache stats")
+        return HandlerResult({
+            "error": "Error obteniendo estadísticas del cache",
+            "stats": {}
+        }, 500)
+
+
+def handle_cache_clear() -> HandlerResult:
+    try:
+        # En producción, aquí iría validación de token/autenticación
+        cache_service.clear()
+
+        logger.info("Cache cleared manually")
+        return HandlerResult({
+            "message": "Cache limpiado exitosamente",
+            "success": True
+        })
+
+    except Exception:
+        logger.exception("Error clearing cache")
+        return HandlerResult({
+            "error": "Error limpiando cache",
+            "success": False
+        }, 500)
@@ -1,23 +1,45 @@
 """
 Endpoints REST para el chat del Bot Asistente de Consultas
 """
-from flask import Blueprint, request, jsonify
-from typing import Dict, Any
+from flask import Blueprint, Response, g, request, jsonify
 import logging
+import time
 
-from src.models.schemas import ChatMessage, ChatResponse
-from src.services.cache_service import cache_service
-from src.services.rate_limit_service import rate_limit_service
-from src.services.processing_service import processing_lock_service
-from src.core.chat_engine import ChatEngine
+from src.api import chat_handlers
+from src.api.chat_handlers import HandlerResult
+from src.utils.metrics import observe_request
 
 logger = logging.getLogger(__name__)
 
 # Blueprint para las rutas del chat
 chat_bp = Blueprint('chat', __name__, url_prefix='/api/v1/chat')
 
-# Instancia del motor de chat
-chat_engine = ChatEngine()
+# Blueprint con /metrics en la raíz, como espera Prometheus; la app que registra
+# chat_bp debe registrar también este (async_app ya expone /metrics por su cuenta)
+metrics_bp = Blueprint('metrics', __name__)
+
+
+def _respond(result: HandlerResult):
+    """Convierte el resultado de un handler en respuesta Flask"""
+    if result.body is not None:
+        response = Response(result.body, content_type=result.content_type)
+    else:
+        response = jsonify(result.payload)
+    if result.headers:
+        response.headers.update(result.headers)
+    return response, result.status
+
+@chat_bp.before_request
+def _start_request_timer():
+    g.chat_request_start = time.perf_counter()
+
+@chat_bp.after_request
+def _record_request(response):
+    start = g.pop('chat_request_start', None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe_request(endpoint, request.method, response.status_code, time.perf_counter() - start)
+    return response
 
 @chat_bp.route('/ask', methods=['POST'])
 def ask_question():
@@ -36,81 +58,58 @@ def ask_question():
             "processing": bool,
             "error": "string" (opcional)
         }
+
+    Responde 503 con cabecera Retry-After solo si el pool y su cola están llenos;
+    si se vence la espera de un worker responde 200 con ``processing: true``.
+    """
+    return _respond(chat_handlers.handle_ask(request.get_json(silent=True), request.remote_addr or "unknown"))
+
+@chat_bp.route('/ask/stream', methods=['POST'])
+def ask_question_stream():
+    """
+    Variante de /ask que entrega la respuesta como Server-Sent Events
+    
+    Body:
+        {
+            "question": "string"
+        }
+    
+    Events:
+        intent: {"intent": "string", "category": "string", "cached": bool}
+        chunk:  {"text": "string"} (uno o más, concatenados forman "answer")
+        done:   la misma respuesta que /ask
+        error:  {"error": "string"}
+
+    Los rechazos (400, 429, 503) y la espera vencida de un worker se responden
+    en JSON como en /ask. Si el cliente se desconecta, el worker del pool se
+    libera de inmediato.
     """
-    try:
-        # Obtener IP del cliente
-        client_ip = request.remote_addr or "unknown"
-        
-        # Verificar rate limiting
-        allowed, rate_info = rate_limit_service.is_allowed(client_ip)
-        if not allowed:
-            logger.warning(f"Rate limit exceeded for client {client_ip}")
-            return jsonify({
-                "error": "Límite de solicitudes alcanzado. Intenta de nuevo en un minuto.",
-                "rate_limit_info": rate_info
-            }), 429
-        
-        # Validar datos de entrada
-        data = request.get_json(silent=True)
-        if not data:
-            return jsonify({
-                "error": "No se recibió ninguna pregunta. ¿En qué puedo ayudarte? 🤔"
-            }), 400
-        
-        try:
-            # Validar usando Pydantic
-            chat_message = ChatMessage(**data)
-            question = chat_message.question
-        except Exception as e:
-            return jsonify({
-                "error": "Pregunta inválida. Por favor, proporciona una pregunta válida."
-            }), 400
-        
-        # Verificar si el bot está procesando
-        if processing_lock_service.is_bot_processing():
-            logger.info(f"Request blocked - bot busy processing for client {client_ip}")
-            return jsonify({
-                "answer": "Estoy procesando tu consulta anterior, por favor espera un momento... ⏳",
-                "processing": True,
-                "rate_limit_info": rate_info
-            }), 200
-        
-        # Intentar iniciar procesamiento
-        if not processing_lock_service.start_processing(question):
-            return jsonify({
-                "answer": "Estoy ocupado en este momento, por favor intenta de nuevo en unos segundos... ⏳",
-                "processing": True,
-                "rate_limit_info": rate_info
-            }), 200
+    result = chat_handlers.handle_ask_stream(request.get_json(silent=True), request.remote_addr or "unknown")
+    if isinstance(result, HandlerResult):
+        return _respond(result)
+    return Response(result, mimetype='text/event-stream', headers=result.headers)
 
-        try:
-            # Procesar la pregunta
-            response = chat_engine.process_question(question, client_ip)
-            
-            # Agregar información de rate limiting
-            response["rate_limit_info"] = rate_info
-            
-            logger.info(f"Question processed successfully for client {client_ip}")
-            return jsonify(response), 200
-            
-        except Exception as e:
-            logger.exception(f"Error processing question for client {client_ip}")
-            return jsonify({
-                "answer": "Disculpa la interrupción. Estoy teniendo algunas dificultades técnicas. ¿Podrías intentarlo de nuevo en un momento? 🔄",
-                "error": "Internal processing error",
-                "rate_limit_info": rate_info
-            }), 500
-        
-        finally:
-            # Siempre liberar el bloqueo
-            processing_lock_service.finish_processing()
+@chat_bp.route('/ask/batch', methods=['POST'])
+def ask_batch():
+    """
+    Endpoint para hacer varias preguntas en una sola solicitud
+    
+    Body:
+        {
+            "questions": ["string", ...]  (máximo MAX_BATCH_QUESTIONS)
+        }
     
-    except Exception as e:
-        logger.exception("Unexpected error in ask_question endpoint")
-        return jsonify({
-            "error": "Error interno del servidor. Por favor, intenta de nuevo.",
-            "details": str(e) if logger.level == logging.DEBUG else None
-        }), 500
+    Returns:
+        {
+            "results": [respuesta de /ask o {"error": "string"}, ...],
+            "total": int,
+            "rate_limit_info": dict
+        }
+
+    Cada pregunta válida consume un cupo de rate limiting; las repetidas se
+    resuelven una sola vez. Pool lleno y espera vencida se tratan como en /ask.
+    """
+    return _respond(chat_handlers.handle_ask_batch(request.get_json(silent=True), request.remote_addr or "unknown"))
 
 @chat_bp.route('/status', methods=['GET'])
 def get_chat_status():
@@ -120,25 +119,32 @@ def get_chat_status():
     Returns:
         {
             "processing_status": dict,
+            "processing_stats": dict,
             "system_health": dict,
             "cache_stats": dict,
-            "rate_limit_stats": dict
+            "rate_limit_stats": dict,
+            "profiler_stats": dict
         }
     """
-    try:
-        return jsonify({
-            "processing_status": processing_lock_service.get_current_status(),
-            "system_health": chat_engine.get_health_status(),
-            "cache_stats": cache_service.get_stats(),
-            "rate_limit_stats": rate_limit_service.get_stats()
-        }), 200
+    return _respond(chat_handlers.handle_status())
+
+@chat_bp.route('/admin/profile', methods=['POST'])
+def profile_worker():
+    """
+    Perfila este worker por muestreo y retorna pilas colapsadas (flamegraph)
+    
+    Headers:
+        X-Admin-Secret: valor de REBUILD_SECRET (sin él, el endpoint está deshabilitado)
+    
+    Query Parameters:
+        - seconds (opcional): Duración del muestreo (default: 5, máximo PROFILER_MAX_SECONDS)
+        - interval_ms (opcional): Milisegundos entre muestras (default: 5)
+        - idle (opcional): Incluir hilos en espera (default: false)
     
-    except Exception as e:
-        logger.exception("Error getting chat status")
-        return jsonify({
-            "error": "Error obteniendo estado del sistema",
-            "details": str(e) if logger.level == logging.DEBUG else None
-        }), 500
+    Returns:
+        text/plain con líneas "hilo;modulo:funcion:linea;... muestras"
+    """
+    return _respond(chat_handlers.handle_profile(request.args, request.headers.get('X-Admin-Secret')))
 
 @chat_bp.route('/suggestions', methods=['GET'])
 def get_suggestions():
@@ -160,23 +166,7 @@ def get_suggestions():
             ]
         }
     """
-    try:
-        query = request.args.get('query', '').strip()
-        limit = min(int(request.args.get('limit', 5)), 10)  # Máximo 10
-        
-        suggestions = chat_engine.get_suggestions(query, limit)
-        
-        return jsonify({
-            "suggestions": suggestions,
-            "total": len(suggestions)
-        }), 200
-    
-    except Exception as e:
-        logger.exception("Error getting suggestions")
-        return jsonify({
-            "error": "Error obteniendo sugerencias",
-            "suggestions": []
-        }), 500
+    return _respond(chat_handlers.handle_suggestions(request.args))
 
 @chat_bp.route('/history', methods=['GET'])
 def get_processing_history():
@@ -196,28 +186,23 @@ def get_processing_history():
                     "timestamp": float
                 }
             ],
-            "stats": dict
+            "stats": dict,
+            "slow_requests": [
+                {
+                    "query": "string",
+                    "analyzed": dict,
+                    "current_stage": "string",
+                    "stages_ms": dict,
+                    "elapsed_at_capture": float,
+                    "duration": float,
+                    "completed": bool,
+                    "stack": ["string"]
+                }
+            ],
+            "slow_request_stats": dict
         }
     """
-    try:
-        limit = min(int(request.args.get('limit', 10)), 50)  # Máximo 50
-        
-        history = processing_lock_service.get_processing_history()
-        stats = processing_lock_service.get_stats()
-        
-        return jsonify({
-            "history": history[-limit:] if history else [],
-            "stats": stats,
-            "total_entries": len(history)
-        }), 200
-    
-    except Exception as e:
-        logger.exception("Error getting processing history")
-        return jsonify({
-            "error": "Error obteniendo historial",
-            "history": [],
-            "stats": {}
-        }), 500
+    return _respond(chat_handlers.handle_history(request.args))
 
 @chat_bp.route('/cache/stats', methods=['GET'])
 def get_cache_stats():
@@ -231,16 +216,7 @@ def get_cache_stats():
             "total_entries": int
         }
     """
-    try:
-        cache_info = cache_service.get_cache_info()
-        return jsonify(cache_info), 200
-    
-    except Exception as e:
-        logger.exception("Error getting cache stats")
-        return jsonify({
-            "error": "Error obteniendo estadísticas del cache",
-            "stats": {}
-        }), 500
+    return _respond(chat_handlers.handle_cache_stats())
 
 @chat_bp.route('/cache/clear', methods=['POST'])
 def clear_cache():
@@ -253,41 +229,27 @@ def clear_cache():
             "success": bool
         }
     """
-    try:
-        # En producción, aquí iría validación de token/autenticación
-        cache_service.clear()
-        
-        logger.info("Cache cleared manually")
-        return jsonify({
-            "message": "Cache limpiado exitosamente",
-            "success": True
-        }), 200
-    
-    except Exception as e:
-        logger.exception("Error clearing cache")
-        return jsonify({
-            "error": "Error limpiando cache",
-            "success": False
-        }), 500
+    return _respond(chat_handlers.handle_cache_clear())
 
 # Manejo de errores para el blueprint
 @chat_bp.errorhandler(404)
 def not_found(error):
-    return jsonify({
-        "error": "Endpoint no encontrado",
-        "message": "El endpoint solicitado no existe"
-    }), 404
+    return _respond(chat_handlers.NOT_FOUND)
 
 @chat_bp.errorhandler(405)
 def method_not_allowed(error):
-    return jsonify({
-        "error": "Método no permitido",
-        "message": "El método HTTP no está permitido para este endpoint"
-    }), 405
+    return _respond(chat_handlers.METHOD_NOT_ALLOWED)
 
 @chat_bp.errorhandler(500)
 def internal_error(error):
-    return jsonify({
-        "error": "Error interno del servidor",
-        "message": "Ha ocurrido un error interno. Por favor, intenta de nuevo."
-    }), 500
\ No newline at end of file
+    return _respond(chat_handlers.INTERNAL_ERROR)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Métricas en formato de texto de Prometheus
+
+    Histogramas por etapa del pipeline y por endpoint, contadores del motor y
+    gauges de cache, rate limiting y pool de procesamiento.
+    """
+    return _respond(chat_handlers.handle_metrics())
@@ -0,0 +1,129 @@
+"""
+Snapshot del catálogo y recarga en caliente para el Bot Asistente de Consultas
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def catalogue_version(*sources: Any) -> str:
+    """
+    Versión de los datos: hash del contenido cargado
+
+    Se calcula sobre lo que efectivamente se leyó (no sobre los archivos), así
+    que la versión siempre corresponde a los datos del snapshot. El mismo
+    contenido produce la misma versión en cualquier proceso, de modo que los
+    workers comparten entradas de cache mientras sus datos coincidan.
+    """
+    digest = hashlib.sha1()
+    for source in sources:
+        digest.update(json.dumps(source, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+
+class CatalogueSnapshot:
+    """
+    Vista inmutable del catálogo y de todo lo derivado de él.
+
+    Agrupa la base de conocimiento, los índices de búsqueda y las respuestas
+    compiladas de una misma versión. ``ChatEngine`` la reemplaza completa al
+    recargar, y cada solicitud trabaja sobre la que tomó al empezar.
+
+    ``version`` combina ``source_version`` (el contenido de los archivos) con
+    las ofertas vigentes: al llegar ``offers_expire_at`` (epoch de la
+    medianoche en que vence alguna) ``ChatEngine`` deriva un snapshot con la
+    respuesta de ofertas recompilada y una versión nueva.
+    """
+
+    __slots__ = ('version', 'source_version', 'offers_expire_at', 'loaded_at', 'data_loaded', 'knowledge',
+                 'stores', 'product_index', 'faq_retriever', 'semantic_index', 'compiled_answers',
+                 'intent_answers', 'price_answers', 'product_cards', 'store_cards')
+
+    def __init__(self, **fields: Any):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+        if self.loaded_at is None:
+            object.__setattr__(self, 'loaded_at', time.time())
+
+    def replace(self, **changes: Any) -> 'CatalogueSnapshot':
+        """Copia con algunos campos reemplazados"""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        fields.update(changes)
+        return CatalogueSnapshot(**fields)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("CatalogueSnapshot es inmutable")
+
+    def __repr__(self) -> str:
+        return f"CatalogueSnapshot(version={self.version!r})"
+
+
+class CatalogueWatcher:
+    """
+    Observa archivos por polling de mtime y tamaño, sin servicios externos.
+
+    Cuando alguno cambia invoca ``on_change`` desde su propio hilo, fuera del
+    camino de las solicitudes. ``on_change`` retorna si la recarga tuvo éxito:
+    si falló (por ejemplo, un JSON leído a medio escribir) la firma anterior se
+    conserva y la siguiente revisión vuelve a intentarlo.
+    """
+
+    def __init__(self, paths: Sequence[str], on_change: Callable[[], bool], interval: float):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.interval = interval
+        self._signature = self._stat_signature()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def _stat_signature(self) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        signature = []
+        for path in self.paths:
+            try:
+                st = os.stat(path)
+                signature.append((path, st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return signature
+
+    def check(self) -> bool:
+        """Revisa los archivos una vez; True si cambiaron (y se notificó)"""
+        signature = self._stat_signature()
+        if signature == self._signature:
+            return False
+        logger.info("Catalogue files changed, reloading")
+        if self.on_change():
+            self._signature = signature
+        else:
+            logger.warning("Catalogue reload failed, retrying on next check")
+        return True
+
+    def start(self) -> None:
+        """Inicia el hilo de polling (no hace nada si interval <= 0)"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="catalogue-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo de polling"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _watch_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Error in catalogue watcher")
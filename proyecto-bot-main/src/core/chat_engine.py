@@ -4,36 +4,177 @@ Motor de chat principal que integra todos los componentes del Bot Asistente de C
 import json
 import logging
 import random
-from typing import Dict, Any, List, Optional
+import threading
+import time
+from datetime import date
+from typing import Dict, Any, Iterator, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
 from config.settings import config
 from src.models.schemas import ChatResponse, Product, FAQ, Offer
 from src.core.intent_processor import IntentProcessor
+from src.core.catalogue import CatalogueSnapshot, CatalogueWatcher, catalogue_version
+from src.core.knowledge_base import CONTEXT_FILES, KnowledgeBase, OfferRecord, ProductRecord, StoreRecord
+from src.core.product_index import ProductIndex
+from src.core.faq_retriever import FAQRetriever
+from src.core.semantic_index import SemanticDocument, SemanticIndex, create_embedder
 from src.services.cache_service import cache_service
-from src.utils.text_utils import normalize_text, calculate_text_similarity
+from src.utils.analyzed_query import AnalyzedQuery, match_pattern
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.compiled_answer import CompiledAnswer
+from src.utils.metrics import STAGE_SECONDS, CounterSet
+from src.utils.request_trace import TracedStage, note_query
 
 logger = logging.getLogger(__name__)
 
+# Palabras clave de la búsqueda contextual; el orden define la prioridad
+CONTEXTUAL_KEYWORDS = {
+    'ofertas': ['oferta', 'ofertas', 'descuento', 'promocion'],
+    'precio': ['precio', 'costo', 'valor', 'cuanto'],
+    'tallas': ['talla', 'tallas', 'medida', 'size'],
+    'ubicacion': ['ubicacion', 'direccion', 'donde', 'tienda'],
+    'horarios': ['horario', 'horarios', 'abierto', 'cerrado'],
+    'devoluciones': ['devolucion', 'devoluciones', 'cambio', 'reembolso']
+}
+
+_CONTEXT_MATCHER = KeywordMatcher({
+    category: [match_pattern(keyword) for keyword in keywords]
+    for category, keywords in CONTEXTUAL_KEYWORDS.items()
+})
+
+# Histograma de duración por etapa del pipeline (expuesto en /metrics); cada
+# etapa también se acumula en la traza de la solicitud (watchdog de lentas)
+_STAGE = {
+    stage: TracedStage(stage, STAGE_SECONDS.labels(stage))
+    for stage in ('analyze', 'cache_lookup', 'intent', 'category', 'faq', 'product',
+                  'semantic', 'serialize', 'cache_store')
+}
+
 class ChatEngine:
-    """Motor principal del chat que coordina todos los componentes"""
+    """
+    Motor principal del chat que coordina todos los componentes
+
+    El catálogo y todo lo derivado de él vive en un ``CatalogueSnapshot``
+    inmutable. ``reload`` construye uno nuevo fuera del camino de las
+    solicitudes y lo reemplaza de forma atómica; cada solicitud usa el snapshot
+    vigente al empezar y las claves de cache llevan su versión, de modo que
+    nunca se sirven respuestas de datos anteriores.
+    """
     
     def __init__(self):
         """Inicializa el motor de chat"""
         self.intent_processor = IntentProcessor()
-        self.data = self._load_data()
+        self._embedder = None
+        self._embedder_loaded = False
+        self._reload_lock = threading.Lock()
+        self.snapshot = self._build_snapshot()
         self.suggestions = self._load_suggestions()
+        self.watcher: Optional[CatalogueWatcher] = None
         
-        # Estadísticas del motor
-        self.stats = {
-            'total_questions': 0,
-            'cache_hits': 0,
-            'successful_responses': 0,
-            'fallback_responses': 0
-        }
+        # Estadísticas del motor (contadores seguros entre hilos)
+        self.stats = CounterSet([
+            'total_questions',
+            'cache_hits',
+            'successful_responses',
+            'fallback_responses',
+            'catalogue_reloads',
+            'failed_reloads',
+            'batch_requests',
+            'batch_questions',
+            'batch_duplicates'
+        ])
         
         logger.info("ChatEngine initialized successfully")
     
+    def current_snapshot(self) -> CatalogueSnapshot:
+        """
+        Snapshot con el que atender una solicitud
+        
+        Si desde que se compiló venció alguna oferta, se deriva uno con la
+        respuesta de ofertas recompilada (y otra versión, así el cache no
+        sigue sirviendo la anterior) sin volver a cargar el catálogo.
+        """
+        snapshot = self.snapshot
+        if snapshot.offers_expire_at is not None and time.time() >= snapshot.offers_expire_at:
+            snapshot = self._refresh_offers()
+        return snapshot
+    
+    def _refresh_offers(self) -> CatalogueSnapshot:
+        with self._reload_lock:
+            snapshot = self.snapshot
+            if snapshot.offers_expire_at is None or time.time() < snapshot.offers_expire_at:
+                return snapshot
+            
+            offers = self._offers_fields(snapshot.knowledge, snapshot.source_version)
+            refreshed = snapshot.replace(
+                version=offers['version'],
+                offers_expire_at=offers['offers_expire_at'],
+                compiled_answers={**snapshot.compiled_answers, 'ofertas': offers['answer']}
+            )
+            self.snapshot = refreshed
+        
+        logger.info(f"Offers expired: version {snapshot.version} -> {refreshed.version}")
+        return refreshed
+    
+    def _source_paths(self) -> List[str]:
+        """Archivos de los que depende el snapshot"""
+        return [str(Path(config.DATA_FILE))] + [str(Path(config.CONTEXT_DIR) / name) for name in CONTEXT_FILES]
+    
+    def reload(self) -> bool:
+        """
+        Recarga el catálogo y reemplaza el snapshot de forma atómica
+        
+        Si la carga falla se conserva el snapshot anterior.
+        
+        Returns:
+            True si cambió la versión de los datos
+        """
+        swapped = self._swap_snapshot()
+        return swapped is not None and swapped[0].version != swapped[1].version
+    
+    def _swap_snapshot(self) -> Optional[Tuple[CatalogueSnapshot, CatalogueSnapshot]]:
+        """Construye y publica un snapshot nuevo; retorna (anterior, nuevo) o None si falló"""
+        with self._reload_lock:
+            try:
+                snapshot = self._build_snapshot()
+            except Exception:
+                self.stats.inc('failed_reloads')
+                logger.exception("Catalogue reload failed, keeping version %s", self.snapshot.version)
+                return None
+            
+            if not snapshot.data_loaded:
+                self.stats.inc('failed_reloads')
+                logger.error("Catalogue reload produced no data, keeping version %s", self.snapshot.version)
+                return None
+            
+            parse_errors = snapshot.knowledge.stats['parse_errors']
+            if parse_errors:
+                self.stats.inc('failed_reloads')
+                logger.error("Catalogue reload hit %d context file parse errors, keeping version %s",
+                             parse_errors, self.snapshot.version)
+                return None
+            
+            previous = self.snapshot
+            self.snapshot = snapshot
+            self.stats.inc('catalogue_reloads')
+        
+        logger.info(f"Catalogue reloaded: version {previous.version} -> {snapshot.version}")
+        return previous, snapshot
+    
+    def start_watcher(self, interval: float = None) -> None:
+        """Inicia la recarga automática cuando cambian los archivos del catálogo"""
+        interval = config.CATALOGUE_RELOAD_INTERVAL if interval is None else interval
+        if self.watcher is None:
+            # El watcher reintenta mientras la recarga falle, aunque los archivos no vuelvan a cambiar
+            self.watcher = CatalogueWatcher(self._source_paths(), lambda: self._swap_snapshot() is not None,
+                                            interval)
+        self.watcher.start()
+    
+    def stop_watcher(self) -> None:
+        """Detiene la recarga automática"""
+        if self.watcher is not None:
+            self.watcher.stop()
+    
     def _load_data(self) -> Dict[str, Any]:
         """Carga los datos del catálogo"""
         try:
@@ -55,6 +196,141 @@ class ChatEngine:
             logger.exception(f"Error loading data: {e}")
             return {}
     
+    def _build_snapshot(self) -> CatalogueSnapshot:
+        """Carga el catálogo y construye los índices y respuestas compiladas de esa versión"""
+        data = self._load_data()
+        knowledge = KnowledgeBase(config.CONTEXT_DIR, data)
+        # El diccionario solo se necesita para la versión: la base de conocimiento
+        # lo libera cuando termina de construir las secciones que dependen de él
+        source_version = catalogue_version(data, knowledge.fingerprint)
+        data_loaded = bool(data)
+        del data
+        
+        stores = knowledge.stores
+        product_index = ProductIndex(knowledge.products)
+        faq_retriever = FAQRetriever(knowledge.faqs)
+        offers = self._offers_fields(knowledge, source_version)
+        compiled = self._compile_answers(knowledge, product_index)
+        compiled['compiled_answers']['ofertas'] = offers['answer']
+        
+        return CatalogueSnapshot(
+            version=offers['version'],
+            source_version=source_version,
+            offers_expire_at=offers['offers_expire_at'],
+            data_loaded=data_loaded,
+            knowledge=knowledge,
+            stores=stores,
+            product_index=product_index,
+            faq_retriever=faq_retriever,
+            semantic_index=self._build_semantic_index(faq_retriever, product_index, stores),
+            **compiled
+        )
+    
+    def _offers_fields(self, knowledge: KnowledgeBase, source_version: str) -> Dict[str, Any]:
+        """Respuesta de ofertas vigentes hoy, versión que la incluye y momento en que vence"""
+        today = date.today()
+        ofertas = knowledge.active_offers(today.isoformat())
+        change_date = knowledge.offers_change_date(today.isoformat())
+        return {
+            'answer': CompiledAnswer(self._render_offers_answer(ofertas)),
+            'version': catalogue_version(source_version, ofertas),
+            # Medianoche local del día en que vence la primera oferta (active_offers usa la fecha local)
+            'offers_expire_at': (time.mktime(date.fromisoformat(change_date).timetuple())
+                                 if change_date else None)
+        }
+    
+    def _get_embedder(self):
+        """Crea el embedder una sola vez; se reutiliza en cada recarga"""
+        if not self._embedder_loaded:
+            self._embedder = create_embedder()
+            self._embedder_loaded = True
+        return self._embedder
+    
+    def _build_semantic_index(self, faq_retriever: FAQRetriever, product_index: ProductIndex,
+                              stores: Tuple[StoreRecord, ...]) -> Optional[SemanticIndex]:
+        """Embebe FAQs, productos y tiendas; None si no hay modelo de embeddings disponible"""
+        try:
+            embedder = self._get_embedder()
+            if embedder is None:
+                return None
+            
+            documents = [
+                SemanticDocument(f"faq:{i}", " ".join([faq.pregunta, *faq.palabras_clave]))
+                for i, faq in enumerate(faq_retriever.faqs)
+            ]
+            documents += [
+                SemanticDocument(f"product:{producto.id}", " ".join([
+                    producto.nombre, producto.descripcion, *producto.etiquetas
+                ]))
+                for producto in product_index.products
+            ]
+            documents += [
+                SemanticDocument(f"store:{tienda.id}", " ".join([
+                    tienda.nombre, tienda.direccion, tienda.referencias,
+                    *(servicio.nombre for servicio in tienda.servicios)
+                ]))
+                for tienda in stores
+            ]
+            
+            return SemanticIndex(embedder).build(documents)
+        
+        except Exception as e:
+            logger.exception(f"Error building semantic index: {e}")
+            return None
+    
+    def _compile_answers(self, knowledge: KnowledgeBase, product_index: ProductIndex) -> Dict[str, Any]:
+        """
+        Renderiza una sola vez las respuestas que solo dependen del catálogo
+
+        Se ejecuta al cargar el catálogo: los handlers retornan estas respuestas
+        ya codificadas en lugar de construirlas y serializarlas en cada solicitud.
+        """
+        # La respuesta de ofertas depende de la fecha: la agrega ``_offers_fields``
+        compiled_answers = {
+            'precio_general': CompiledAnswer({
+                "answer": "Nuestros precios van desde S/39.90 hasta S/259.90 dependiendo del producto. ¿Sobre qué producto específico te gustaría conocer el precio? Puedo ayudarte con camisetas, pantalones, casacas y más.",
+                "confidence": 0.7,
+                "category": "productos"
+            }),
+            'tallas': CompiledAnswer(self._render_size_guide_answer(knowledge)),
+            'ubicacion': CompiledAnswer(self._render_location_answer(knowledge)),
+            'horarios': CompiledAnswer(self._render_schedule_answer(knowledge)),
+            'devoluciones': CompiledAnswer({
+                "answer": "**Política de Devoluciones:**\n\n**Plazos:**\n• Tienda física: 15 días\n• Compras online: 30 días\n\n**Requisitos:**\n• Ticket de compra\n• Prenda sin usar y con etiquetas\n• DNI del comprador\n\n**Reembolso:** En la misma forma de pago original\n**Proceso express:** Máximo 20 minutos en tienda\n\n¿Necesitas hacer una devolución específica? ¡Puedo guiarte paso a paso!",
+                "confidence": 0.9,
+                "category": "politicas"
+            })
+        }
+        
+        # Respuestas de cada intención (se elige una al azar por solicitud)
+        intent_answers = {
+            intencion: [
+                CompiledAnswer({'answer': respuesta, 'intent': intencion, 'confidence': 1.0})
+                for respuesta in intent['respuestas']
+            ]
+            for intencion, intent in IntentProcessor.INTENCIONES.items()
+        }
+        # Las respuestas fijas de ubicación citan una dirección antigua: usar las tiendas reales
+        if knowledge.stores:
+            intent_answers['ubicacion'] = [
+                CompiledAnswer({**self._render_location_answer(knowledge), 'intent': 'ubicacion'})
+            ]
+        
+        # Fichas de productos y tiendas: el texto no depende de la pregunta
+        return {
+            'compiled_answers': compiled_answers,
+            'intent_answers': intent_answers,
+            'price_answers': {
+                producto.id: CompiledAnswer(self._render_price_answer(producto))
+                for producto in product_index.products
+            },
+            'product_cards': {
+                producto.id: self._render_product_card(producto)
+                for producto in product_index.products
+            },
+            'store_cards': {tienda.id: self._render_store_card(tienda) for tienda in knowledge.stores}
+        }
+    
     def _load_suggestions(self) -> List[Dict[str, str]]:
         """Carga las sugerencias predeterminadas"""
         return [
@@ -70,263 +346,585 @@ class ChatEngine:
             {"text": "Jeans disponibles", "category": "productos", "icon": "jeans"}
         ]
     
-    def process_question(self, question: str, client_id: str = "unknown") -> Dict[str, Any]:
+    @staticmethod
+    def _cache_key(query: AnalyzedQuery, snapshot: CatalogueSnapshot) -> str:
+        # La versión de los datos en la clave invalida las respuestas anteriores sin clear()
+        return f"q:{snapshot.version}:{query.normalized}"
+
+    def analyze(self, question: str) -> AnalyzedQuery:
         """
-        Procesa una pregunta del usuario y retorna la respuesta
+        Analiza la pregunta una sola vez para toda la solicitud
+
+        El resultado se pasa a ``get_cached_response`` y luego a ``answer`` o
+        ``answer_stream``, que no vuelven a normalizarla ni tokenizarla.
+        """
+        with _STAGE['analyze'].time():
+            query = AnalyzedQuery(question)
+        note_query(query)
+        return query
+
+    def get_cached_response(self, query: AnalyzedQuery,
+                            snapshot: Optional[CatalogueSnapshot] = None) -> Optional[CompiledAnswer]:
+        """
+        Retorna la respuesta cacheada para la pregunta, sin procesarla
+
+        Es una consulta barata: permite a los servidores responder los aciertos
+        de cache sin reservar un worker del pool. Recibe la pregunta ya
+        analizada con ``analyze``, que el llamador reutiliza en ``answer``.
+        """
+        with _STAGE['cache_lookup'].time():
+            cached_response = cache_service.get(self._cache_key(query, snapshot or self.current_snapshot()))
+        if cached_response is not None:
+            self.stats.inc('total_questions')
+            self.stats.inc('cache_hits')
+            logger.debug("Cache hit for question: %s...", query.raw[:50])
+        return cached_response
+
+    def answer(self, query: AnalyzedQuery, client_id: str = "unknown",
+               snapshot: Optional[CatalogueSnapshot] = None, checked_cache: bool = False) -> CompiledAnswer:
+        """
+        Procesa una pregunta del usuario y retorna la respuesta pre-serializada
         
         Args:
-            question: Pregunta del usuario
+            query: Pregunta del usuario analizada con ``analyze``
             client_id: ID del cliente (para logging y cache)
+            snapshot: Snapshot con el que se consultó el cache (por defecto el vigente)
+            checked_cache: True si el llamador ya buscó la pregunta con ``get_cached_response``
             
         Returns:
-            Dict con la respuesta del chat
+            CompiledAnswer con la respuesta del chat
         """
         try:
-            self.stats['total_questions'] += 1
-            question_normalized = normalize_text(question)
+            # Toda la solicitud trabaja sobre el mismo snapshot aunque haya una recarga en curso
+            snapshot = snapshot or self.current_snapshot()
+            # El llamador pudo analizarla antes de activar la traza del worker
+            note_query(query)
             
             # Verificar cache
-            cache_key = f"q:{question_normalized}"
-            cached_response = cache_service.get(cache_key)
-            if cached_response:
-                self.stats['cache_hits'] += 1
-                logger.debug(f"Cache hit for question: {question[:50]}...")
-                return cached_response
-            
-            # Usar el nuevo procesador de intenciones limpio
-            result = self.intent_processor.procesar_mensaje(question)
-            
-            # Si el procesador encontró una intención específica, usar su respuesta
-            if result['confidence'] >= 0.8:
-                response = result
-            else:
-                # Búsqueda contextual para consultas más complejas
-                response = self._search_contextual_response(question, result.get('intent'))
+            if not checked_cache:
+                cached_response = self.get_cached_response(query, snapshot)
+                if cached_response is not None:
+                    return cached_response
+
+            self.stats.inc('total_questions')
+            response = self._compute_answers(snapshot, [query])[0]
             
             # Cachear la respuesta
-            cache_service.set(cache_key, response)
+            with _STAGE['cache_store'].time():
+                cache_service.set(self._cache_key(query, snapshot), response)
             
-            self.stats['successful_responses'] += 1
-            logger.info(f"Question processed successfully: {question[:50]}...")
+            self.stats.inc('successful_responses')
+            logger.info(f"Question processed successfully: {query.raw[:50]}...")
             
             return response
             
         except Exception as e:
-            logger.exception(f"Error processing question: {question[:50]}...")
-            self.stats['fallback_responses'] += 1
-            
-            return {
-                "answer": "Disculpa, estoy teniendo problemas técnicos. ¿Podrías reformular tu pregunta?",
-                "confidence": 0.1,
-                "error": str(e) if config.DEBUG else None
+            logger.exception(f"Error processing question: {query.raw[:50]}...")
+            self.stats.inc('fallback_responses')
+            return self._error_answer(e)
+    
+    def answer_stream(self, query: AnalyzedQuery, client_id: str = "unknown",
+                      snapshot: Optional[CatalogueSnapshot] = None,
+                      cached_response: Optional[CompiledAnswer] = None,
+                      checked_cache: bool = False) -> Iterator[Tuple[str, Any]]:
+        """
+        Procesa una pregunta entregando eventos a medida que avanza el pipeline
+        
+        Emite primero ``('intent', {...})`` con la intención o categoría
+        detectada (antes de la búsqueda, que es la etapa costosa) y luego
+        ``('answer', CompiledAnswer)`` con la misma respuesta que ``answer``.
+        Si el consumidor cierra el generador entre eventos, no se procesa más.
+        
+        Args:
+            query: Pregunta del usuario analizada con ``analyze``
+            client_id: ID del cliente (para logging)
+            snapshot: Snapshot con el que se consultó el cache (por defecto el vigente)
+            cached_response: Respuesta que el llamador ya obtuvo de ``get_cached_response``
+            checked_cache: True si el llamador ya buscó la pregunta y no estaba en el cache
+        """
+        snapshot = snapshot or self.current_snapshot()
+        note_query(query)
+        
+        if cached_response is None and not checked_cache:
+            cached_response = self.get_cached_response(query, snapshot)
+        if cached_response is not None:
+            yield 'intent', {
+                "intent": cached_response.get('intent'),
+                "category": cached_response.get('category'),
+                "cached": True
             }
+            yield 'answer', cached_response
+            return
+        
+        self.stats.inc('total_questions')
+        try:
+            with _STAGE['intent'].time():
+                intencion = self.intent_processor.detectar_intencion(query)
+            if intencion:
+                category = snapshot.intent_answers[intencion][0].get('category')
+            else:
+                category = _CONTEXT_MATCHER.first_label(query.match_text)
+        except Exception as e:
+            logger.exception(f"Error processing question: {query.raw[:50]}...")
+            self.stats.inc('fallback_responses')
+            yield 'answer', self._error_answer(e)
+            return
+        
+        yield 'intent', {"intent": intencion, "category": category, "cached": False}
+        
+        try:
+            if intencion:
+                response = random.choice(snapshot.intent_answers[intencion])
+            else:
+                response = self._search_contextual_many(snapshot, [query])[0]
+                if not isinstance(response, CompiledAnswer):
+                    with _STAGE['serialize'].time():
+                        response = CompiledAnswer(response)
+            with _STAGE['cache_store'].time():
+                cache_service.set(self._cache_key(query, snapshot), response)
+            self.stats.inc('successful_responses')
+            logger.info(f"Question processed successfully: {query.raw[:50]}...")
+        except Exception as e:
+            logger.exception(f"Error processing question: {query.raw[:50]}...")
+            self.stats.inc('fallback_responses')
+            response = self._error_answer(e)
+        
+        yield 'answer', response
     
-
+    @staticmethod
+    def _error_answer(error: Exception) -> CompiledAnswer:
+        return CompiledAnswer({
+            "answer": "Disculpa, estoy teniendo problemas técnicos. ¿Podrías reformular tu pregunta?",
+            "confidence": 0.1,
+            "error": str(error) if config.DEBUG else None
+        })
     
-    def _search_contextual_response(self, question: str, intent = None) -> Dict[str, Any]:
-        """Busca una respuesta contextual basada en la pregunta"""
-        question_lower = question.lower()
+    def process_questions(self, questions: Sequence[str], client_id: str = "unknown") -> List[CompiledAnswer]:
+        """
+        Procesa un lote de preguntas y retorna sus respuestas pre-serializadas
+        
+        Las preguntas repetidas (misma forma normalizada) se resuelven una sola
+        vez, los aciertos de cache se leen con una sola consulta y las restantes
+        pasan juntas por cada etapa (intenciones, FAQs, productos, embeddings).
+        Un error en una pregunta solo afecta a su propia respuesta.
+        
+        Args:
+            questions: Preguntas del usuario
+            client_id: ID del cliente (para logging)
+            
+        Returns:
+            Lista de CompiledAnswer alineada con ``questions``
+        """
+        if not questions:
+            return []
+        
+        snapshot = self.current_snapshot()
+        unique: Dict[str, AnalyzedQuery] = {}
+        order: List[str] = []
+        with _STAGE['analyze'].time():
+            for question in questions:
+                query = AnalyzedQuery(question)
+                note_query(query)
+                unique.setdefault(query.normalized, query)
+                order.append(query.normalized)
+        
+        self.stats.inc('batch_requests')
+        self.stats.inc('batch_questions', len(questions))
+        self.stats.inc('batch_duplicates', len(questions) - len(unique))
+        self.stats.inc('total_questions', len(unique))
         
-        # Búsqueda de ofertas
-        if any(word in question_lower for word in ['oferta', 'ofertas', 'descuento', 'promocion']):
-            return self._handle_offers_query(question_lower)
+        cache_keys = {normalized: self._cache_key(query, snapshot) for normalized, query in unique.items()}
+        with _STAGE['cache_lookup'].time():
+            cached = cache_service.get_many(list(cache_keys.values()))
+        answers = {normalized: cached[key] for normalized, key in cache_keys.items() if key in cached}
+        self.stats.inc('cache_hits', len(answers))
         
-        # Búsqueda de productos por precio
-        if any(word in question_lower for word in ['precio', 'costo', 'valor', 'cuanto']):
-            return self._handle_price_query(question_lower)
+        pending = [query for normalized, query in unique.items() if normalized not in answers]
+        if pending:
+            try:
+                computed = [(response, True) for response in self._compute_answers(snapshot, pending)]
+            except Exception:
+                # Reintentar una por una para aislar la pregunta que falla
+                logger.exception(f"Error processing batch of {len(pending)} questions for client {client_id}")
+                computed = [self._compute_answer_safely(snapshot, query) for query in pending]
+            
+            fresh = {}
+            for query, (response, ok) in zip(pending, computed):
+                answers[query.normalized] = response
+                if ok:
+                    fresh[cache_keys[query.normalized]] = response
+            # Las respuestas de error no se cachean
+            with _STAGE['cache_store'].time():
+                cache_service.set_many(fresh)
+            self.stats.inc('successful_responses', len(fresh))
+        
+        logger.info(f"Batch of {len(questions)} questions processed for client {client_id} "
+                    f"({len(unique)} distinct, {len(unique) - len(pending)} cached)")
+        return [answers[normalized] for normalized in order]
+    
+    def _compute_answer_safely(self, snapshot: CatalogueSnapshot,
+                               query: AnalyzedQuery) -> Tuple[CompiledAnswer, bool]:
+        """Respuesta de una sola pregunta y si se resolvió sin errores"""
+        try:
+            return self._compute_answers(snapshot, [query])[0], True
+        except Exception as e:
+            logger.exception(f"Error processing question: {query.raw[:50]}...")
+            self.stats.inc('fallback_responses')
+            return self._error_answer(e), False
+    
+    def _compute_answers(self, snapshot: CatalogueSnapshot,
+                         queries: Sequence[AnalyzedQuery]) -> List[CompiledAnswer]:
+        """Resuelve preguntas ya analizadas, sin pasar por el cache"""
+        responses: List[Optional[CompiledAnswer]] = [None] * len(queries)
+        contextual: List[int] = []
         
-        # Búsqueda de tallas
-        if any(word in question_lower for word in ['talla', 'tallas', 'medida', 'size']):
-            return self._handle_size_query(question_lower)
+        for position, query in enumerate(queries):
+            # Si se detecta una intención específica, usar su respuesta precompilada
+            with _STAGE['intent'].time():
+                intencion = self.intent_processor.detectar_intencion(query)
+            if intencion:
+                responses[position] = random.choice(snapshot.intent_answers[intencion])
+            else:
+                contextual.append(position)
+        
+        if contextual:
+            # Búsqueda contextual para consultas más complejas
+            found = self._search_contextual_many(snapshot, [queries[position] for position in contextual])
+            with _STAGE['serialize'].time():
+                for position, response in zip(contextual, found):
+                    responses[position] = response if isinstance(response, CompiledAnswer) else CompiledAnswer(response)
         
-        # Búsqueda de ubicación/horarios
-        if any(word in question_lower for word in ['ubicacion', 'direccion', 'donde', 'tienda']):
-            return self._handle_location_query()
+        return responses
+    
+    def process_question(self, question: str, client_id: str = "unknown") -> Dict[str, Any]:
+        """
+        Procesa una pregunta del usuario y retorna la respuesta
         
-        if any(word in question_lower for word in ['horario', 'horarios', 'abierto', 'cerrado']):
-            return self._handle_schedule_query()
+        Args:
+            question: Pregunta del usuario
+            client_id: ID del cliente (para logging y cache)
+            
+        Returns:
+            Dict con la respuesta del chat (copia, se puede modificar)
+        """
+        return self.answer(self.analyze(question), client_id).to_dict()
+    
+    def _search_contextual_response(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery, intent = None) -> Union[CompiledAnswer, Dict[str, Any]]:
+        """Busca una respuesta contextual basada en la pregunta"""
+        return self._search_contextual_many(snapshot, [query])[0]
+    
+    def _search_contextual_many(self, snapshot: CatalogueSnapshot,
+                                queries: Sequence[AnalyzedQuery]) -> List[Union[CompiledAnswer, Dict[str, Any]]]:
+        """
+        Busca respuestas contextuales para varias preguntas
         
-        # Búsqueda de devoluciones
-        if any(word in question_lower for word in ['devolucion', 'devoluciones', 'cambio', 'reembolso']):
-            return self._handle_returns_query()
+        Cada etapa recibe juntas todas las preguntas que las anteriores no
+        resolvieron, así FAQs y embeddings se calculan en una sola operación
+        matricial por lote.
+        """
+        with _STAGE['category'].time():
+            results = [self._handle_category(snapshot, query) for query in queries]
         
         # Búsqueda en FAQs
-        faq_response = self._search_faqs(question_lower)
-        if faq_response:
-            return faq_response
+        pending = [position for position, result in enumerate(results) if result is None]
+        if pending:
+            with _STAGE['faq'].time():
+                found = snapshot.faq_retriever.search_many([queries[position] for position in pending])
+            for position, result in zip(pending, found):
+                results[position] = result
         
         # Búsqueda general de productos
-        product_response = self._search_products(question_lower)
-        if product_response:
-            return product_response
+        pending = [position for position, result in enumerate(results) if result is None]
+        if pending:
+            with _STAGE['product'].time():
+                for position in pending:
+                    results[position] = self._search_products(snapshot, queries[position])
+        
+        # Búsqueda semántica para preguntas parafraseadas
+        pending = [position for position, result in enumerate(results) if result is None]
+        if pending and snapshot.semantic_index is not None:
+            with _STAGE['semantic'].time():
+                found = self._search_semantic_many(snapshot, [queries[position] for position in pending])
+            for position, result in zip(pending, found):
+                results[position] = result
         
         # Respuesta de fallback
-        return self._generate_fallback_response(question)
+        return [
+            result if result is not None else self._generate_fallback_response(query)
+            for query, result in zip(queries, results)
+        ]
     
-    def _handle_offers_query(self, question: str) -> Dict[str, Any]:
-        """Maneja consultas sobre ofertas"""
-        ofertas = self.data.get('ofertas_actuales', [])
+    def _handle_category(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery) -> Optional[CompiledAnswer]:
+        """Respuesta de la categoría contextual de la pregunta, o None si no tiene una"""
+        # Una sola pasada sobre el texto para todas las categorías contextuales
+        category = _CONTEXT_MATCHER.first_label(query.match_text)
         
+        if category == 'ofertas':
+            return self._handle_offers_query(snapshot, query)
+        if category == 'precio':
+            return self._handle_price_query(snapshot, query)
+        if category == 'tallas':
+            return self._handle_size_query(snapshot, query)
+        if category == 'ubicacion':
+            return self._handle_location_query(snapshot)
+        if category == 'horarios':
+            return self._handle_schedule_query(snapshot)
+        if category == 'devoluciones':
+            return self._handle_returns_query(snapshot)
+        return None
+    
+    def _render_offers_answer(self, ofertas: Tuple[OfferRecord, ...]) -> Dict[str, Any]:
+        """Construye la respuesta con las ofertas vigentes del catálogo"""
         if not ofertas:
             return {
                 "answer": "En este momento no tenemos ofertas especiales, pero puedes consultar nuestros productos con los mejores precios siempre. 🛍️ ¿Te interesa alguna categoría en particular?",
                 "confidence": 0.8
             }
         
-        response = "**🎉 Nuestras ofertas actuales:**\n\n"
+        lines = ["**🎉 Nuestras ofertas actuales:**\n\n"]
         for oferta in ofertas:
-            response += f"• **{oferta['titulo']}**\n"
-            response += f"  {oferta['descripcion']}\n"
-            response += f"  Válido: {oferta.get('validez', 'Consultar términos')}\n\n"
+            lines.append(f"• **{oferta.titulo}**\n")
+            lines.append(f"  {oferta.descripcion}\n")
+            lines.append(f"  Válido: {oferta.validez or 'Consultar términos'}\n\n")
         
-        response += "¿Te interesa alguna oferta en particular? ¡Puedo darte más detalles! 😊"
+        lines.append("¿Te interesa alguna oferta en particular? ¡Puedo darte más detalles! 😊")
         
         return {
-            "answer": response.strip(),
+            "answer": "".join(lines).strip(),
             "confidence": 0.9,
             "category": "ofertas"
         }
     
-    def _handle_price_query(self, question: str) -> Dict[str, Any]:
-        """Maneja consultas sobre precios"""
-        productos = self.data.get('productos', [])
+    # Títulos de las tablas de la guía de tallas y de los tipos de día del horario
+    SIZE_CHART_TITLES = {'superior': 'Prendas superiores', 'pantalones': 'Pantalones'}
+    SCHEDULE_LABELS = (
+        ('lunes_viernes', 'Lunes a Viernes'),
+        ('sabado', 'Sábados'),
+        ('domingo', 'Domingos'),
+        ('feriados', 'Feriados')
+    )
+    
+    def _render_size_guide_answer(self, knowledge: KnowledgeBase) -> Dict[str, Any]:
+        """Construye la guía de tallas desde data/context/productos.json"""
+        lines = ["**Guía de Tallas:**\n\n"]
+        for tabla in knowledge.size_guide:
+            lines.append(f"**{self.SIZE_CHART_TITLES.get(tabla.tipo, tabla.tipo.capitalize())}:**\n")
+            for fila in tabla.filas:
+                medidas = ", ".join(f"{medida} {valor}" for medida, valor in fila.medidas)
+                lines.append(f"• {fila.talla}: {medidas}\n")
+            lines.append("\n")
         
-        # Buscar productos mencionados en la pregunta
-        mentioned_products = []
-        for producto in productos:
-            if any(word in question for word in producto['nombre'].lower().split()):
-                mentioned_products.append(producto)
+        if not knowledge.size_guide:
+            lines.append("Cada producto indica sus tallas disponibles en su ficha.\n\n")
         
-        if mentioned_products:
-            producto = mentioned_products[0]  # Tomar el primero
-            response = f"**{producto['nombre']}**\n\n"
-            response += f"Precio: **S/{producto['precio']:.2f}**\n"
-            response += f"Tallas disponibles: {', '.join(producto['tallas'])}\n"
-            response += f"Colores: {', '.join(producto['colores'])}\n\n"
-            response += "¿Te gustaría conocer más detalles o ver otros productos similares?"
-            
-            return {
-                "answer": response,
-                "confidence": 0.9,
-                "category": "productos",
-                "product_id": producto['id']
-            }
+        lines.append("Para ayudarte mejor, ¿podrías decirme qué tipo de prenda te interesa? Tengo información detallada sobre medidas específicas para cada producto.")
         
-        # Respuesta general sobre precios
-        return {
-            "answer": "Nuestros precios van desde S/39.90 hasta S/259.90 dependiendo del producto. ¿Sobre qué producto específico te gustaría conocer el precio? Puedo ayudarte con camisetas, pantalones, casacas y más.",
-            "confidence": 0.7,
-            "category": "productos"
-        }
-    
-    def _handle_size_query(self, question: str) -> Dict[str, Any]:
-        """Maneja consultas sobre tallas"""
         return {
-            "answer": "**Guía de Tallas:**\n\n**Prendas superiores:** S, M, L, XL\n**Pantalones:** 28, 30, 32, 34, 36\n\nPara ayudarte mejor, ¿podrías decirme qué tipo de prenda te interesa? Tengo información detallada sobre medidas específicas para cada producto. También ofrecemos servicio de ajustes sin costo adicional.",
+            "answer": "".join(lines),
             "confidence": 0.8,
             "category": "productos"
         }
     
-    def _handle_location_query(self) -> Dict[str, Any]:
-        """Maneja consultas sobre ubicación"""
+    def _render_location_answer(self, knowledge: KnowledgeBase) -> Dict[str, Any]:
+        """Construye la respuesta de ubicación con todas las tiendas"""
+        if not knowledge.stores:
+            return {
+                "answer": knowledge.message('no_disponible', "En este momento no tengo la información de nuestras tiendas."),
+                "confidence": 0.5,
+                "category": "tiendas"
+            }
+        
+        lines = ["**📍 Nuestras tiendas:**\n\n"]
+        for tienda in knowledge.stores:
+            lines.append(f"**{tienda.nombre}**\n{tienda.direccion}\n")
+            if tienda.referencias:
+                lines.append(f"{tienda.referencias}\n")
+            if tienda.facilidades:
+                lines.append(f"Facilidades: {', '.join(tienda.facilidades)}\n")
+            lines.append("\n")
+        
+        lines.append("¿Necesitas indicaciones específicas para llegar? 🗺️")
+        
         return {
-            "answer": "**📍 Nuestras tiendas:**\n\n**Tienda Principal**\nAv. Las Flores 123, Centro Comercial Plaza Mayor, Local 45, Lima\n\nFacilidades:\n• 🚗 Estacionamiento gratuito\n• ♿ Acceso para silla de ruedas\n• 👔 Probadores amplios\n• 📶 Wi-Fi gratuito\n\n¿Necesitas indicaciones específicas para llegar? 🗺️",
+            "answer": "".join(lines),
             "confidence": 0.9,
             "category": "tiendas"
         }
     
-    def _handle_schedule_query(self) -> Dict[str, Any]:
-        """Maneja consultas sobre horarios"""
+    def _render_schedule_answer(self, knowledge: KnowledgeBase) -> Dict[str, Any]:
+        """Construye la respuesta de horarios con el horario de cada tienda"""
+        if not knowledge.stores:
+            return {
+                "answer": knowledge.message('no_disponible', "En este momento no tengo la información de horarios."),
+                "confidence": 0.5,
+                "category": "tiendas"
+            }
+        
+        lines = ["**Horarios de atención:**\n\n"]
+        preferencial = ""
+        servicios = {}
+        for tienda in knowledge.stores:
+            lines.append(f"**{tienda.nombre}**\n")
+            for dia, etiqueta in self.SCHEDULE_LABELS:
+                if tienda.hours(dia):
+                    lines.append(f"{etiqueta}: {tienda.hours(dia)}\n")
+            lines.append("\n")
+            preferencial = preferencial or tienda.hours('horario_preferencial')
+            for servicio in tienda.servicios:
+                if servicio.horario and servicio.horario != 'Todo el día':
+                    servicios.setdefault(servicio.nombre, servicio.horario)
+        
+        if preferencial:
+            lines.append(f"**Horario preferencial** (adultos mayores y personas con discapacidad):\n{preferencial} todos los días\n\n")
+        if servicios:
+            detalle = ", ".join(f"{nombre} ({horario})" for nombre, horario in servicios.items())
+            lines.append(f"Algunos servicios tienen horarios especiales: {detalle}.")
+        
         return {
-            "answer": "**Horarios de atención:**\n\n**Lunes a Sábado:** 10:00 AM - 9:00 PM\n**Domingos:** 11:00 AM - 8:00 PM\n\n**Horario preferencial** (adultos mayores y personas con discapacidad):\n10:00 AM - 11:00 AM todos los días\n\n¿Hay algún servicio específico por el que consultas? Algunos servicios como sastrería tienen horarios especiales.",
+            "answer": "".join(lines).strip(),
             "confidence": 0.9,
             "category": "tiendas"
         }
     
-    def _handle_returns_query(self) -> Dict[str, Any]:
-        """Maneja consultas sobre devoluciones"""
+    def _handle_offers_query(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery) -> CompiledAnswer:
+        """Maneja consultas sobre ofertas"""
+        return snapshot.compiled_answers['ofertas']
+    
+    def _render_price_answer(self, producto: ProductRecord) -> Dict[str, Any]:
+        """Construye la respuesta de precio de un producto"""
+        response = f"**{producto.nombre}**\n\n"
+        response += f"Precio: **S/{producto.precio:.2f}**\n"
+        response += f"Tallas disponibles: {', '.join(producto.tallas)}\n"
+        response += f"Colores: {', '.join(producto.colores)}\n\n"
+        response += "¿Te gustaría conocer más detalles o ver otros productos similares?"
+        
         return {
-            "answer": "**Política de Devoluciones:**\n\n**Plazos:**\n• Tienda física: 15 días\n• Compras online: 30 días\n\n**Requisitos:**\n• Ticket de compra\n• Prenda sin usar y con etiquetas\n• DNI del comprador\n\n**Reembolso:** En la misma forma de pago original\n**Proceso express:** Máximo 20 minutos en tienda\n\n¿Necesitas hacer una devolución específica? ¡Puedo guiarte paso a paso!",
+            "answer": response,
             "confidence": 0.9,
-            "category": "politicas"
+            "category": "productos",
+            "product_id": producto.id
         }
     
-    def _search_faqs(self, question: str) -> Optional[Dict[str, Any]]:
-        """Busca en las preguntas frecuentes"""
-        faqs = self.data.get('faq', [])
+    def _handle_price_query(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery) -> CompiledAnswer:
+        """Maneja consultas sobre precios"""
+        # Buscar productos mencionados por nombre en la pregunta
+        mentioned_products = snapshot.product_index.search_terms(query.tokens, k=1, fields=('nombre',))
         
-        best_match = None
-        best_score = 0
+        if mentioned_products:
+            producto = mentioned_products[0][1]  # Tomar el más relevante
+            return snapshot.price_answers[producto.id]
         
-        for faq in faqs:
-            # Calcular similitud con la pregunta
-            score = calculate_text_similarity(question, faq['pregunta'].lower())
-            
-            # También buscar en palabras clave si existen
-            if 'palabras_clave' in faq:
-                for palabra in faq['palabras_clave']:
-                    if palabra.lower() in question:
-                        score += 0.3
-            
-            if score > best_score and score > 0.6:
-                best_score = score
-                best_match = faq
+        # Respuesta general sobre precios
+        return snapshot.compiled_answers['precio_general']
+    
+    def _handle_size_query(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery) -> CompiledAnswer:
+        """Maneja consultas sobre tallas"""
+        return snapshot.compiled_answers['tallas']
+    
+    def _handle_location_query(self, snapshot: CatalogueSnapshot) -> CompiledAnswer:
+        """Maneja consultas sobre ubicación"""
+        return snapshot.compiled_answers['ubicacion']
+    
+    def _handle_schedule_query(self, snapshot: CatalogueSnapshot) -> CompiledAnswer:
+        """Maneja consultas sobre horarios"""
+        return snapshot.compiled_answers['horarios']
+    
+    def _handle_returns_query(self, snapshot: CatalogueSnapshot) -> CompiledAnswer:
+        """Maneja consultas sobre devoluciones"""
+        return snapshot.compiled_answers['devoluciones']
+    
+    def _search_products(self, snapshot: CatalogueSnapshot, query: AnalyzedQuery) -> Optional[Dict[str, Any]]:
+        """Busca productos relevantes"""
+        matches = snapshot.product_index.search_terms(query.tokens, k=1, threshold=0.4)
         
-        if best_match:
-            return {
-                "answer": best_match['respuesta'],
-                "confidence": min(0.95, best_score),
-                "category": "faq",
-                "source": "FAQ"
-            }
+        if matches:
+            return self._format_product_answer(snapshot, matches[0][1], min(0.9, matches[0][0]))
         
         return None
     
-    def _search_products(self, question: str) -> Optional[Dict[str, Any]]:
-        """Busca productos relevantes"""
-        productos = self.data.get('productos', [])
+    def _render_product_card(self, producto: ProductRecord) -> str:
+        """Texto de la ficha de un producto"""
+        response = f"**{producto.nombre}**\n\n"
+        response += f"{producto.descripcion}\n\n"
+        response += f"Precio: **S/{producto.precio:.2f}**\n"
+        response += f"Tallas: {', '.join(producto.tallas)}\n"
+        response += f"Colores: {', '.join(producto.colores)}\n\n"
+        response += "¿Te gustaría más información sobre este producto o ver otros similares?"
+        return response
+    
+    def _format_product_answer(self, snapshot: CatalogueSnapshot, producto: ProductRecord,
+                               confidence: float) -> Dict[str, Any]:
+        """Construye la respuesta con la ficha de un producto"""
+        return {
+            "answer": snapshot.product_cards[producto.id],
+            "confidence": confidence,
+            "category": "productos",
+            "product_id": producto.id
+        }
+    
+    def _render_store_card(self, tienda: StoreRecord) -> str:
+        """Texto con la información de una tienda"""
+        response = f"**📍 {tienda.nombre}**\n\n"
+        response += f"{tienda.direccion}\n"
+        if tienda.referencias:
+            response += f"{tienda.referencias}\n"
+        if tienda.horario:
+            response += f"\n**Lunes a Viernes:** {tienda.hours('lunes_viernes')}\n"
+            response += f"**Domingos:** {tienda.hours('domingo')}\n"
+        servicios = [servicio.nombre for servicio in tienda.servicios]
+        if servicios:
+            response += f"\nServicios: {', '.join(servicios)}\n"
+        response += "\n¿Necesitas indicaciones específicas para llegar? 🗺️"
+        return response
+    
+    def _format_store_answer(self, snapshot: CatalogueSnapshot, tienda: StoreRecord,
+                             confidence: float) -> Dict[str, Any]:
+        """Construye la respuesta con la información de una tienda"""
+        return {
+            "answer": snapshot.store_cards[tienda.id],
+            "confidence": confidence,
+            "category": "tiendas",
+            "store_id": tienda.id
+        }
+    
+    def _search_semantic_many(self, snapshot: CatalogueSnapshot,
+                              queries: Sequence[AnalyzedQuery]) -> List[Optional[Dict[str, Any]]]:
+        """Busca el documento más cercano en el índice de embeddings para cada pregunta"""
+        if snapshot.semantic_index is None:
+            return [None] * len(queries)
         
-        matches = []
-        for producto in productos:
-            score = 0
-            
-            # Buscar en nombre
-            if any(word in question for word in producto['nombre'].lower().split()):
-                score += 0.5
-            
-            # Buscar en descripción
-            if any(word in question for word in producto['descripcion'].lower().split()):
-                score += 0.3
-            
-            # Buscar en etiquetas
-            for etiqueta in producto.get('etiquetas', []):
-                if etiqueta.lower() in question:
-                    score += 0.4
-            
-            if score > 0.4:
-                matches.append((score, producto))
+        # El modelo de embeddings recibe el texto original, con su puntuación y acentos
+        found = snapshot.semantic_index.search_many([query.raw for query in queries], k=1)
+        return [self._semantic_answer(snapshot, results) for results in found]
+    
+    def _semantic_answer(self, snapshot: CatalogueSnapshot,
+                         results: List[Tuple[float, str]]) -> Optional[Dict[str, Any]]:
+        """Convierte el mejor resultado del índice de embeddings en respuesta"""
+        if not results or results[0][0] < config.SEMANTIC_MATCH_THRESHOLD:
+            return None
         
-        if matches:
-            matches.sort(reverse=True, key=lambda x: x[0])
-            best_product = matches[0][1]
-            
-            response = f"**{best_product['nombre']}**\n\n"
-            response += f"{best_product['descripcion']}\n\n"
-            response += f"Precio: **S/{best_product['precio']:.2f}**\n"
-            response += f"Tallas: {', '.join(best_product['tallas'])}\n"
-            response += f"Colores: {', '.join(best_product['colores'])}\n\n"
-            response += "¿Te gustaría más información sobre este producto o ver otros similares?"
-            
+        score, doc_id = results[0]
+        kind, key = doc_id.split(":", 1)
+        confidence = min(0.9, score)
+        
+        if kind == "faq":
+            faq = snapshot.faq_retriever.faqs[int(key)]
             return {
-                "answer": response,
-                "confidence": min(0.9, matches[0][0]),
-                "category": "productos",
-                "product_id": best_product['id']
+                "answer": faq.respuesta,
+                "confidence": confidence,
+                "category": "faq",
+                "source": "semantic"
             }
+        if kind == "product":
+            producto = next(p for p in snapshot.product_index.products if p.id == key)
+            return self._format_product_answer(snapshot, producto, confidence)
+        if kind == "store":
+            tienda = next(t for t in snapshot.stores if t.id == key)
+            return self._format_store_answer(snapshot, tienda, confidence)
         
         return None
     
-    def _generate_fallback_response(self, question: str) -> Dict[str, Any]:
+    def _generate_fallback_response(self, query: AnalyzedQuery) -> Dict[str, Any]:
         """Genera una respuesta de fallback inteligente"""
         fallback_responses = [
             "Interesante pregunta. Para ayudarte mejor, ¿podrías ser más específico? Por ejemplo, ¿buscas información sobre productos, precios, tallas o servicios?",
@@ -361,24 +959,29 @@ class ChatEngine:
     
     def get_health_status(self) -> Dict[str, Any]:
         """Retorna el estado de salud del motor de chat"""
+        snapshot = self.current_snapshot()
         return {
             "status": "healthy",
-            "data_loaded": bool(self.data),
-            "total_products": len(self.data.get('productos', [])),
-            "total_faqs": len(self.data.get('faq', [])),
-            "total_offers": len(self.data.get('ofertas_actuales', [])),
+            "data_loaded": snapshot.data_loaded,
+            "data_version": snapshot.version,
+            "data_loaded_at": snapshot.loaded_at,
+            "total_products": len(snapshot.product_index.products),
+            "total_faqs": len(snapshot.faq_retriever.faqs),
+            "total_offers": len(snapshot.knowledge.active_offers()),
+            "knowledge_base": snapshot.knowledge.get_stats(),
             "intent_processor_ready": self.intent_processor is not None,
             "stats": self.get_stats()
         }
     
     def get_stats(self) -> Dict[str, Any]:
         """Retorna estadísticas del motor de chat"""
-        total = self.stats['total_questions']
-        cache_hit_rate = (self.stats['cache_hits'] / total * 100) if total > 0 else 0
-        success_rate = (self.stats['successful_responses'] / total * 100) if total > 0 else 0
+        stats = self.stats.as_dict()
+        total = stats['total_questions']
+        cache_hit_rate = (stats['cache_hits'] / total * 100) if total > 0 else 0
+        success_rate = (stats['successful_responses'] / total * 100) if total > 0 else 0
         
         return {
-            **self.stats,
+            **stats,
             'cache_hit_rate_percentage': round(cache_hit_rate, 2),
             'success_rate_percentage': round(success_rate, 2),
             'intent_stats': self.intent_processor.get_stats() if self.intent_processor else {}
@@ -0,0 +1,146 @@
+"""
+Recuperación de preguntas frecuentes con BM25 sobre matrices dispersas
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from config.settings import config
+from src.core.knowledge_base import FAQRecord
+from src.utils.analyzed_query import AnalyzedQuery
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.text_utils import normalize_many, tokenize
+
+logger = logging.getLogger(__name__)
+
+
+class FAQRetriever:
+    """
+    Motor BM25 construido una sola vez sobre las preguntas frecuentes.
+
+    Los pesos término-documento se guardan en formato CSR por término
+    (``indptr``/``docs``/``weights``), de modo que una consulta solo lee las filas
+    de sus propios términos. El puntaje BM25 se normaliza contra el puntaje de la
+    propia FAQ, quedando en [0, 1] como la antigua similitud textual, y cada
+    palabra clave presente en la consulta suma ``keyword_boost``.
+    """
+
+    def __init__(self, faqs: Sequence[FAQRecord], threshold: float = None,
+                 keyword_boost: float = None, k1: float = 1.5, b: float = 0.75):
+        self.faqs: Tuple[FAQRecord, ...] = tuple(faqs)
+        self.threshold = config.FAQ_MATCH_THRESHOLD if threshold is None else threshold
+        self.keyword_boost = config.FAQ_KEYWORD_BOOST if keyword_boost is None else keyword_boost
+        self.k1 = k1
+        self.b = b
+
+        self._build_matrix([tokenize(faq.pregunta, min_length=1) for faq in self.faqs])
+        self._keyword_matcher = KeywordMatcher({
+            str(position): normalize_many(faq.palabras_clave)
+            for position, faq in enumerate(self.faqs)
+        })
+
+        logger.info(f"FAQ retriever built: {len(self.faqs)} FAQs, {len(self.vocabulary)} términos")
+
+    def _build_matrix(self, documents: List[List[str]]) -> None:
+        """Calcula los pesos BM25 y los guarda como matriz dispersa término x documento"""
+        n_docs = len(documents)
+        lengths = np.array([len(doc) for doc in documents], dtype=np.float64)
+        avg_length = lengths.mean() if n_docs and lengths.sum() else 1.0
+
+        postings: Dict[str, Dict[int, int]] = {}
+        for position, doc in enumerate(documents):
+            for term in doc:
+                term_docs = postings.setdefault(term, {})
+                term_docs[position] = term_docs.get(position, 0) + 1
+
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(postings)}
+        indptr = [0]
+        docs: List[int] = []
+        weights: List[float] = []
+
+        for term, term_docs in postings.items():
+            df = len(term_docs)
+            idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+            for position, tf in term_docs.items():
+                norm = self.k1 * (1 - self.b + self.b * lengths[position] / avg_length)
+                docs.append(position)
+                weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            indptr.append(len(docs))
+
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.docs = np.array(docs, dtype=np.int64)
+        self.weights = np.array(weights, dtype=np.float64)
+
+        # Puntaje de cada FAQ contra sí misma, usado para normalizar a [0, 1]
+        self_scores = np.bincount(self.docs, weights=self.weights, minlength=n_docs)
+        self.self_scores = np.where(self_scores > 0, self_scores, 1.0)
+
+    def _score_matrix(self, questions: Sequence[AnalyzedQuery]) -> np.ndarray:
+        """Retorna la matriz consultas x FAQs con similitud BM25 normalizada más bonos"""
+        n_docs = len(self.faqs)
+        rows, cols, values = [], [], []
+
+        for row, question in enumerate(questions):
+            term_ids = {self.vocabulary[t] for t in question.token_set if t in self.vocabulary}
+            for term_id in term_ids:
+                start, end = self.indptr[term_id], self.indptr[term_id + 1]
+                cols.append(self.docs[start:end])
+                values.append(self.weights[start:end])
+                rows.append(np.full(end - start, row, dtype=np.int64))
+
+        flat_size = len(questions) * n_docs
+        if cols:
+            flat_index = np.concatenate(rows) * n_docs + np.concatenate(cols)
+            scores = np.bincount(flat_index, weights=np.concatenate(values), minlength=flat_size)
+        else:
+            scores = np.zeros(flat_size)
+        scores = np.minimum(1.0, scores.reshape(len(questions), n_docs) / self.self_scores)
+
+        for row, question in enumerate(questions):
+            matched = {(m.label, m.pattern) for m in self._keyword_matcher.find_all(question.normalized)}
+            for label, _ in matched:
+                scores[row, int(label)] += self.keyword_boost
+
+        return scores
+
+    def search(self, question: Union[str, AnalyzedQuery]) -> Optional[Dict[str, Any]]:
+        """Retorna la respuesta de la FAQ más similar o None si no supera el umbral"""
+        return self.search_many([question])[0]
+
+    def search_many(self, questions: Sequence[Union[str, AnalyzedQuery]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Busca la mejor FAQ para varias preguntas en una sola operación matricial
+
+        Args:
+            questions: Preguntas del usuario
+
+        Returns:
+            Lista alineada con ``questions``; cada elemento es la respuesta
+            (con su confianza) o None si ninguna FAQ supera el umbral
+        """
+        if not questions:
+            return []
+        if not self.faqs:
+            return [None] * len(questions)
+
+        scores = self._score_matrix([AnalyzedQuery.of(question) for question in questions])
+        best = scores.argmax(axis=1)
+        results: List[Optional[Dict[str, Any]]] = []
+
+        for row, position in enumerate(best):
+            score = float(scores[row, position])
+            if score <= self.threshold:
+                results.append(None)
+                continue
+            results.append({
+                "answer": self.faqs[position].respuesta,
+                "confidence": min(0.95, score),
+                "category": "faq",
+                "source": "FAQ"
+            })
+
+        return results
+
+    def __len__(self) -> int:
+        return len(self.faqs)
@@ -1,5 +1,8 @@
 import random
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple, Union
+
+from src.utils.analyzed_query import AnalyzedQuery, match_pattern
+from src.utils.keyword_matcher import KeywordMatcher
 
 class IntentProcessor:
     """Procesador de intenciones completamente limpio sin caracteres especiales"""
@@ -73,18 +76,25 @@ class IntentProcessor:
         }
     }
 
+    # Autómata sobre todos los patrones, construido una sola vez al importar el módulo
+    _matcher: Optional[KeywordMatcher] = None
+
     @staticmethod
-    def detectar_intencion(texto: str) -> Optional[str]:
+    def detectar_intencion(texto: Union[str, AnalyzedQuery]) -> Optional[str]:
         """Detecta la intencion del usuario basada en patrones simples"""
-        texto_lower = texto.lower().strip()
-        
-        # Buscar coincidencias directas
-        for intencion, data in IntentProcessor.INTENCIONES.items():
-            for patron in data['patrones']:
-                if patron in texto_lower:
-                    return intencion
+        query = AnalyzedQuery.of(texto)
         
-        return None
+        # La prioridad entre intenciones sigue el orden de INTENCIONES
+        return IntentProcessor._matcher.first_label(query.match_text)
+
+    @staticmethod
+    def detectar_intenciones(texto: Union[str, AnalyzedQuery]) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Retorna todas las intenciones detectadas con las posiciones de cada coincidencia
+
+        Las posiciones se refieren a ``AnalyzedQuery.match_text``.
+        """
+        return IntentProcessor._matcher.match_labels(AnalyzedQuery.of(texto).match_text)
 
     @staticmethod
     def obtener_respuesta(intencion: str) -> str:
@@ -106,4 +116,17 @@ class IntentProcessor:
             'answer': respuesta,
             'intent': intencion or 'general',
             'confidence': 1.0 if intencion else 0.5
-        }
\ No newline at end of file
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna información del procesador de intenciones"""
+        return {
+            'total_intents': len(self.INTENCIONES),
+            'total_patterns': sum(len(data['patrones']) for data in self.INTENCIONES.values())
+        }
+
+
+IntentProcessor._matcher = KeywordMatcher({
+    intencion: [match_pattern(patron) for patron in data['patrones']]
+    for intencion, data in IntentProcessor.INTENCIONES.items()
+})
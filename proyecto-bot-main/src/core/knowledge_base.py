@@ -0,0 +1,346 @@
+"""
+Base de conocimiento unificada para el Bot Asistente de Consultas
+
+Reúne ``catalogue.json`` y los archivos de ``config.CONTEXT_DIR`` (productos,
+guía de tallas, tiendas, ofertas, FAQs y mensajes rápidos) en un solo esquema
+validado con Pydantic. Cada sección se materializa la primera vez que se usa y
+se guarda como tuplas de registros compactos en lugar de diccionarios anidados.
+"""
+import hashlib
+import json
+import logging
+import sys
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+
+from src.models.schemas import FAQ, ContextOffer, Offer, Product, SizeGuide, Store
+
+logger = logging.getLogger(__name__)
+
+# Archivos de CONTEXT_DIR que componen la base de conocimiento
+CONTEXT_FILES = ('productos.json', 'tiendas.json', 'ofertas.json', 'faqs.json')
+
+# Nombre con el que las secciones declaran su dependencia del catálogo principal
+CATALOGUE_SOURCE = 'catalogue.json'
+
+
+class ProductRecord(NamedTuple):
+    id: str
+    nombre: str
+    descripcion: str
+    precio: float
+    categoria: str
+    tallas: Tuple[str, ...]
+    colores: Tuple[str, ...]
+    etiquetas: Tuple[str, ...]
+    destacado: bool
+
+
+class SizeRow(NamedTuple):
+    talla: str
+    medidas: Tuple[Tuple[str, str], ...]  # (medida, valor)
+
+
+class SizeChart(NamedTuple):
+    tipo: str
+    filas: Tuple[SizeRow, ...]
+
+
+class ServiceRecord(NamedTuple):
+    nombre: str
+    descripcion: str
+    horario: str
+
+
+class StoreRecord(NamedTuple):
+    id: str
+    nombre: str
+    direccion: str
+    telefono: str
+    horario: Tuple[Tuple[str, str], ...]  # (tipo de día, horas)
+    servicios: Tuple[ServiceRecord, ...]
+    facilidades: Tuple[str, ...]
+    referencias: str
+    medios_transporte: Tuple[str, ...]
+
+    def hours(self, dia: str) -> str:
+        """Horario de un tipo de día ('lunes_viernes', 'domingo', ...) o cadena vacía"""
+        return next((horas for nombre, horas in self.horario if nombre == dia), '')
+
+
+class OfferRecord(NamedTuple):
+    id: str
+    titulo: str
+    descripcion: str
+    validez: str
+    estado: str
+    fecha_fin: str  # AAAA-MM-DD; vacío si no vence por fecha
+    condiciones: Tuple[str, ...]
+
+
+class FAQRecord(NamedTuple):
+    pregunta: str
+    respuesta: str
+    categoria: str
+    palabras_clave: Tuple[str, ...]
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """Bytes ocupados por ``obj`` y todo lo que referencia (cada objeto se cuenta una vez)"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, (Mapping, MappingProxyType)):
+        return size + sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    if isinstance(obj, (tuple, list, set, frozenset)):
+        return size + sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def _product_record(product: Product) -> ProductRecord:
+    return ProductRecord(product.id, product.nombre, product.descripcion, product.precio,
+                         product.categoria.value, tuple(product.tallas), tuple(product.colores),
+                         tuple(product.etiquetas), product.destacado)
+
+
+def _store_record(store: Store) -> StoreRecord:
+    return StoreRecord(
+        store.id, store.nombre, store.direccion, store.telefono or '',
+        tuple(store.horario.items()),
+        tuple(ServiceRecord(s.nombre, s.descripcion, s.horario) for s in store.servicios),
+        tuple(store.facilidades), store.referencias or '', tuple(store.medios_transporte)
+    )
+
+
+class KnowledgeBase:
+    """
+    Vista unificada, validada y de solo lectura de todas las fuentes de datos.
+
+    Los archivos de contexto se leen como bytes al construirla (así la huella
+    identifica exactamente el contenido que se servirá), pero el parseo, la
+    validación y la construcción de registros de cada sección ocurren recién
+    al primer acceso. Cuando todas las secciones de un archivo están listas se
+    liberan sus bytes, y del mismo modo el diccionario del catálogo.
+    """
+
+    def __init__(self, context_dir: str, catalogue: Optional[Dict[str, Any]] = None):
+        self.context_dir = Path(context_dir)
+        self.catalogue = catalogue or {}
+        self._raw: Dict[str, bytes] = {}
+        for filename in CONTEXT_FILES:
+            path = self.context_dir / filename
+            try:
+                self._raw[filename] = path.read_bytes()
+            except OSError:
+                logger.warning(f"Context file not found: {path}")
+
+        self.fingerprint = self._fingerprint()
+        self._sections: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'sections_loaded': 0,
+            'invalid_records': 0,
+            'parse_errors': 0
+        }
+
+        # sección -> (fuentes de las que depende, constructor)
+        self._loaders: Dict[str, Tuple[Tuple[str, ...], Callable[[], Any]]] = {
+            'productos': ((CATALOGUE_SOURCE, 'productos.json'), self._load_products),
+            'guia_tallas': (('productos.json',), self._load_size_guide),
+            'tiendas': (('tiendas.json',), self._load_stores),
+            'ofertas': ((CATALOGUE_SOURCE, 'ofertas.json'), self._load_offers),
+            'faqs': ((CATALOGUE_SOURCE, 'faqs.json'), self._load_faqs),
+            'mensajes': (('faqs.json',), self._load_messages)
+        }
+
+    def _fingerprint(self) -> str:
+        digest = hashlib.sha1()
+        for filename in CONTEXT_FILES:
+            digest.update(filename.encode('utf-8'))
+            digest.update(self._raw.get(filename, b''))
+        return digest.hexdigest()[:12]
+
+    def _read(self, filename: str) -> Dict[str, Any]:
+        raw = self._raw.get(filename)
+        if raw is None:
+            return {}
+        try:
+            return json.loads(raw.decode('utf-8'))
+        except (ValueError, UnicodeDecodeError) as e:
+            self.stats['parse_errors'] += 1
+            logger.error(f"Error parsing context file {filename}: {e}")
+            return {}
+
+    def _validated(self, model: Type[BaseModel], items: Iterable[Dict[str, Any]], source: str) -> List[BaseModel]:
+        """Valida cada elemento; los inválidos se descartan con un warning"""
+        valid = []
+        for item in items:
+            try:
+                valid.append(model(**item))
+            except (ValidationError, TypeError) as e:
+                self.stats['invalid_records'] += 1
+                logger.warning(f"Invalid {model.__name__} in {source} skipped: {e}")
+        return valid
+
+    def section(self, name: str) -> Any:
+        """Retorna una sección, construyéndola en el primer acceso"""
+        try:
+            return self._sections[name]
+        except KeyError:
+            pass
+
+        sources, loader = self._loaders[name]
+        with self._lock:
+            if name not in self._sections:
+                self._sections[name] = loader()
+                self.stats['sections_loaded'] += 1
+                for source in sources:
+                    self._release(source)
+            return self._sections[name]
+
+    def _release(self, source: str) -> None:
+        """Libera una fuente cuando ya se construyeron todas las secciones que la usan"""
+        if not all(section in self._sections
+                   for section, (sources, _) in self._loaders.items() if source in sources):
+            return
+        if source == CATALOGUE_SOURCE:
+            self.catalogue = {}
+        else:
+            self._raw.pop(source, None)
+
+    # Secciones
+
+    @property
+    def products(self) -> Tuple[ProductRecord, ...]:
+        return self.section('productos')
+
+    @property
+    def size_guide(self) -> Tuple[SizeChart, ...]:
+        return self.section('guia_tallas')
+
+    @property
+    def stores(self) -> Tuple[StoreRecord, ...]:
+        return self.section('tiendas')
+
+    @property
+    def offers(self) -> Tuple[OfferRecord, ...]:
+        return self.section('ofertas')
+
+    @property
+    def faqs(self) -> Tuple[FAQRecord, ...]:
+        return self.section('faqs')
+
+    def message(self, key: str, default: str = '') -> str:
+        """Mensaje rápido ('saludo', 'despedida', 'no_disponible', 'derivacion')"""
+        return self.section('mensajes').get(key, default)
+
+    def active_offers(self, today: Optional[str] = None) -> Tuple[OfferRecord, ...]:
+        """Ofertas activas que no vencieron (``today`` en formato AAAA-MM-DD, por defecto hoy)"""
+        today = today or date.today().isoformat()
+        return tuple(
+            offer for offer in self.offers
+            if offer.estado == 'activa' and (not offer.fecha_fin or offer.fecha_fin >= today)
+        )
+
+    def offers_change_date(self, today: Optional[str] = None) -> Optional[str]:
+        """Primer día (AAAA-MM-DD) en que vence alguna de las ofertas activas hoy, o None"""
+        ends = []
+        for offer in self.active_offers(today):
+            try:
+                ends.append(date.fromisoformat(offer.fecha_fin))
+            except ValueError:
+                continue  # sin fecha de fin (o con una inválida): no vence por fecha
+        return (min(ends) + timedelta(days=1)).isoformat() if ends else None
+
+    def _load_products(self) -> Tuple[ProductRecord, ...]:
+        # El catálogo define los productos base; el contexto agrega o reemplaza por id
+        merged: Dict[str, ProductRecord] = {}
+        sources = (
+            ('catalogue.json', self.catalogue.get('productos', [])),
+            ('productos.json', self._read('productos.json').get('productos', []))
+        )
+        for source, items in sources:
+            for product in self._validated(Product, items, source):
+                merged[product.id] = _product_record(product)
+        return tuple(merged.values())
+
+    def _load_size_guide(self) -> Tuple[SizeChart, ...]:
+        tablas = self._read('productos.json').get('guia_tallas', {})
+        valid = self._validated(SizeGuide, [{'tablas': tablas}], 'productos.json')
+        if not valid:
+            return ()
+        return tuple(
+            SizeChart(tipo, tuple(SizeRow(talla, tuple(medidas.items())) for talla, medidas in filas.items()))
+            for tipo, filas in valid[0].tablas.items()
+        )
+
+    def _load_stores(self) -> Tuple[StoreRecord, ...]:
+        tiendas = self._read('tiendas.json').get('tiendas', [])
+        return tuple(_store_record(store) for store in self._validated(Store, tiendas, 'tiendas.json'))
+
+    def _load_offers(self) -> Tuple[OfferRecord, ...]:
+        offers = [
+            OfferRecord('', offer.titulo, offer.descripcion, offer.validez, 'activa', '',
+                        (offer.condiciones,) if offer.condiciones else ())
+            for offer in self._validated(Offer, self.catalogue.get('ofertas_actuales', []), 'catalogue.json')
+        ]
+
+        context = self._read('ofertas.json')
+        items = context.get('ofertas_activas', []) + context.get('proximas_ofertas', [])
+        offers += [
+            OfferRecord(offer.id, offer.titulo, offer.descripcion,
+                        f"Del {offer.fecha_inicio} al {offer.fecha_fin}", offer.estado, offer.fecha_fin,
+                        tuple(offer.condiciones))
+            for offer in self._validated(ContextOffer, items, 'ofertas.json')
+        ]
+        return tuple(offers)
+
+    def _load_faqs(self) -> Tuple[FAQRecord, ...]:
+        items = list(self.catalogue.get('faq', []))
+        for grupo in self._read('faqs.json').get('preguntas_frecuentes', []):
+            items += [{**faq, 'categoria': grupo.get('categoria', '')} for faq in grupo.get('preguntas', [])]
+
+        return tuple(
+            FAQRecord(faq.pregunta, faq.respuesta, faq.categoria, tuple(faq.palabras_clave))
+            for faq in self._validated(FAQ, items, 'faqs')
+        )
+
+    def _load_messages(self) -> Mapping[str, str]:
+        mensajes = self._read('faqs.json').get('mensajes_rapidos', {})
+        return MappingProxyType({str(key): str(value) for key, value in mensajes.items()})
+
+    def memory_usage(self) -> Dict[str, Dict[str, Any]]:
+        """Huella en memoria por sección (solo las ya cargadas ocupan espacio)"""
+        usage = {}
+        for name in self._loaders:
+            if name in self._sections:
+                records = self._sections[name]
+                usage[name] = {'loaded': True, 'records': len(records), 'bytes': deep_sizeof(records)}
+            else:
+                usage[name] = {'loaded': False, 'records': 0, 'bytes': 0}
+        usage['pending_raw'] = {
+            'loaded': False,
+            'records': len(self._raw),
+            'bytes': sum(len(raw) for raw in self._raw.values())
+        }
+        return usage
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas de la base de conocimiento"""
+        usage = self.memory_usage()
+        return {
+            **self.stats,
+            'fingerprint': self.fingerprint,
+            'total_bytes': sum(section['bytes'] for section in usage.values()),
+            'sections': usage
+        }
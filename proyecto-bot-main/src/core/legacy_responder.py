@@ -0,0 +1,186 @@
+"""
+Respondedor compilado del endpoint heredado /api/chat
+
+``app_optimized.py`` y ``fashion_store_complete.py`` reconstruían en cada
+solicitud un diccionario con todos los temas y sus respuestas y lo recorrían
+con búsquedas de subcadenas anidadas. Aquí los temas se compilan una sola vez
+en un autómata de palabras clave y cada respuesta queda pre-serializada; por
+solicitud solo se empalman ``conversation_id`` y ``timestamp``.
+
+Con ``LEGACY_CHAT_BACKEND=engine`` las preguntas se delegan a ``ChatEngine``,
+de modo que /api/chat usa el mismo cache e índices que /api/v1/chat/ask.
+"""
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from config.settings import config
+from src.utils.compiled_answer import CompiledAnswer
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.metrics import CounterSet
+
+logger = logging.getLogger(__name__)
+
+# Tema -> (palabras clave, respuesta). El orden define la prioridad y las
+# palabras clave se buscan como subcadenas del mensaje en minúsculas, igual
+# que en la versión anterior de los servidores.
+LEGACY_TOPICS: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    # Saludos
+    "saludos": (
+        ("hola", "buenos", "buenas", "hey", "hi", "saludo"),
+        "¡Hola! 👋 Bienvenido a Fashion Store. Soy tu asistente virtual y estoy aquí para ayudarte. ¿En qué puedo asistirte hoy?"
+    ),
+
+    # Productos
+    "productos": (
+        ("producto", "ropa", "catálogo", "qué venden", "artículos", "tienda"),
+        "🛍️ En Fashion Store tenemos una amplia colección:\n\n👗 Ropa para mujer (vestidos, blusas, pantalones)\n👔 Ropa para hombre (camisas, pantalones, chaquetas)\n👶 Ropa infantil\n👜 Accesorios (bolsos, cinturones, joyas)\n👠 Calzado\n💄 Cosméticos\n\n¿Te interesa alguna categoría en particular?"
+    ),
+
+    # Tallas
+    "tallas": (
+        ("talla", "tamaño", "medida", "size", "guía"),
+        "📏 **Guía de Tallas Fashion Store**\n\n**Mujer:**\nXS (32-34) | S (36-38) | M (40-42) | L (44-46) | XL (48-50)\n\n**Hombre:**\nS (36-38) | M (40-42) | L (44-46) | XL (48-50) | XXL (52-54)\n\n**Calzado:** Disponible del 35 al 45\n\n💡 ¿Necesitas ayuda con alguna prenda específica?"
+    ),
+
+    # Ofertas
+    "ofertas": (
+        ("oferta", "descuento", "promoción", "rebaja", "barato", "precio"),
+        "🔥 **¡Ofertas Especiales!**\n\n🎉 Hasta 50% OFF en artículos seleccionados\n💳 15% adicional pagando con tarjeta\n📦 Envío GRATIS en compras +$99\n👕 3x2 en camisetas básicas\n👗 20% OFF en nueva colección\n\n⏰ Ofertas válidas hasta fin de mes. ¿Te interesa alguna categoría?"
+    ),
+
+    # Envíos
+    "envios": (
+        ("envío", "delivery", "entrega", "shipping", "cuánto tarda", "enviar"),
+        "📦 **Información de Envíos**\n\n🚚 **Envío estándar:** 3-5 días hábiles ($15)\n⚡ **Envío express:** 1-2 días hábiles ($25)\n🆓 **Envío gratis:** En compras mayores a $99\n📍 **Cobertura:** Todo el país\n📱 **Tracking:** Seguimiento en tiempo real\n\n¿Necesitas calcular el envío para tu ubicación?"
+    ),
+
+    # Horarios
+    "horarios": (
+        ("horario", "hora", "abierto", "cerrado", "cuándo", "atención"),
+        "🕒 **Horarios de Atención**\n\n🏪 **Tienda física:**\nLunes a Sábado: 10:00 AM - 9:00 PM\nDomingos: 11:00 AM - 7:00 PM\n\n💻 **Tienda online:** 24/7\n\n📞 **Atención al cliente:**\nLunes a Viernes: 9:00 AM - 6:00 PM\n📧 Email: soporte@fashionstore.com"
+    ),
+
+    # Cambios y devoluciones
+    "cambios": (
+        ("cambio", "devolución", "devolver", "cambiar", "garantía", "return"),
+        "🔄 **Política de Cambios y Devoluciones**\n\n✅ **30 días** para cambios y devoluciones\n🏷️ Productos con **etiquetas originales**\n📄 **Comprobante** de compra requerido\n💰 **Reembolso completo** o cambio por otro producto\n🆓 **Sin costo** para cambios en tienda\n\n¿Necesitas hacer algún cambio?"
+    ),
+
+    # Contacto
+    "contacto": (
+        ("contacto", "teléfono", "email", "dirección", "ubicación", "dónde"),
+        "📞 **Contáctanos**\n\n📱 WhatsApp: +1 234-567-8900\n📧 Email: info@fashionstore.com\n🏪 Dirección: Av. Principal 123, Centro\n💬 Chat en vivo: Disponible 24/7\n📱 App móvil: Descárgala gratis\n\n¿Cómo prefieres que te contactemos?"
+    ),
+
+    # Pagos
+    "pagos": (
+        ("pago", "tarjeta", "efectivo", "transferencia", "cuotas", "financiación"),
+        "💳 **Métodos de Pago**\n\n💳 Tarjetas de crédito/débito (Visa, MasterCard)\n📱 Pago móvil (PayPal, Apple Pay, Google Pay)\n💰 Efectivo (solo en tienda)\n🏦 Transferencia bancaria\n📊 **Cuotas sin interés** hasta 12 meses\n\n¿Necesitas información sobre financiación?"
+    )
+}
+
+# Respuesta por defecto
+LEGACY_FALLBACK = """🤖 Hola, soy tu asistente virtual de Fashion Store. 
+
+Puedo ayudarte con:
+• 🛍️ Productos y catálogo
+• 📏 Guía de tallas
+• 🔥 Ofertas y promociones
+• 📦 Información de envíos
+• 🕒 Horarios de atención
+• 🔄 Cambios y devoluciones
+• 📞 Información de contacto
+
+¿En qué te puedo ayudar específicamente?"""
+
+INVALID_MESSAGE = CompiledAnswer({
+    "error": "Mensaje requerido",
+    "response": "Por favor, envía un mensaje válido."
+})
+
+SERVER_ERROR = CompiledAnswer({
+    "error": "Error del servidor",
+    "response": "Disculpa, ha ocurrido un error. Por favor intenta de nuevo."
+})
+
+SUGGESTIONS = CompiledAnswer({
+    "suggestions": [
+        {"text": "Ver ofertas del día 🔥", "action": "ofertas"},
+        {"text": "Guía de tallas 📏", "action": "tallas"},
+        {"text": "Información de envíos 📦", "action": "envios"},
+        {"text": "Horarios de atención 🕒", "action": "horarios"},
+        {"text": "Contactar soporte 📞", "action": "contacto"}
+    ]
+})
+
+
+def _success(text: str) -> CompiledAnswer:
+    return CompiledAnswer({"response": text, "status": "success"})
+
+
+class LegacyResponder:
+    """
+    Respuestas de /api/chat compiladas una sola vez por proceso
+
+    ``respond`` retorna el cuerpo JSON listo para escribir. En modo
+    ``engine`` el ``ChatEngine`` se crea en la primera pregunta, así los
+    servidores que no lo usan no cargan el catálogo.
+    """
+
+    def __init__(self, backend: str = None):
+        self.backend = backend or config.LEGACY_CHAT_BACKEND
+        self._matcher = KeywordMatcher({topic: keywords for topic, (keywords, _) in LEGACY_TOPICS.items()})
+        self._answers = {topic: _success(text) for topic, (_, text) in LEGACY_TOPICS.items()}
+        self._fallback = _success(LEGACY_FALLBACK)
+        self._engine = None
+        self._engine_lock = threading.Lock()
+        self.stats = CounterSet(['requests', 'topic_matches', 'fallbacks', 'engine_answers'])
+
+    @property
+    def engine(self):
+        """``ChatEngine`` al que se delegan las preguntas (modo ``engine``)"""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    from src.core.chat_engine import ChatEngine
+                    engine = ChatEngine()
+                    engine.start_watcher()
+                    self._engine = engine
+        return self._engine
+
+    def match(self, message: str) -> Optional[str]:
+        """Tema de mayor prioridad cuyas palabras clave aparecen en el mensaje"""
+        return self._matcher.first_label(message.strip().lower())
+
+    def answer(self, message: str) -> CompiledAnswer:
+        """Respuesta compilada (sin los campos propios de la solicitud)"""
+        self.stats.inc('requests')
+        if self.backend == 'engine':
+            self.stats.inc('engine_answers')
+            # El motor cachea su respuesta; solo se re-serializa el texto al formato heredado
+            return _success(self.engine.answer(self.engine.analyze(message)).get('answer') or LEGACY_FALLBACK)
+
+        topic = self.match(message)
+        if topic is None:
+            self.stats.inc('fallbacks')
+            return self._fallback
+        self.stats.inc('topic_matches')
+        return self._answers[topic]
+
+    def respond(self, message: str, conversation_id: int) -> bytes:
+        """Cuerpo JSON de /api/chat: respuesta, status, conversation_id y timestamp"""
+        # Un entero y una fecha ISO no necesitan escape: se empalman sin pasar por json
+        return b''.join((
+            self.answer(message).body[:-1],
+            b',"conversation_id":', str(int(conversation_id)).encode('ascii'),
+            b',"timestamp":"', datetime.datetime.now().isoformat().encode('ascii'), b'"}'
+        ))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats.as_dict(), 'backend': self.backend, 'topics': len(self._answers)}
+
+
+# Instancia global compartida por los servidores heredados
+legacy_responder = LegacyResponder()
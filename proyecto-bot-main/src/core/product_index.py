@@ -0,0 +1,106 @@
+"""
+Índice invertido de productos del catálogo para el Bot Asistente de Consultas
+"""
+import heapq
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from src.core.knowledge_base import ProductRecord
+from src.utils.analyzed_query import AnalyzedQuery
+from src.utils.text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Peso que aporta cada campo cuando la consulta coincide con él
+FIELD_WEIGHTS = {
+    'nombre': 0.5,
+    'descripcion': 0.3,
+    'etiquetas': 0.4
+}
+
+
+class ProductIndex:
+    """
+    Índice término -> lista de postings construido una vez al cargar el catálogo.
+
+    Cada posting es ``(producto, campo, etiqueta)``. El nombre y la descripción
+    puntúan una sola vez por producto; cada etiqueta puntúa por separado cuando
+    todos sus términos aparecen en la consulta.
+    """
+
+    def __init__(self, productos: Sequence[ProductRecord]):
+        self.products: Tuple[ProductRecord, ...] = tuple(productos)
+        self.postings: Dict[str, List[Tuple[int, str, int]]] = defaultdict(list)
+        # Número de términos de cada etiqueta: (producto, etiqueta) -> términos
+        self._tag_sizes: Dict[Tuple[int, int], int] = {}
+
+        for position, producto in enumerate(self.products):
+            self._index_product(position, producto)
+
+        self.postings = dict(self.postings)
+        logger.info(f"Product index built: {len(self.products)} productos, {len(self.postings)} términos")
+
+    def _index_product(self, position: int, producto: ProductRecord) -> None:
+        for field in ('nombre', 'descripcion'):
+            for term in set(tokenize(getattr(producto, field))):
+                self.postings[term].append((position, field, -1))
+
+        for tag_position, etiqueta in enumerate(producto.etiquetas):
+            terms = set(tokenize(etiqueta, min_length=1))
+            if not terms:
+                continue
+            self._tag_sizes[(position, tag_position)] = len(terms)
+            for term in terms:
+                self.postings[term].append((position, 'etiquetas', tag_position))
+
+    def search(self, question: Union[str, AnalyzedQuery], k: int = 1, threshold: float = 0.0,
+               fields: Optional[Iterable[str]] = None) -> List[Tuple[float, ProductRecord]]:
+        """
+        Busca los productos más relevantes para la consulta
+
+        Args:
+            question: Texto de la consulta o consulta ya analizada
+            k: Número máximo de resultados
+            threshold: Puntaje que un producto debe superar para ser incluido
+            fields: Restringe la búsqueda a estos campos (por defecto todos)
+
+        Returns:
+            Lista de tuplas (score, producto) ordenada por score descendente;
+            los empates conservan el orden del catálogo
+        """
+        return self.search_terms(AnalyzedQuery.of(question).tokens, k, threshold, fields)
+
+    def search_terms(self, terms: Iterable[str], k: int = 1, threshold: float = 0.0,
+                     fields: Optional[Iterable[str]] = None) -> List[Tuple[float, ProductRecord]]:
+        """Igual que ``search`` pero recibe los términos ya tokenizados"""
+        allowed_fields = set(fields) if fields is not None else None
+
+        # Solo se visitan los productos que comparten algún término con la consulta
+        matched_fields: Dict[int, set] = defaultdict(set)
+        matched_tag_terms: Dict[Tuple[int, int], int] = defaultdict(int)
+
+        for term in set(terms):
+            for position, field, tag_position in self.postings.get(term, ()):
+                if allowed_fields is not None and field not in allowed_fields:
+                    continue
+                if field == 'etiquetas':
+                    matched_tag_terms[(position, tag_position)] += 1
+                else:
+                    matched_fields[position].add(field)
+
+        scores: Dict[int, float] = defaultdict(float)
+        for position, product_fields in matched_fields.items():
+            scores[position] += sum(FIELD_WEIGHTS[field] for field in product_fields)
+        for tag_key, count in matched_tag_terms.items():
+            if count == self._tag_sizes[tag_key]:
+                scores[tag_key[0]] += FIELD_WEIGHTS['etiquetas']
+
+        candidates = (
+            (score, -position) for position, score in scores.items() if score > threshold
+        )
+        best = heapq.nlargest(k, candidates)
+        return [(score, self.products[-neg_position]) for score, neg_position in best]
+
+    def __len__(self) -> int:
+        return len(self.products)
@@ -0,0 +1,232 @@
+"""
+Recuperación semántica local basada en embeddings para el Bot Asistente de Consultas
+"""
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config.settings import config
+from src.utils.text_utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticDocument(NamedTuple):
+    """Documento indexable: identificador estable y texto a embeber"""
+    doc_id: str
+    text: str
+
+
+class HashingEmbedder:
+    """
+    Embeddings deterministas por feature hashing de palabras y trigramas.
+
+    No requiere modelo ni red; sirve como reemplazo en tests y en entornos
+    donde el modelo de sentence-transformers no está disponible.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for word in normalize_text(text).split():
+            features.append(word)
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Retorna una matriz (len(texts), dim) de vectores L2-normalizados"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                vectors[row, value % self.dim] += 1.0 if value >> 63 else -1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms > 0, norms, 1.0)
+
+
+class SentenceTransformerEmbedder:
+    """Embeddings de sentence-transformers cargados solo desde la caché local del modelo"""
+
+    def __init__(self, model_name: str, cache_folder: Optional[str] = None):
+        # Nunca descargar: el modelo debe estar previamente en la caché local
+        os.environ.setdefault('HF_HUB_OFFLINE', '1')
+        os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, cache_folder=cache_folder, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        """Retorna una matriz (len(texts), dim) de vectores L2-normalizados"""
+        vectors = self.model.encode(
+            list(texts), batch_size=32, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+        return vectors.astype(np.float32)
+
+
+def create_embedder(backend: str = None):
+    """
+    Crea el embedder configurado
+
+    Args:
+        backend: 'auto', 'sentence-transformers', 'hashing' o 'none'
+            (por defecto config.EMBEDDING_BACKEND)
+
+    Returns:
+        El embedder, o None si la recuperación semántica queda deshabilitada
+    """
+    backend = (backend or config.EMBEDDING_BACKEND).lower()
+
+    if backend == 'none':
+        return None
+    if backend == 'hashing':
+        return HashingEmbedder()
+
+    try:
+        return SentenceTransformerEmbedder(config.EMBEDDING_MODEL, config.EMBEDDING_CACHE_DIR or None)
+    except Exception as e:
+        if backend != 'auto':
+            raise
+        logger.warning(f"Embedding model '{config.EMBEDDING_MODEL}' not available locally, "
+                       f"semantic search disabled: {e}")
+        return None
+
+
+class SemanticIndex:
+    """
+    Índice de vecinos más cercanos sobre vectores persistidos en disco.
+
+    Los vectores se guardan bajo ``index_dir`` en un archivo nombrado por la
+    huella de los documentos y se abren con memory-map; solo se recalculan
+    cuando cambian el modelo o los documentos. ``manifest.json`` indica qué
+    archivo corresponde a sus ``doc_ids``: reemplazarlo es el único paso que
+    publica un índice nuevo, así otro worker nunca combina un manifiesto con
+    vectores de otra versión.
+    """
+
+    def __init__(self, embedder, index_dir: Path = None):
+        self.embedder = embedder
+        self.index_dir = Path(index_dir or Path(config.CHROMA_DB_PATH) / "semantic_index")
+        self.doc_ids: Tuple[str, ...] = ()
+        self.vectors: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+
+    def _fingerprint(self, documents: Sequence[SemanticDocument]) -> str:
+        digest = hashlib.sha256(self.embedder.name.encode('utf-8'))
+        for doc in documents:
+            digest.update(f"\n{doc.doc_id}\t{doc.text}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def build(self, documents: Sequence[SemanticDocument]) -> 'SemanticIndex':
+        """Carga los vectores desde disco o los calcula y persiste si están desactualizados"""
+        fingerprint = self._fingerprint(documents)
+        if self._load(fingerprint):
+            logger.info(f"Semantic index loaded from {self.index_dir} ({len(self.doc_ids)} documentos)")
+            return self
+
+        vectors = self.embedder.encode([doc.text for doc in documents]) if documents else \
+            np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.doc_ids = tuple(doc.doc_id for doc in documents)
+        self.vectors = vectors
+
+        try:
+            vectors_path = self._persist(vectors, fingerprint)
+            self.vectors = np.load(vectors_path, mmap_mode='r')
+        except OSError as e:
+            logger.warning(f"Could not persist semantic index to {self.index_dir}: {e}")
+
+        logger.info(f"Semantic index built with {self.embedder.name} ({len(self.doc_ids)} documentos)")
+        return self
+
+    def _load(self, fingerprint: str) -> bool:
+        """Abre los vectores persistidos si el manifiesto coincide con ``fingerprint`` y con su forma"""
+        try:
+            with open(self.index_dir / "manifest.json", 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('fingerprint') != fingerprint:
+                return False
+            doc_ids = tuple(manifest['doc_ids'])
+            vectors = np.load(self.index_dir / manifest['vectors'], mmap_mode='r')
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+
+        if vectors.shape != (len(doc_ids), manifest.get('dim')):
+            logger.warning(f"Semantic index in {self.index_dir} does not match its manifest "
+                           f"({vectors.shape} vs {len(doc_ids)} documentos), rebuilding")
+            return False
+
+        self.doc_ids = doc_ids
+        self.vectors = vectors
+        return True
+
+    def _persist(self, vectors: np.ndarray, fingerprint: str) -> Path:
+        """
+        Escribe los vectores y luego el manifiesto que los referencia
+
+        Ambos se escriben en archivos temporales y se publican con replace; el
+        archivo de vectores lleva la huella en el nombre, así el replace del
+        manifiesto es el punto de commit. Retorna la ruta de los vectores.
+        """
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        vectors_name = f"vectors-{fingerprint[:16]}.npy"
+        tmp_vectors = self.index_dir / f"vectors.{os.getpid()}.tmp.npy"
+        tmp_manifest = self.index_dir / f"manifest.{os.getpid()}.tmp"
+
+        np.save(tmp_vectors, np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(tmp_manifest, 'w', encoding='utf-8') as f:
+            json.dump({
+                'model': self.embedder.name,
+                'dim': int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+                'fingerprint': fingerprint,
+                'vectors': vectors_name,
+                'doc_ids': list(self.doc_ids)
+            }, f)
+
+        os.replace(tmp_vectors, self.index_dir / vectors_name)
+        os.replace(tmp_manifest, self.index_dir / "manifest.json")
+        self._remove_stale(vectors_name)
+        return self.index_dir / vectors_name
+
+    def _remove_stale(self, current: str) -> None:
+        """Borra vectores de versiones anteriores (un worker que aún los lee reconstruye su índice)"""
+        for path in [*self.index_dir.glob("vectors-*.npy"), self.index_dir / "vectors.npy"]:
+            if path.name != current:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def search(self, query: str, k: int = 1) -> List[Tuple[float, str]]:
+        """Retorna los k documentos más cercanos como tuplas (score coseno, doc_id)"""
+        return self.search_many([query], k)[0]
+
+    def search_many(self, queries: Sequence[str], k: int = 1) -> List[List[Tuple[float, str]]]:
+        """Busca vecinos para varias consultas con un solo producto matricial"""
+        if not queries:
+            return []
+        if not self.doc_ids:
+            return [[] for _ in queries]
+
+        scores = self.embedder.encode(queries) @ np.asarray(self.vectors).T
+        k = min(k, len(self.doc_ids))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = sorted(candidates, key=lambda col: -scores[row, col])
+            results.append([(float(scores[row, col]), self.doc_ids[col]) for col in ordered])
+        return results
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
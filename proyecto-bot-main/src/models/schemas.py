@@ -14,6 +14,7 @@ class ProductCategory(str, Enum):
     POLOS = "Polos"
     CAMISAS = "Camisas"
     SACOS = "Sacos"
+    JEANS = "Jeans"
 
 class Product(BaseModel):
     """Modelo para productos"""
@@ -48,6 +49,38 @@ class Offer(BaseModel):
     condiciones: Optional[str] = Field(None, description="Condiciones de la oferta")
     exclusiones: Optional[str] = Field(None, description="Exclusiones")
 
+class ContextOffer(BaseModel):
+    """Modelo para ofertas de data/context/ofertas.json"""
+    id: str = Field(..., description="ID de la oferta")
+    titulo: str = Field(..., description="Título de la oferta")
+    descripcion: str = Field(..., description="Descripción de la oferta")
+    fecha_inicio: str = Field(..., description="Inicio de vigencia (AAAA-MM-DD)")
+    fecha_fin: str = Field(..., description="Fin de vigencia (AAAA-MM-DD)")
+    estado: str = Field(default="activa", description="Estado: activa, programada, ...")
+    condiciones: List[str] = Field(default_factory=list, description="Condiciones de la oferta")
+
+class StoreService(BaseModel):
+    """Modelo para servicios ofrecidos en tienda"""
+    nombre: str = Field(..., description="Nombre del servicio")
+    descripcion: str = Field(default="", description="Descripción del servicio")
+    horario: str = Field(default="", description="Horario del servicio")
+
+class Store(BaseModel):
+    """Modelo para tiendas físicas"""
+    id: str = Field(..., description="ID único de la tienda")
+    nombre: str = Field(..., description="Nombre de la tienda")
+    direccion: str = Field(..., description="Dirección")
+    telefono: Optional[str] = Field(None, description="Teléfono")
+    horario: Dict[str, str] = Field(default_factory=dict, description="Horario por tipo de día")
+    servicios: List[StoreService] = Field(default_factory=list, description="Servicios en tienda")
+    facilidades: List[str] = Field(default_factory=list, description="Facilidades")
+    referencias: Optional[str] = Field(None, description="Referencias para llegar")
+    medios_transporte: List[str] = Field(default_factory=list, description="Cómo llegar")
+
+class SizeGuide(BaseModel):
+    """Modelo para la guía de tallas: tipo de prenda -> talla -> medida -> valor"""
+    tablas: Dict[str, Dict[str, Dict[str, str]]] = Field(..., description="Tablas de medidas")
+
 class Policy(BaseModel):
     """Modelo para políticas"""
     tipo: str = Field(..., description="Tipo de política")
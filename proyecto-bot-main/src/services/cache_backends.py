@@ -0,0 +1,562 @@
+"""
+Backends de almacenamiento para el servicio de cache del Bot Asistente de Consultas
+"""
+import time
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Sequence, Tuple, List
+import logging
+
+from src.utils.compiled_answer import CompiledAnswer
+
+logger = logging.getLogger(__name__)
+
+# Los valores serializados mayores a este tamaño se comprimen con zlib
+COMPRESSION_THRESHOLD = 512
+
+# Overhead aproximado por entrada (tupla, nodo del OrderedDict y del heap)
+ENTRY_OVERHEAD = 200
+
+
+def encode_value(value: Any) -> bytes:
+    """
+    Serializa un valor de forma compacta (comprimido si es grande)
+
+    Las ``CompiledAnswer`` se guardan con su cuerpo JSON tal cual, sin volver a serializarlas.
+    """
+    if isinstance(value, CompiledAnswer):
+        payload, marker = value.body, b'a'
+    else:
+        payload, marker = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), b'j'
+    if len(payload) > COMPRESSION_THRESHOLD:
+        return marker.upper() + zlib.compress(payload, 6)
+    return marker + payload
+
+
+def entry_size(key: str, value: Any) -> int:
+    """
+    Bytes que ocupa una entrada para la contabilidad del cache
+
+    Se cuenta el tamaño serializado de clave y valor (el cuerpo ya codificado en
+    el caso de ``CompiledAnswer``) más un overhead fijo por entrada.
+    """
+    if isinstance(value, CompiledAnswer):
+        value_size = len(value.body)
+    elif isinstance(value, (bytes, bytearray)):
+        value_size = len(value)
+    else:
+        value_size = len(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    return ENTRY_OVERHEAD + len(key.encode('utf-8')) + value_size
+
+
+def decode_value(blob: bytes) -> Any:
+    """Operación inversa de ``encode_value``"""
+    marker, payload = blob[:1], blob[1:]
+    if marker.isupper():
+        payload = zlib.decompress(payload)
+    if marker.lower() == b'a':
+        return CompiledAnswer.from_body(payload)
+    return json.loads(payload.decode('utf-8'))
+
+
+class CacheBackend(ABC):
+    """Interfaz común de los almacenes usados por CacheService"""
+
+    name = "abstract"
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Retorna el valor vigente o None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Guarda un valor con su TTL"""
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Retorna {clave: valor} solo para las claves vigentes"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Guarda varios valores con el mismo TTL"""
+        for key, value in items.items():
+            self.set(key, value, ttl)
+
+    @abstractmethod
+    def delete(self, key: str) -> bool:
+        """Elimina una clave; True si existía"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Elimina todas las entradas"""
+
+    @abstractmethod
+    def cleanup_expired(self, max_entries: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Elimina entradas vencidas
+
+        Retorna (eliminadas, pendientes): ``pendientes`` es True si la pasada se
+        cortó por ``max_entries`` y puede quedar trabajo para otro lote.
+        """
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Contadores: hits, misses, expired_misses, evictions, expirations, size, bytes"""
+
+    @abstractmethod
+    def sample_entries(self, limit: int) -> List[Tuple[str, float, float, str]]:
+        """Muestra de entradas como (clave, creado, vence, tipo del valor)"""
+
+
+class CacheSegment:
+    """
+    Segmento LRU independiente con su propio lock, heap de vencimientos y estadísticas.
+
+    Cada entrada guarda su propio vencimiento y su tamaño en bytes (``entry_size``);
+    el segmento desaloja por LRU hasta quedar dentro de ``max_bytes``. El heap
+    permite limpiar en O(expiradas · log n) sin recorrer el segmento; las entradas
+    del heap que quedaron obsoletas (claves reescritas o eliminadas) se descartan
+    al salir de él.
+    """
+
+    def __init__(self, max_bytes: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        # clave -> (creado, vence, valor, bytes)
+        self.entries: OrderedDict[str, Tuple[float, float, Any, int]] = OrderedDict()
+        self.expiry_heap: List[Tuple[float, int, str]] = []
+        self.bytes_used = 0
+        self._sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired_misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'rejected_oversize': 0
+        }
+
+    def _lookup(self, key: str, current_time: float) -> Optional[Any]:
+        """Busca una clave; debe llamarse con el lock tomado"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.stats['misses'] += 1
+            return None
+
+        if current_time >= entry[1]:
+            del self.entries[key]
+            self.bytes_used -= entry[3]
+            self.stats['misses'] += 1
+            self.stats['expired_misses'] += 1
+            self.stats['expirations'] += 1
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Cache key expired for key '%s'", key)
+            return None
+
+        # Mover al final (LRU)
+        self.entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[2]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            return self._lookup(key, time.time())
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Busca varias claves tomando el lock una sola vez"""
+        found = {}
+        with self.lock:
+            current_time = time.time()
+            for key in keys:
+                value = self._lookup(key, current_time)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        size = entry_size(key, value)
+        evicted = []
+        with self.lock:
+            if size > self.max_bytes:
+                self.stats['rejected_oversize'] += 1
+                logger.debug("Cache value for key '%s' exceeds segment budget (%s bytes)", key, size)
+                return
+
+            current_time = time.time()
+            expires_at = current_time + (self.default_ttl if ttl is None else ttl)
+            heapq.heappush(self.expiry_heap, (expires_at, next(self._sequence), key))
+
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes_used -= previous[3]
+
+            # Eliminar los menos usados hasta que la nueva entrada quepa
+            while self.entries and self.bytes_used + size > self.max_bytes:
+                oldest_key, oldest = self.entries.popitem(last=False)
+                self.bytes_used -= oldest[3]
+                self.stats['evictions'] += 1
+                evicted.append(oldest_key)
+
+            self.entries[key] = (current_time, expires_at, value, size)
+            self.bytes_used += size
+
+        if logger.isEnabledFor(logging.DEBUG):
+            for oldest_key in evicted:
+                logger.debug("Cache evicted key '%s'", oldest_key)
+            logger.debug("Cache set for key '%s'", key)
+
+    def delete(self, key: str) -> bool:
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return False
+            self.bytes_used -= entry[3]
+            return True
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+            self.expiry_heap.clear()
+            self.bytes_used = 0
+
+    def cleanup_expired(self, max_entries: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Elimina entradas vencidas revisando solo el tope del heap
+
+        ``max_entries`` limita las entradas del heap revisadas, incluidas las
+        obsoletas; retorna (eliminadas, True si el límite cortó la pasada).
+        """
+        with self.lock:
+            current_time = time.time()
+            heap = self.expiry_heap
+            removed = 0
+            checked = 0
+            limited = False
+
+            while heap and heap[0][0] <= current_time:
+                if max_entries is not None and checked >= max_entries:
+                    limited = True
+                    break
+                expires_at, _, key = heapq.heappop(heap)
+                checked += 1
+
+                # Solo eliminar si la entrada vigente es la que venció
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] == expires_at:
+                    del self.entries[key]
+                    self.bytes_used -= entry[3]
+                    removed += 1
+
+            self.stats['expirations'] += removed
+            return removed, limited
+
+    def snapshot_stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                **self.stats,
+                'size': len(self.entries),
+                'bytes': self.bytes_used,
+                'pending_expiry_entries': len(self.expiry_heap)
+            }
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Almacén en memoria del proceso, repartido por hash entre segmentos con lock propio.
+
+    El presupuesto de ``max_bytes`` se reparte en partes iguales entre los
+    segmentos. Con ``shards=1`` se comporta como un LRU global. Las estadísticas
+    se agregan solo al consultarlas.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int, default_ttl: float, shards: int = 1):
+        self.shards = max(1, shards)
+        segment_bytes = max(1, max_bytes // self.shards)
+        self.segments = [CacheSegment(segment_bytes, default_ttl) for _ in range(self.shards)]
+
+    def _segment(self, key: str) -> CacheSegment:
+        return self.segments[hash(key) % self.shards]
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._segment(key).get(key)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        # Agrupar por segmento: un lock por segmento en lugar de uno por clave
+        by_segment: Dict[int, List[str]] = {}
+        for key in dict.fromkeys(keys):
+            by_segment.setdefault(hash(key) % self.shards, []).append(key)
+
+        found = {}
+        for index, segment_keys in by_segment.items():
+            found.update(self.segments[index].get_many(segment_keys))
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._segment(key).set(key, value, ttl)
+
+    def delete(self, key: str) -> bool:
+        return self._segment(key).delete(key)
+
+    def clear(self) -> None:
+        for segment in self.segments:
+            segment.clear()
+
+    def cleanup_expired(self, max_entries: Optional[int] = None) -> Tuple[int, bool]:
+        removed = 0
+        pending = False
+        for segment in self.segments:
+            segment_removed, segment_pending = segment.cleanup_expired(max_entries)
+            removed += segment_removed
+            pending = pending or segment_pending
+        return removed, pending
+
+    def stats(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for segment in self.segments:
+            for name, value in segment.snapshot_stats().items():
+                totals[name] = totals.get(name, 0) + value
+        totals['shards'] = self.shards
+        return totals
+
+    def sample_entries(self, limit: int) -> List[Tuple[str, float, float, str]]:
+        sample = []
+        for segment in self.segments:
+            with segment.lock:
+                entries = list(itertools.islice(segment.entries.items(), limit - len(sample)))
+            sample.extend(
+                (key, created_at, expires_at, type(value).__name__)
+                for key, (created_at, expires_at, value, _) in entries
+            )
+            if len(sample) >= limit:
+                break
+        return sample
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Almacén compartido entre procesos en un archivo SQLite en modo WAL.
+
+    Todos los workers del mismo host que apuntan al mismo archivo ven las mismas
+    entradas, de modo que un ``clear`` o ``delete`` en cualquiera de ellos aplica a
+    todos. Los valores se guardan serializados con ``encode_value``. Las lecturas
+    no escriben: el desalojo por capacidad es por antigüedad de inserción hasta
+    quedar dentro de ``max_bytes`` (tamaño de clave y valor almacenados) y se
+    aplica cada ``EVICTION_CHECK_INTERVAL`` escrituras de cada proceso.
+    """
+
+    name = "sqlite"
+    EVICTION_CHECK_INTERVAL = 64
+
+    def __init__(self, path: str, max_bytes: int, default_ttl: float):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._writes_since_eviction = 0
+        # Contadores locales a este proceso; el tamaño se lee del archivo compartido
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'expired_misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (expires_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_cache_created ON cache_entries (created_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo (y por proceso, tras un fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += amount
+
+    def get(self, key: str) -> Optional[Any]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            self._count('misses')
+            return None
+
+        if time.time() >= row[1]:
+            connection.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at = ?", (key, row[1]))
+            with self._stats_lock:
+                self._stats['misses'] += 1
+                self._stats['expired_misses'] += 1
+                self._stats['expirations'] += 1
+            return None
+
+        self._count('hits')
+        return decode_value(row[0])
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            blob = encode_value(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Value for cache key '{key}' is not serializable, skipping: {e}")
+            return
+
+        current_time = time.time()
+        expires_at = current_time + (self.default_ttl if ttl is None else ttl)
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+            (key, sqlite3.Binary(blob), current_time, expires_at)
+        )
+
+        with self._stats_lock:
+            self._writes_since_eviction += 1
+            check_capacity = self._writes_since_eviction >= self.EVICTION_CHECK_INTERVAL
+            if check_capacity:
+                self._writes_since_eviction = 0
+        if check_capacity:
+            self._evict_over_capacity(connection)
+
+    # Límite de parámetros por consulta en SQLite antiguos (SQLITE_MAX_VARIABLE_NUMBER)
+    MAX_BATCH_PARAMS = 500
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        connection = self._connection()
+        keys = list(dict.fromkeys(keys))
+        current_time = time.time()
+        found: Dict[str, Any] = {}
+        expired: List[Tuple[str, float]] = []
+
+        for start in range(0, len(keys), self.MAX_BATCH_PARAMS):
+            chunk = keys[start:start + self.MAX_BATCH_PARAMS]
+            rows = connection.execute(
+                f"SELECT key, value, expires_at FROM cache_entries WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            for key, value, expires_at in rows:
+                if current_time >= expires_at:
+                    expired.append((key, expires_at))
+                else:
+                    found[key] = decode_value(value)
+
+        if expired:
+            connection.executemany("DELETE FROM cache_entries WHERE key = ? AND expires_at = ?", expired)
+        with self._stats_lock:
+            self._stats['hits'] += len(found)
+            self._stats['misses'] += len(keys) - len(found)
+            self._stats['expired_misses'] += len(expired)
+            self._stats['expirations'] += len(expired)
+        return found
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        current_time = time.time()
+        expires_at = current_time + (self.default_ttl if ttl is None else ttl)
+        rows = []
+        for key, value in items.items():
+            try:
+                rows.append((key, sqlite3.Binary(encode_value(value)), current_time, expires_at))
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Value for cache key '{key}' is not serializable, skipping: {e}")
+        if not rows:
+            return
+
+        connection = self._connection()
+        # Una sola transacción para todo el lote
+        with connection:
+            connection.execute("BEGIN")
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                rows
+            )
+
+        with self._stats_lock:
+            self._writes_since_eviction += len(rows)
+            check_capacity = self._writes_since_eviction >= self.EVICTION_CHECK_INTERVAL
+            if check_capacity:
+                self._writes_since_eviction = 0
+        if check_capacity:
+            self._evict_over_capacity(connection)
+
+    def _evict_over_capacity(self, connection: sqlite3.Connection) -> None:
+        # Conservar las entradas más recientes cuya suma acumulada cabe en el presupuesto
+        cursor = connection.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key, SUM(? + LENGTH(CAST(key AS BLOB)) + LENGTH(value))"
+            "   OVER (ORDER BY created_at DESC, key) AS running_bytes"
+            "  FROM cache_entries)"
+            " WHERE running_bytes > ?)",
+            (ENTRY_OVERHEAD, self.max_bytes)
+        )
+        if cursor.rowcount > 0:
+            self._count('evictions', cursor.rowcount)
+
+    def delete(self, key: str) -> bool:
+        cursor = self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cache_entries")
+
+    def cleanup_expired(self, max_entries: Optional[int] = None) -> Tuple[int, bool]:
+        cursor = self._connection().execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM cache_entries WHERE expires_at <= ? LIMIT ?)",
+            (time.time(), -1 if max_entries is None else max_entries)
+        )
+        removed = max(0, cursor.rowcount)
+        if removed:
+            self._count('expirations', removed)
+        # Cada fila seleccionada estaba vencida: llenar el lote indica que puede haber más
+        return removed, max_entries is not None and removed >= max_entries
+
+    def stats(self) -> Dict[str, int]:
+        size, stored_bytes = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(? + LENGTH(CAST(key AS BLOB)) + LENGTH(value)), 0) FROM cache_entries",
+            (ENTRY_OVERHEAD,)
+        ).fetchone()
+        with self._stats_lock:
+            return {**self._stats, 'size': size, 'bytes': stored_bytes}
+
+    def sample_entries(self, limit: int) -> List[Tuple[str, float, float, str]]:
+        rows = self._connection().execute(
+            "SELECT key, created_at, expires_at, value FROM cache_entries ORDER BY created_at LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [
+            (key, created_at, expires_at, type(decode_value(value)).__name__)
+            for key, created_at, expires_at, value in rows
+        ]
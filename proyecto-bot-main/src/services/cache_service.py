@@ -3,145 +3,168 @@ Servicio de gestión de cache para el Bot Asistente de Consultas
 """
 import time
 import threading
-from typing import Dict, Any, Optional, Tuple
-from collections import OrderedDict
+from typing import Dict, Any, Optional, Sequence
 import logging
 from config.settings import config
+from src.services.cache_backends import CacheBackend, MemoryCacheBackend, SQLiteCacheBackend
 
 logger = logging.getLogger(__name__)
 
+
+def create_cache_backend(max_bytes: int, default_ttl: float, backend: str = None) -> CacheBackend:
+    """
+    Crea el backend configurado
+
+    Args:
+        max_bytes: Presupuesto de memoria del cache en bytes
+        default_ttl: TTL por defecto en segundos
+        backend: 'memory' o 'sqlite' (por defecto config.CACHE_BACKEND)
+    """
+    backend = (backend or config.CACHE_BACKEND).lower()
+
+    if backend == 'sqlite':
+        return SQLiteCacheBackend(config.CACHE_DB_PATH, max_bytes, default_ttl)
+    if backend != 'memory':
+        logger.warning(f"Unknown cache backend '{backend}', using memory")
+
+    return MemoryCacheBackend(max_bytes, default_ttl, shards=config.CACHE_SHARDS)
+
+
 class CacheService:
-    """Servicio de cache thread-safe con TTL (Time To Live)"""
-    
-    def __init__(self, max_size: int = 1000, default_ttl: int = None):
-        self.max_size = max_size
+    """
+    Servicio de cache thread-safe con LRU y TTL por entrada.
+
+    La capacidad se contabiliza en bytes (tamaño serializado de cada entrada),
+    no en número de entradas.
+
+    El almacenamiento se delega en un ``CacheBackend``: en memoria del proceso
+    (segmentos con lock propio) o compartido entre workers del mismo host
+    (SQLite en modo WAL). La API pública es la misma para ambos.
+    """
+
+    # Máximo de entradas que el sweeper elimina por cada toma del lock
+    SWEEP_BATCH_SIZE = 256
+
+    def __init__(self, max_bytes: int = None, default_ttl: int = None, sweep_interval: float = None,
+                 shards: int = None, backend: Optional[CacheBackend] = None):
+        self.max_bytes = max_bytes or config.CACHE_MAX_BYTES
         self.default_ttl = default_ttl or config.CACHE_TTL
-        self.cache: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
-        self.lock = threading.RLock()
-        self.stats = {
-            'hits': 0,
-            'misses': 0,
-            'evictions': 0,
-            'size': 0
-        }
-    
+        self.sweep_interval = sweep_interval if sweep_interval is not None else config.CACHE_SWEEP_INTERVAL
+        if backend is None:
+            if shards is not None:
+                backend = MemoryCacheBackend(self.max_bytes, self.default_ttl, shards=shards)
+            else:
+                backend = create_cache_backend(self.max_bytes, self.default_ttl)
+        self.backend = backend
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+
     def get(self, key: str) -> Optional[Any]:
         """Obtiene un valor del cache"""
-        with self.lock:
-            if key not in self.cache:
-                self.stats['misses'] += 1
-                return None
-            
-            timestamp, value = self.cache[key]
-            
-            # Verificar si ha expirado
-            if time.time() - timestamp > self.default_ttl:
-                del self.cache[key]
-                self.stats['misses'] += 1
-                self.stats['size'] = len(self.cache)
-                logger.debug(f"Cache key '{key}' expired")
-                return None
-            
-            # Mover al final (LRU)
-            self.cache.move_to_end(key)
-            self.stats['hits'] += 1
-            logger.debug(f"Cache hit for key '{key}'")
-            return value
-    
+        return self.backend.get(key)
+
     def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
-        """Establece un valor en el cache"""
-        with self.lock:
-            current_time = time.time()
-            
-            # Si la clave ya existe, actualizarla
-            if key in self.cache:
-                self.cache[key] = (current_time, value)
-                self.cache.move_to_end(key)
-                logger.debug(f"Cache updated for key '{key}'")
-                return
-            
-            # Si el cache está lleno, eliminar el más antiguo
-            while len(self.cache) >= self.max_size:
-                oldest_key = next(iter(self.cache))
-                del self.cache[oldest_key]
-                self.stats['evictions'] += 1
-                logger.debug(f"Cache evicted key '{oldest_key}'")
-            
-            # Agregar nueva entrada
-            self.cache[key] = (current_time, value)
-            self.stats['size'] = len(self.cache)
-            logger.debug(f"Cache set for key '{key}'")
-    
+        """Establece un valor en el cache con su propio TTL (por defecto default_ttl)"""
+        self.backend.set(key, value, ttl)
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, Any]:
+        """Obtiene varios valores a la vez; solo incluye las claves presentes"""
+        return self.backend.get_many(keys)
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None) -> None:
+        """Establece varios valores a la vez con el mismo TTL"""
+        self.backend.set_many(items, ttl)
+
     def delete(self, key: str) -> bool:
         """Elimina una clave del cache"""
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                self.stats['size'] = len(self.cache)
-                logger.debug(f"Cache deleted key '{key}'")
-                return True
-            return False
-    
+        deleted = self.backend.delete(key)
+        if deleted and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Cache deleted key '%s'", key)
+        return deleted
+
     def clear(self) -> None:
-        """Limpia todo el cache"""
-        with self.lock:
-            self.cache.clear()
-            self.stats['size'] = 0
-            logger.info("Cache cleared")
-    
-    def cleanup_expired(self) -> int:
-        """Limpia entradas expiradas y retorna el número de entradas eliminadas"""
-        with self.lock:
-            current_time = time.time()
-            expired_keys = []
-            
-            for key, (timestamp, _) in self.cache.items():
-                if current_time - timestamp > self.default_ttl:
-                    expired_keys.append(key)
-            
-            for key in expired_keys:
-                del self.cache[key]
-            
-            self.stats['size'] = len(self.cache)
-            
-            if expired_keys:
-                logger.info(f"Cleaned up {len(expired_keys)} expired cache entries")
-            
-            return len(expired_keys)
-    
+        """Limpia todo el cache (en backends compartidos, para todos los workers)"""
+        self.backend.clear()
+        logger.info("Cache cleared")
+
+    def cleanup_expired(self, max_entries: Optional[int] = None) -> int:
+        """
+        Limpia entradas expiradas y retorna el número de entradas eliminadas
+
+        Args:
+            max_entries: Límite de entradas a revisar por lote (opcional)
+        """
+        removed, _ = self.backend.cleanup_expired(max_entries)
+        if removed:
+            logger.debug(f"Cleaned up {removed} expired cache entries")
+        return removed
+
+    def start_sweeper(self) -> None:
+        """Inicia el hilo que limpia entradas expiradas en segundo plano"""
+        if self.sweep_interval <= 0 or (self._sweeper and self._sweeper.is_alive()):
+            return
+
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self) -> None:
+        """Detiene el hilo de limpieza"""
+        self._stop_sweeper.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=1)
+            self._sweeper = None
+
+    def _sweep_loop(self) -> None:
+        """Limpia por lotes, liberando el lock entre lote y lote, hasta que ningún lote quede cortado"""
+        while not self._stop_sweeper.wait(self.sweep_interval):
+            try:
+                total = 0
+                pending = True
+                while pending and not self._stop_sweeper.is_set():
+                    removed, pending = self.backend.cleanup_expired(max_entries=self.SWEEP_BATCH_SIZE)
+                    total += removed
+                if total:
+                    logger.info(f"Cache sweeper removed {total} expired entries")
+            except Exception:
+                logger.exception("Error in cache sweeper")
+
     def get_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas del cache"""
-        with self.lock:
-            total_requests = self.stats['hits'] + self.stats['misses']
-            hit_rate = (self.stats['hits'] / total_requests * 100) if total_requests > 0 else 0
-            
-            return {
-                **self.stats,
-                'hit_rate': round(hit_rate, 2),
-                'total_requests': total_requests,
-                'max_size': self.max_size
-            }
-    
+        totals = self.backend.stats()
+        total_requests = totals['hits'] + totals['misses']
+        hit_rate = (totals['hits'] / total_requests * 100) if total_requests > 0 else 0
+
+        return {
+            **totals,
+            'hit_rate': round(hit_rate, 2),
+            'total_requests': total_requests,
+            'max_bytes': self.max_bytes,
+            'usage_percentage': round(totals.get('bytes', 0) / self.max_bytes * 100, 2),
+            'backend': self.backend.name
+        }
+
     def get_cache_info(self) -> Dict[str, Any]:
         """Información detallada del cache para debugging"""
-        with self.lock:
-            current_time = time.time()
-            entries_info = []
-            
-            for key, (timestamp, value) in list(self.cache.items())[:10]:  # Solo los primeros 10
-                age = current_time - timestamp
-                entries_info.append({
-                    'key': key,
-                    'age_seconds': round(age, 2),
-                    'expired': age > self.default_ttl,
-                    'value_type': type(value).__name__
-                })
-            
-            return {
-                'stats': self.get_stats(),
-                'sample_entries': entries_info,
-                'total_entries': len(self.cache)
-            }
+        current_time = time.time()
+        entries_info = []
+
+        for key, created_at, expires_at, value_type in self.backend.sample_entries(10):  # Solo los primeros 10
+            entries_info.append({
+                'key': key,
+                'age_seconds': round(current_time - created_at, 2),
+                'ttl_remaining_seconds': round(max(0.0, expires_at - current_time), 2),
+                'expired': current_time >= expires_at,
+                'value_type': value_type
+            })
+
+        stats = self.get_stats()
+        return {
+            'stats': stats,
+            'sample_entries': entries_info,
+            'total_entries': stats['size']
+        }
 
 # Instancia global del cache
-cache_service = CacheService()
\ No newline at end of file
+cache_service = CacheService()
+cache_service.start_sweeper()
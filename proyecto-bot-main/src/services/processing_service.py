@@ -3,177 +3,329 @@ Servicio de control de procesamiento para el Bot Asistente de Consultas
 """
 import time
 import threading
-from typing import Optional, Dict, Any
+import itertools
+from collections import deque
+from typing import Optional, Dict, Any, Deque, List
 import logging
 from config.settings import config
+from src.utils.metrics import metrics
+from src.utils.request_trace import RequestTrace
 
 logger = logging.getLogger(__name__)
 
-class ProcessingLockService:
-    """Servicio para controlar el procesamiento simultáneo de consultas"""
-    
-    def __init__(self, max_processing_time: int = None):
+# Distribución completa de esperas y duraciones (el historial solo guarda las últimas 10)
+WAIT_SECONDS = metrics.histogram(
+    'chat_pool_wait_seconds', 'Espera en cola hasta obtener un worker del pool'
+).labels()
+PROCESSING_SECONDS = metrics.histogram(
+    'chat_pool_processing_seconds', 'Tiempo que cada consulta ocupa un worker del pool', ['outcome']
+)
+
+
+class ProcessingQueueFullError(Exception):
+    """Se lanza cuando no hay espacio ni en los workers ni en la cola de espera"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Cola de procesamiento llena, reintentar en {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ProcessingTimeoutError(Exception):
+    """Se lanza cuando una consulta agota su deadline esperando un worker libre"""
+
+    def __init__(self, waited: float):
+        super().__init__(f"Tiempo de espera agotado después de {waited:.1f}s")
+        self.waited = waited
+
+
+class ProcessingTicket:
+    """Representa una consulta admitida (o en espera) en el pool de procesamiento"""
+
+    __slots__ = ('ticket_id', 'query', 'enqueued_at', 'start_time', 'deadline', 'thread_id',
+                 'trace', 'end_time', 'outcome')
+
+    def __init__(self, ticket_id: int, query: str, enqueued_at: float, deadline: float):
+        self.ticket_id = ticket_id
+        self.query = query
+        self.enqueued_at = enqueued_at
+        self.start_time: Optional[float] = None
+        self.deadline = deadline
+        # Hilo que procesa la consulta (el stream lo actualiza en cada paso)
+        self.thread_id = threading.get_ident()
+        self.trace = RequestTrace()
+        self.end_time: Optional[float] = None
+        self.outcome: Optional[str] = None
+
+    @property
+    def wait_time(self) -> float:
+        """Segundos que la consulta pasó en la cola"""
+        return (self.start_time or time.time()) - self.enqueued_at
+
+    def remaining_time(self) -> float:
+        """Segundos restantes antes de agotar el deadline vigente (de espera o de procesamiento)"""
+        return max(0.0, self.deadline - time.time())
+
+
+class ProcessingPoolService:
+    """
+    Pool acotado de procesamiento concurrente.
+
+    Admite hasta ``max_concurrent`` consultas en paralelo; las siguientes esperan
+    en una cola FIFO de hasta ``max_queue_size`` posiciones. Una consulta espera
+    en cola como mucho ``max_processing_time`` segundos y, una vez admitida,
+    tiene otros ``max_processing_time`` para procesarse antes de darla por colgada.
+    """
+
+    def __init__(self, max_concurrent: int = None, max_queue_size: int = None,
+                 max_processing_time: int = None):
+        self.max_concurrent = max(1, max_concurrent or config.MAX_CONCURRENT_QUESTIONS)
+        self.max_queue_size = max(0, max_queue_size if max_queue_size is not None
+                                  else config.PROCESSING_QUEUE_SIZE)
         self.max_processing_time = max_processing_time or config.MAX_PROCESSING_TIME
-        self.lock = threading.RLock()
-        self.is_processing = False
-        self.processing_start_time: Optional[float] = None
-        self.current_query: Optional[str] = None
-        self.processing_history = []
-        self.stats = {
+        self.condition = threading.Condition(threading.RLock())
+        self.in_flight: Dict[int, ProcessingTicket] = {}
+        self.waiting: Deque[ProcessingTicket] = deque()
+        self.processing_history: Deque[Dict[str, Any]] = deque(maxlen=10)
+        self._ticket_ids = itertools.count(1)
+        self.stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
             'total_attempts': 0,
             'successful_processes': 0,
-            'blocked_attempts': 0,
-            'timeout_recoveries': 0
+            'rejected_queue_full': 0,
+            'wait_timeouts': 0,
+            'timeout_recoveries': 0,
+            'max_queue_depth': 0,
+            'total_wait_time': 0.0,
+            'total_processing_time': 0.0
         }
-    
-    def is_bot_processing(self) -> bool:
-        """Verifica si el bot está procesando una consulta actualmente"""
-        with self.lock:
-            # Verificar si hay un procesamiento colgado (timeout)
-            if self.is_processing and self.processing_start_time:
-                elapsed_time = time.time() - self.processing_start_time
-                if elapsed_time > self.max_processing_time:
-                    logger.warning(
-                        f"Procesamiento colgado detectado después de {elapsed_time:.1f}s, "
-                        f"liberando bloqueo para query: '{self.current_query}'"
-                    )
-                    self._force_release()
-                    self.stats['timeout_recoveries'] += 1
-            
-            return self.is_processing
-    
-    def start_processing(self, query: str = "") -> bool:
+
+    def start_processing(self, query: str = "", timeout: Optional[float] = None) -> ProcessingTicket:
         """
-        Intenta iniciar el procesamiento. Retorna True si se pudo iniciar.
-        
+        Reserva un worker para procesar la consulta, esperando en cola si es necesario.
+
         Args:
             query: La consulta que se va a procesar (para logging)
+            timeout: Espera máxima en cola; por defecto ``max_processing_time``
+
+        Returns:
+            El ticket que debe entregarse a ``finish_processing``
+
+        Raises:
+            ProcessingQueueFullError: si los workers y la cola están completos
+            ProcessingTimeoutError: si el deadline de espera vence antes de obtener un worker
+        """
+        with self.condition:
+            now = time.time()
+            self.stats['total_attempts'] += 1
+            self._recover_expired(now)
+
+            ticket = ProcessingTicket(
+                next(self._ticket_ids), query, now, now + self.max_processing_time
+            )
+
+            if not self.waiting and len(self.in_flight) < self.max_concurrent:
+                self._admit(ticket, now)
+                return ticket
+
+            if len(self.waiting) >= self.max_queue_size:
+                self.stats['rejected_queue_full'] += 1
+                retry_after = self._estimate_retry_after()
+                logger.info(f"Procesamiento rechazado para query: '{query}' - cola llena")
+                raise ProcessingQueueFullError(retry_after)
+
+            self.waiting.append(ticket)
+            self.stats['max_queue_depth'] = max(self.stats['max_queue_depth'], len(self.waiting))
+
+            wait_deadline = ticket.deadline if timeout is None else min(ticket.deadline, now + timeout)
+            while True:
+                now = time.time()
+                self._recover_expired(now)
+                if self.waiting[0] is ticket and len(self.in_flight) < self.max_concurrent:
+                    self.waiting.popleft()
+                    self._admit(ticket, now)
+                    # Puede haber más workers libres para los siguientes en cola
+                    self.condition.notify_all()
+                    return ticket
+
+                remaining = wait_deadline - now
+                if remaining <= 0:
+                    self.waiting.remove(ticket)
+                    self.stats['wait_timeouts'] += 1
+                    self.condition.notify_all()
+                    logger.info(f"Tiempo de espera agotado para query: '{query}'")
+                    raise ProcessingTimeoutError(now - ticket.enqueued_at)
+
+                self.condition.wait(remaining)
+
+    def finish_processing(self, ticket: ProcessingTicket) -> None:
+        """Libera el worker ocupado por el ticket"""
+        with self.condition:
+            if self.in_flight.pop(ticket.ticket_id, None) is None:
+                # Ya fue liberado por timeout
+                return
+
+            ticket.end_time, ticket.outcome = time.time(), 'completed'
+            elapsed_time = ticket.end_time - ticket.start_time
+            PROCESSING_SECONDS.labels('completed').observe(elapsed_time)
+            self._record_history(ticket, elapsed_time, completed=True)
+            self.stats['successful_processes'] += 1
+            self.stats['total_processing_time'] += elapsed_time
+            logger.info(
+                f"Procesamiento completado en {elapsed_time:.1f}s para query: '{ticket.query}'"
+            )
+            self.condition.notify_all()
+
+    def is_bot_processing(self) -> bool:
+        """Verifica si hay alguna consulta en procesamiento"""
+        with self.condition:
+            self._recover_expired(time.time())
+            return bool(self.in_flight)
+
+    def is_saturated(self) -> bool:
+        """Verifica si una nueva consulta sería rechazada por cola llena"""
+        with self.condition:
+            return (len(self.in_flight) >= self.max_concurrent
+                    and len(self.waiting) >= self.max_queue_size)
+
+    def reject_if_saturated(self) -> Optional[int]:
+        """
+        Rechaza por adelantado una consulta que no cabría en el pool ni en su cola
+
+        Returns:
+            Los segundos de Retry-After si se rechazó (contabilizado como cola llena), o None
         """
-        with self.lock:
+        with self.condition:
+            self._recover_expired(time.time())
+            if len(self.in_flight) < self.max_concurrent or len(self.waiting) < self.max_queue_size:
+                return None
             self.stats['total_attempts'] += 1
-            
-            if self.is_processing:
-                self.stats['blocked_attempts'] += 1
-                logger.info(f"Procesamiento rechazado para query: '{query}' - Bot ocupado")
-                return False
-            
-            self.is_processing = True
-            self.processing_start_time = time.time()
-            self.current_query = query
-            
-            logger.info(f"Procesamiento iniciado para query: '{query}'")
-            return True
-    
-    def finish_processing(self) -> None:
-        """Marca el procesamiento como finalizado"""
-        with self.lock:
-            if self.is_processing:
-                elapsed_time = time.time() - (self.processing_start_time or 0)
-                
-                # Agregar al historial
-                self.processing_history.append({
-                    'query': self.current_query,
-                    'start_time': self.processing_start_time,
-                    'duration': elapsed_time,
-                    'completed': True
-                })
-                
-                # Mantener solo los últimos 10 registros
-                if len(self.processing_history) > 10:
-                    self.processing_history.pop(0)
-                
-                self.stats['successful_processes'] += 1
-                logger.info(
-                    f"Procesamiento completado en {elapsed_time:.1f}s para query: '{self.current_query}'"
-                )
-                
-                self._release()
-    
-    def _force_release(self) -> None:
-        """Libera el bloqueo por timeout"""
-        if self.is_processing:
-            elapsed_time = time.time() - (self.processing_start_time or 0)
-            
-            # Agregar al historial como timeout
-            self.processing_history.append({
-                'query': self.current_query,
-                'start_time': self.processing_start_time,
-                'duration': elapsed_time,
-                'completed': False,
-                'reason': 'timeout'
-            })
-            
-            if len(self.processing_history) > 10:
-                self.processing_history.pop(0)
-        
-        self._release()
-    
-    def _release(self) -> None:
-        """Libera el bloqueo interno"""
-        self.is_processing = False
-        self.processing_start_time = None
-        self.current_query = None
-    
+            self.stats['rejected_queue_full'] += 1
+            return self._estimate_retry_after()
+
+    def _admit(self, ticket: ProcessingTicket, now: float) -> None:
+        """Asigna un worker al ticket, con un deadline de procesamiento propio"""
+        ticket.start_time = now
+        # El deadline de espera ya no aplica: lo esperado en cola no descuenta tiempo de procesamiento
+        ticket.deadline = now + self.max_processing_time
+        self.in_flight[ticket.ticket_id] = ticket
+        self.stats['total_wait_time'] += now - ticket.enqueued_at
+        WAIT_SECONDS.observe(now - ticket.enqueued_at)
+        logger.info(f"Procesamiento iniciado para query: '{ticket.query}'")
+
+    def _recover_expired(self, now: float) -> None:
+        """Libera los workers cuyas consultas superaron su deadline de procesamiento"""
+        expired = [t for t in self.in_flight.values() if now > t.deadline]
+        for ticket in expired:
+            del self.in_flight[ticket.ticket_id]
+            ticket.end_time, ticket.outcome = now, 'timeout'
+            elapsed_time = now - ticket.start_time
+            PROCESSING_SECONDS.labels('timeout').observe(elapsed_time)
+            logger.warning(
+                f"Procesamiento colgado detectado después de {elapsed_time:.1f}s, "
+                f"liberando worker para query: '{ticket.query}'"
+            )
+            self._record_history(ticket, elapsed_time, completed=False, reason='timeout')
+            self.stats['timeout_recoveries'] += 1
+        if expired:
+            self.condition.notify_all()
+
+    def _record_history(self, ticket: ProcessingTicket, duration: float,
+                        completed: bool, reason: Optional[str] = None) -> None:
+        entry = {
+            'query': ticket.query,
+            'start_time': ticket.start_time,
+            'wait_time': round(ticket.start_time - ticket.enqueued_at, 4),
+            'duration': duration,
+            'completed': completed
+        }
+        if reason:
+            entry['reason'] = reason
+        self.processing_history.append(entry)
+
+    def _average_processing_time(self) -> float:
+        completed = self.stats['successful_processes']
+        return self.stats['total_processing_time'] / completed if completed else 0.0
+
+    def _estimate_retry_after(self) -> int:
+        """Estima en segundos cuándo se liberará espacio en la cola"""
+        avg_duration = self._average_processing_time() or 1.0
+        pending = len(self.waiting) + len(self.in_flight)
+        return max(1, int(round(avg_duration * pending / self.max_concurrent)))
+
     def get_current_status(self) -> Dict[str, Any]:
         """Obtiene el estado actual del procesamiento"""
-        with self.lock:
-            if not self.is_processing:
-                return {
-                    'status': 'idle',
-                    'is_processing': False,
-                    'message': 'Bot disponible para nuevas consultas'
-                }
-            
-            elapsed_time = time.time() - (self.processing_start_time or 0)
-            remaining_time = max(0, self.max_processing_time - elapsed_time)
-            
+        with self.condition:
+            now = time.time()
+            self._recover_expired(now)
+            in_flight = len(self.in_flight)
+            queue_depth = len(self.waiting)
+
+            if not in_flight:
+                status, message = 'idle', 'Bot disponible para nuevas consultas'
+            elif queue_depth >= self.max_queue_size and in_flight >= self.max_concurrent:
+                status, message = 'saturated', 'Bot saturado, las nuevas consultas serán rechazadas'
+            elif in_flight >= self.max_concurrent:
+                status, message = 'queueing', f'{queue_depth} consultas en espera'
+            else:
+                status, message = 'processing', f'Procesando {in_flight} consultas'
+
+            oldest_wait = now - self.waiting[0].enqueued_at if self.waiting else 0.0
+
             return {
-                'status': 'processing',
-                'is_processing': True,
-                'current_query': self.current_query,
-                'elapsed_time': round(elapsed_time, 1),
-                'remaining_time': round(remaining_time, 1),
-                'progress_percentage': min(100, (elapsed_time / self.max_processing_time) * 100),
-                'message': f'Procesando consulta: "{self.current_query[:50]}..."'
+                'status': status,
+                'is_processing': in_flight > 0,
+                'in_flight': in_flight,
+                'max_concurrent': self.max_concurrent,
+                'queue_depth': queue_depth,
+                'max_queue_size': self.max_queue_size,
+                'oldest_wait_seconds': round(oldest_wait, 3),
+                'message': message
             }
-    
+
     def get_stats(self) -> Dict[str, Any]:
         """Obtiene estadísticas del servicio de procesamiento"""
-        with self.lock:
+        with self.condition:
             success_rate = 0
-            avg_duration = 0
-            
             if self.stats['total_attempts'] > 0:
                 success_rate = (self.stats['successful_processes'] / self.stats['total_attempts']) * 100
-            
-            completed_processes = [h for h in self.processing_history if h.get('completed', False)]
-            if completed_processes:
-                avg_duration = sum(h['duration'] for h in completed_processes) / len(completed_processes)
-            
+
+            admitted = self.stats['successful_processes'] + self.stats['timeout_recoveries'] + len(self.in_flight)
+            avg_wait = self.stats['total_wait_time'] / admitted if admitted else 0.0
+            status = self.get_current_status()
+
             return {
-                **self.stats,
+                **{k: v for k, v in self.stats.items()
+                   if k not in ('total_wait_time', 'total_processing_time')},
                 'success_rate_percentage': round(success_rate, 2),
-                'average_processing_time': round(avg_duration, 2),
+                'average_processing_time': round(self._average_processing_time(), 4),
+                'average_wait_time': round(avg_wait, 4),
                 'max_processing_time': self.max_processing_time,
-                'current_status': self.get_current_status()['status']
+                'in_flight': status['in_flight'],
+                'queue_depth': status['queue_depth'],
+                'max_concurrent': self.max_concurrent,
+                'max_queue_size': self.max_queue_size,
+                'current_status': status['status']
             }
-    
+
+    def in_flight_tickets(self) -> List[ProcessingTicket]:
+        """Copia de los tickets que ocupan un worker en este momento"""
+        with self.condition:
+            return list(self.in_flight.values())
+
     def get_processing_history(self) -> list:
         """Obtiene el historial de procesamiento reciente"""
-        with self.lock:
+        with self.condition:
             return list(self.processing_history)  # Copia para evitar modificaciones externas
-    
+
     def reset_stats(self) -> None:
         """Reinicia las estadísticas"""
-        with self.lock:
-            self.stats = {
-                'total_attempts': 0,
-                'successful_processes': 0,
-                'blocked_attempts': 0,
-                'timeout_recoveries': 0
-            }
+        with self.condition:
+            self.stats = self._empty_stats()
             self.processing_history.clear()
             logger.info("Estadísticas de procesamiento reiniciadas")
 
 # Instancia global del servicio de procesamiento
-processing_lock_service = ProcessingLockService()
\ No newline at end of file
+processing_service = ProcessingPoolService()
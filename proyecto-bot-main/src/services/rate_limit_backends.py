@@ -0,0 +1,386 @@
+"""
+Backends de almacenamiento para el servicio de rate limiting del Bot Asistente de Consultas
+"""
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Duración de la ventana de rate limiting
+WINDOW_SECONDS = 60
+
+
+class RateLimitDecision(NamedTuple):
+    """Resultado de cargar una solicitud a un cliente"""
+    allowed: bool
+    count: float            # solicitudes estimadas en la ventana (incluida esta si se permitió)
+    reset_in: float         # segundos hasta el cambio de ventana
+    retry_after: float      # segundos hasta que vuelva a haber cupo (0 si se permitió)
+
+
+class ClientSnapshot(NamedTuple):
+    """Estado de un cliente para ``get_client_info``"""
+    count: float
+    first_seen: float
+    last_seen: float
+    total: int
+
+
+class SlidingWindowCounter:
+    """
+    Contador de ventana deslizante aproximada con dos ventanas fijas.
+
+    Estima las solicitudes del último minuto como
+    ``anterior * (1 - fracción transcurrida) + actual``, usando memoria constante.
+    """
+
+    __slots__ = ('window_start', 'current', 'previous', 'first_seen', 'last_seen', 'total')
+
+    def __init__(self, now: float):
+        self.window_start = int(now // WINDOW_SECONDS)
+        self.current = 0
+        self.previous = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.total = 0
+
+    def roll(self, now: float) -> None:
+        """Avanza las ventanas hasta la que contiene ``now``"""
+        window = int(now // WINDOW_SECONDS)
+        if window == self.window_start:
+            return
+        self.previous = self.current if window == self.window_start + 1 else 0
+        self.current = 0
+        self.window_start = window
+
+    def estimate(self, now: float) -> float:
+        """Solicitudes estimadas en los últimos WINDOW_SECONDS (requiere ``roll`` previo)"""
+        elapsed_fraction = (now - self.window_start * WINDOW_SECONDS) / WINDOW_SECONDS
+        return self.previous * (1 - elapsed_fraction) + self.current
+
+    def add(self, now: float, weight: int = 1) -> None:
+        self.current += weight
+        self.total += weight
+        self.last_seen = now
+
+    def seconds_until_at_most(self, now: float, target: int) -> float:
+        """Segundos hasta que la estimación baje a ``target`` o menos"""
+        elapsed = now - self.window_start * WINDOW_SECONDS
+        if self.current <= target:
+            if not self.previous:
+                return 0.0
+            needed_fraction = 1 - (target - self.current) / self.previous
+            return max(0.0, needed_fraction * WINDOW_SECONDS - elapsed)
+        # En la siguiente ventana la actual pasa a ser la anterior
+        needed_fraction = max(0.0, 1 - target / self.current)
+        return (WINDOW_SECONDS - elapsed) + needed_fraction * WINDOW_SECONDS
+
+    def is_stale(self, now: float) -> bool:
+        """True si ya no aporta nada a la estimación"""
+        return int(now // WINDOW_SECONDS) > self.window_start + 1
+
+    def charge(self, now: float, limit: int, weight: int = 1) -> RateLimitDecision:
+        """Intenta cargar ``weight`` solicitudes sin superar ``limit``"""
+        # Las rechazadas también son actividad: el desalojo por last_seen del backend
+        # SQLite sigue así el mismo orden que el LRU del backend en memoria
+        self.last_seen = now
+        self.roll(now)
+        estimate = self.estimate(now)
+        reset_in = (self.window_start + 1) * WINDOW_SECONDS - now
+
+        if estimate + weight > limit:
+            return RateLimitDecision(False, estimate, reset_in,
+                                     self.seconds_until_at_most(now, max(0, limit - weight)))
+
+        self.add(now, weight)
+        return RateLimitDecision(True, estimate + weight, reset_in, 0.0)
+
+
+class RateLimitBackend(ABC):
+    """Interfaz común de los almacenes usados por RateLimitService"""
+
+    name = "abstract"
+
+    @abstractmethod
+    def charge(self, client_id: str, limit: int, weight: int = 1) -> RateLimitDecision:
+        """Carga ``weight`` solicitudes al cliente si caben en ``limit``"""
+
+    @abstractmethod
+    def client_snapshot(self, client_id: str) -> Optional[ClientSnapshot]:
+        """Estado actual del cliente o None si no está registrado"""
+
+    @abstractmethod
+    def reset_client(self, client_id: str) -> bool:
+        """Olvida al cliente; True si existía"""
+
+    @abstractmethod
+    def cleanup(self) -> int:
+        """Elimina clientes inactivos y retorna cuántos se eliminaron"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, float]:
+        """Contadores: total_requests, blocked_requests, tracked_clients, evicted_clients, active_requests"""
+
+
+class _RateLimitStripe:
+    """Grupo de clientes protegido por su propio lock, en orden LRU"""
+
+    __slots__ = ('lock', 'clients', 'max_clients', 'total_requests', 'blocked_requests',
+                 'evicted_clients')
+
+    def __init__(self, max_clients: int):
+        self.lock = threading.Lock()
+        self.clients: OrderedDict[str, SlidingWindowCounter] = OrderedDict()
+        self.max_clients = max_clients
+        self.total_requests = 0
+        self.blocked_requests = 0
+        self.evicted_clients = 0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """
+    Almacén en memoria del proceso.
+
+    Los clientes se reparten entre ``stripes`` grupos con lock propio; cada grupo
+    mantiene sus clientes en orden LRU y, al superar su cupo, desaloja al menos
+    reciente.
+    """
+
+    name = "memory"
+
+    def __init__(self, max_clients: int, stripes: int = 1):
+        self.stripe_count = max(1, stripes)
+        per_stripe = max(1, -(-max_clients // self.stripe_count))
+        self.stripes = [_RateLimitStripe(per_stripe) for _ in range(self.stripe_count)]
+
+        # Ventana global para estimar las solicitudes activas sin recorrer clientes
+        self._global_lock = threading.Lock()
+        self._global_window = SlidingWindowCounter(time.time())
+
+    def _stripe(self, client_id: str) -> _RateLimitStripe:
+        return self.stripes[hash(client_id) % self.stripe_count]
+
+    def charge(self, client_id: str, limit: int, weight: int = 1) -> RateLimitDecision:
+        stripe = self._stripe(client_id)
+        with stripe.lock:
+            now = time.time()
+            stripe.total_requests += 1
+
+            counter = stripe.clients.get(client_id)
+            if counter is None:
+                # Si el grupo está lleno, desalojar al cliente menos reciente
+                while len(stripe.clients) >= stripe.max_clients:
+                    stripe.clients.popitem(last=False)
+                    stripe.evicted_clients += 1
+                counter = SlidingWindowCounter(now)
+                stripe.clients[client_id] = counter
+            else:
+                stripe.clients.move_to_end(client_id)
+
+            decision = counter.charge(now, limit, weight)
+            if not decision.allowed:
+                stripe.blocked_requests += 1
+                return decision
+
+        with self._global_lock:
+            self._global_window.roll(now)
+            self._global_window.add(now, weight)
+        return decision
+
+    def client_snapshot(self, client_id: str) -> Optional[ClientSnapshot]:
+        stripe = self._stripe(client_id)
+        with stripe.lock:
+            counter = stripe.clients.get(client_id)
+            if counter is None:
+                return None
+            now = time.time()
+            counter.roll(now)
+            return ClientSnapshot(counter.estimate(now), counter.first_seen, counter.last_seen, counter.total)
+
+    def reset_client(self, client_id: str) -> bool:
+        stripe = self._stripe(client_id)
+        with stripe.lock:
+            return stripe.clients.pop(client_id, None) is not None
+
+    def cleanup(self) -> int:
+        # Los clientes de cada grupo están en orden LRU: basta revisar el frente
+        cleaned = 0
+        for stripe in self.stripes:
+            with stripe.lock:
+                now = time.time()
+                while stripe.clients:
+                    client_id, counter = next(iter(stripe.clients.items()))
+                    if not counter.is_stale(now):
+                        break
+                    del stripe.clients[client_id]
+                    cleaned += 1
+        return cleaned
+
+    def stats(self) -> Dict[str, float]:
+        totals = {'total_requests': 0, 'blocked_requests': 0, 'tracked_clients': 0, 'evicted_clients': 0}
+        for stripe in self.stripes:
+            with stripe.lock:
+                totals['total_requests'] += stripe.total_requests
+                totals['blocked_requests'] += stripe.blocked_requests
+                totals['tracked_clients'] += len(stripe.clients)
+                totals['evicted_clients'] += stripe.evicted_clients
+
+        with self._global_lock:
+            now = time.time()
+            self._global_window.roll(now)
+            totals['active_requests'] = self._global_window.estimate(now)
+        return totals
+
+
+class SQLiteRateLimitBackend(RateLimitBackend):
+    """
+    Almacén compartido entre procesos en un archivo SQLite en modo WAL.
+
+    Cada carga se hace en una transacción ``BEGIN IMMEDIATE``, que toma el lock
+    de escritura del archivo: la lectura del contador y su actualización son
+    atómicas para todos los workers del host, que comparten así un único cupo
+    por cliente. El tope de clientes se aplica por último acceso (permitido o no) cada
+    ``EVICTION_CHECK_INTERVAL`` clientes nuevos de cada proceso.
+    """
+
+    name = "sqlite"
+    EVICTION_CHECK_INTERVAL = 64
+
+    def __init__(self, path: str, max_clients: int):
+        self.path = str(path)
+        self.max_clients = max_clients
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._inserts_since_eviction = 0
+        # Contadores locales a este proceso; clientes y solicitudes activas se leen del archivo
+        self._stats = {
+            'total_requests': 0,
+            'blocked_requests': 0,
+            'evicted_clients': 0
+        }
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS rate_limit_clients ("
+            " client_id TEXT PRIMARY KEY,"
+            " window_start INTEGER NOT NULL,"
+            " current INTEGER NOT NULL,"
+            " previous INTEGER NOT NULL,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " total INTEGER NOT NULL)"
+        )
+        self._connection().execute(
+            "CREATE INDEX IF NOT EXISTS idx_rate_limit_last_seen ON rate_limit_clients (last_seen)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo (y por proceso, tras un fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _counter_from_row(row, now: float) -> SlidingWindowCounter:
+        counter = SlidingWindowCounter(now)
+        (counter.window_start, counter.current, counter.previous,
+         counter.first_seen, counter.last_seen, counter.total) = row
+        return counter
+
+    def charge(self, client_id: str, limit: int, weight: int = 1) -> RateLimitDecision:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute(
+                "SELECT window_start, current, previous, first_seen, last_seen, total"
+                " FROM rate_limit_clients WHERE client_id = ?", (client_id,)
+            ).fetchone()
+            counter = self._counter_from_row(row, now) if row else SlidingWindowCounter(now)
+
+            decision = counter.charge(now, limit, weight)
+            connection.execute(
+                "INSERT OR REPLACE INTO rate_limit_clients"
+                " (client_id, window_start, current, previous, first_seen, last_seen, total)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (client_id, counter.window_start, counter.current, counter.previous,
+                 counter.first_seen, counter.last_seen, counter.total)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        with self._stats_lock:
+            self._stats['total_requests'] += 1
+            if not decision.allowed:
+                self._stats['blocked_requests'] += 1
+            check_capacity = False
+            if row is None:
+                self._inserts_since_eviction += 1
+                check_capacity = self._inserts_since_eviction >= self.EVICTION_CHECK_INTERVAL
+                if check_capacity:
+                    self._inserts_since_eviction = 0
+        if check_capacity:
+            self._evict_over_capacity(connection)
+
+        return decision
+
+    def _evict_over_capacity(self, connection: sqlite3.Connection) -> None:
+        cursor = connection.execute(
+            "DELETE FROM rate_limit_clients WHERE client_id IN ("
+            " SELECT client_id FROM rate_limit_clients ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_clients,)
+        )
+        if cursor.rowcount > 0:
+            with self._stats_lock:
+                self._stats['evicted_clients'] += cursor.rowcount
+
+    def client_snapshot(self, client_id: str) -> Optional[ClientSnapshot]:
+        row = self._connection().execute(
+            "SELECT window_start, current, previous, first_seen, last_seen, total"
+            " FROM rate_limit_clients WHERE client_id = ?", (client_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        counter = self._counter_from_row(row, now)
+        counter.roll(now)
+        return ClientSnapshot(counter.estimate(now), counter.first_seen, counter.last_seen, counter.total)
+
+    def reset_client(self, client_id: str) -> bool:
+        cursor = self._connection().execute("DELETE FROM rate_limit_clients WHERE client_id = ?", (client_id,))
+        return cursor.rowcount > 0
+
+    def cleanup(self) -> int:
+        current_window = int(time.time() // WINDOW_SECONDS)
+        cursor = self._connection().execute(
+            "DELETE FROM rate_limit_clients WHERE window_start < ?", (current_window - 1,)
+        )
+        return max(0, cursor.rowcount)
+
+    def stats(self) -> Dict[str, float]:
+        now = time.time()
+        current_window = int(now // WINDOW_SECONDS)
+        elapsed_fraction = (now - current_window * WINDOW_SECONDS) / WINDOW_SECONDS
+        tracked, active = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(CASE"
+            " WHEN window_start = :w THEN previous * (1 - :f) + current"
+            " WHEN window_start = :w - 1 THEN current * (1 - :f)"
+            " ELSE 0 END), 0) FROM rate_limit_clients",
+            {'w': current_window, 'f': elapsed_fraction}
+        ).fetchone()
+        with self._stats_lock:
+            return {**self._stats, 'tracked_clients': tracked, 'active_requests': active}
@@ -1,188 +1,183 @@
 """
 Servicio de Rate Limiting para el Bot Asistente de Consultas
 """
-import time
+import math
 import threading
-from typing import Dict, Tuple
-from collections import defaultdict, deque
+from typing import Dict, Tuple, Optional
 import logging
 from config.settings import config
+from src.services.rate_limit_backends import (
+    RateLimitBackend, MemoryRateLimitBackend, SQLiteRateLimitBackend
+)
 
 logger = logging.getLogger(__name__)
 
+
+def create_rate_limit_backend(max_clients: int, stripes: int = None, backend: str = None) -> RateLimitBackend:
+    """
+    Crea el backend configurado
+
+    Args:
+        max_clients: Máximo de clientes registrados
+        stripes: Grupos con lock propio del backend en memoria (por defecto config.RATE_LIMIT_STRIPES)
+        backend: 'memory' o 'sqlite' (por defecto config.RATE_LIMIT_BACKEND)
+    """
+    backend = (backend or config.RATE_LIMIT_BACKEND).lower()
+
+    if backend == 'sqlite':
+        return SQLiteRateLimitBackend(config.RATE_LIMIT_DB_PATH, max_clients)
+    if backend != 'memory':
+        logger.warning(f"Unknown rate limit backend '{backend}', using memory")
+
+    return MemoryRateLimitBackend(max_clients, stripes=stripes or config.RATE_LIMIT_STRIPES)
+
+
 class RateLimitService:
-    """Servicio de rate limiting con ventana deslizante"""
-    
-    def __init__(self, requests_per_minute: int = None):
+    """
+    Servicio de rate limiting con ventana deslizante aproximada.
+
+    Cada cliente ocupa un contador de tamaño fijo guardado en un
+    ``RateLimitBackend``: en memoria del proceso (grupos LRU con lock propio) o
+    compartido entre los workers del host (SQLite en modo WAL), de modo que
+    todos apliquen un único cupo por cliente. Un hilo en segundo plano descarta
+    periódicamente los clientes inactivos.
+    """
+
+    def __init__(self, requests_per_minute: int = None, max_clients: int = None,
+                 stripes: int = None, reap_interval: float = None,
+                 backend: Optional[RateLimitBackend] = None):
         self.requests_per_minute = requests_per_minute or config.REQUESTS_PER_MINUTE
-        self.requests_log: Dict[str, deque] = defaultdict(lambda: deque())
-        self.lock = threading.RLock()
-        self.stats = {
-            'total_requests': 0,
-            'blocked_requests': 0,
-            'unique_clients': 0
-        }
-    
-    def is_allowed(self, client_id: str) -> Tuple[bool, Dict[str, any]]:
+        self.max_clients = max_clients or config.RATE_LIMIT_MAX_CLIENTS
+        self.reap_interval = reap_interval if reap_interval is not None else config.RATE_LIMIT_REAP_INTERVAL
+        self.backend = backend or create_rate_limit_backend(self.max_clients, stripes)
+        self._reaped_clients = 0
+
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_reaper = threading.Event()
+
+    def is_allowed(self, client_id: str, weight: int = 1) -> Tuple[bool, Dict[str, any]]:
         """
         Verifica si una solicitud está permitida
-        
+
+        Args:
+            client_id: Identificador del cliente
+            weight: Cupo que consume la solicitud (un lote cuenta una vez por pregunta)
+
         Returns:
             Tuple[bool, Dict]: (permitido, info_adicional)
         """
-        with self.lock:
-            now = time.time()
-            client_requests = self.requests_log[client_id]
-            
-            # Limpiar solicitudes antiguas (más de 60 segundos)
-            while client_requests and now - client_requests[0] > 60:
-                client_requests.popleft()
-            
-            current_count = len(client_requests)
-            remaining = max(0, self.requests_per_minute - current_count)
-            
-            # Actualizar estadísticas
-            self.stats['total_requests'] += 1
-            self.stats['unique_clients'] = len(self.requests_log)
-            
-            if current_count >= self.requests_per_minute:
-                self.stats['blocked_requests'] += 1
-                
-                # Calcular tiempo hasta la próxima solicitud permitida
-                oldest_request = client_requests[0]
-                reset_time = oldest_request + 60
-                wait_time = max(0, reset_time - now)
-                
-                logger.warning(f"Rate limit exceeded for client {client_id}")
-                
-                return False, {
-                    'reason': 'rate_limit_exceeded',
-                    'current_count': current_count,
-                    'limit': self.requests_per_minute,
-                    'remaining': 0,
-                    'reset_in_seconds': int(wait_time),
-                    'retry_after': int(wait_time)
-                }
-            
-            # Agregar la solicitud actual
-            client_requests.append(now)
-            
-            # Calcular tiempo hasta el reset
-            if current_count > 0:
-                oldest_request = client_requests[0]
-                reset_time = oldest_request + 60
-            else:
-                reset_time = now + 60
-            
-            logger.debug(f"Request allowed for client {client_id}. Remaining: {remaining - 1}")
-            
-            return True, {
-                'current_count': current_count + 1,
-                'limit': self.requests_per_minute,
-                'remaining': remaining - 1,
-                'reset_in_seconds': int(reset_time - now)
+        limit = self.requests_per_minute
+        decision = self.backend.charge(client_id, limit, weight)
+        current_count = math.ceil(decision.count)
+
+        if not decision.allowed:
+            logger.warning(f"Rate limit exceeded for client {client_id}")
+            return False, {
+                'reason': 'rate_limit_exceeded',
+                'current_count': current_count,
+                'limit': limit,
+                'remaining': 0,
+                'reset_in_seconds': int(math.ceil(decision.retry_after)),
+                'retry_after': max(1, int(math.ceil(decision.retry_after)))
             }
-    
+
+        remaining = max(0, limit - current_count)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Request allowed for client %s. Remaining: %s", client_id, remaining)
+
+        return True, {
+            'current_count': current_count,
+            'limit': limit,
+            'remaining': remaining,
+            'reset_in_seconds': int(decision.reset_in)
+        }
+
     def get_client_info(self, client_id: str) -> Dict[str, any]:
         """Obtiene información detallada de un cliente"""
-        with self.lock:
-            now = time.time()
-            client_requests = self.requests_log.get(client_id, deque())
-            
-            # Limpiar solicitudes antiguas
-            while client_requests and now - client_requests[0] > 60:
-                client_requests.popleft()
-            
-            current_count = len(client_requests)
-            remaining = max(0, self.requests_per_minute - current_count)
-            
-            # Calcular estadísticas del cliente
-            if client_requests:
-                first_request = client_requests[0]
-                last_request = client_requests[-1]
-                avg_interval = (last_request - first_request) / max(1, len(client_requests) - 1)
-            else:
-                first_request = last_request = avg_interval = 0
-            
-            return {
-                'client_id': client_id,
-                'current_count': current_count,
-                'limit': self.requests_per_minute,
-                'remaining': remaining,
-                'first_request_time': first_request,
-                'last_request_time': last_request,
-                'average_interval_seconds': round(avg_interval, 2),
-                'is_at_limit': current_count >= self.requests_per_minute
-            }
-    
+        snapshot = self.backend.client_snapshot(client_id)
+
+        if snapshot is not None:
+            current_count = math.ceil(snapshot.count)
+            first_request = snapshot.first_seen
+            last_request = snapshot.last_seen
+            avg_interval = (last_request - first_request) / max(1, snapshot.total - 1)
+        else:
+            current_count = 0
+            first_request = last_request = avg_interval = 0
+
+        return {
+            'client_id': client_id,
+            'current_count': current_count,
+            'limit': self.requests_per_minute,
+            'remaining': max(0, self.requests_per_minute - current_count),
+            'first_request_time': first_request,
+            'last_request_time': last_request,
+            'average_interval_seconds': round(avg_interval, 2),
+            'is_at_limit': current_count >= self.requests_per_minute
+        }
+
     def get_stats(self) -> Dict[str, any]:
-        """Obtiene estadísticas globales del rate limiting"""
-        with self.lock:
-            now = time.time()
-            active_clients = 0
-            total_active_requests = 0
-            
-            # Limpiar y contar clientes activos
-            for client_id in list(self.requests_log.keys()):
-                client_requests = self.requests_log[client_id]
-                
-                # Limpiar solicitudes antiguas
-                while client_requests and now - client_requests[0] > 60:
-                    client_requests.popleft()
-                
-                if client_requests:
-                    active_clients += 1
-                    total_active_requests += len(client_requests)
-                else:
-                    # Eliminar clientes sin solicitudes recientes
-                    del self.requests_log[client_id]
-            
-            block_rate = (self.stats['blocked_requests'] / max(1, self.stats['total_requests'])) * 100
-            
-            return {
-                'total_requests': self.stats['total_requests'],
-                'blocked_requests': self.stats['blocked_requests'],
-                'block_rate_percentage': round(block_rate, 2),
-                'active_clients': active_clients,
-                'total_active_requests': total_active_requests,
-                'requests_per_minute_limit': self.requests_per_minute,
-                'average_requests_per_client': round(total_active_requests / max(1, active_clients), 2)
-            }
-    
+        """Obtiene estadísticas globales del rate limiting (sin recorrer clientes)"""
+        totals = self.backend.stats()
+        total_requests = totals['total_requests']
+        tracked_clients = totals['tracked_clients']
+        total_active_requests = math.ceil(totals['active_requests'])
+        block_rate = (totals['blocked_requests'] / max(1, total_requests)) * 100
+
+        return {
+            'total_requests': total_requests,
+            'blocked_requests': totals['blocked_requests'],
+            'block_rate_percentage': round(block_rate, 2),
+            'active_clients': tracked_clients,
+            'total_active_requests': total_active_requests,
+            'requests_per_minute_limit': self.requests_per_minute,
+            'average_requests_per_client': round(total_active_requests / max(1, tracked_clients), 2),
+            'max_tracked_clients': self.max_clients,
+            'evicted_clients': totals['evicted_clients'],
+            'reaped_clients': self._reaped_clients,
+            'backend': self.backend.name
+        }
+
     def reset_client(self, client_id: str) -> bool:
         """Resetea el contador de un cliente específico"""
-        with self.lock:
-            if client_id in self.requests_log:
-                del self.requests_log[client_id]
-                logger.info(f"Rate limit reset for client {client_id}")
-                return True
-            return False
-    
+        removed = self.backend.reset_client(client_id)
+        if removed:
+            logger.info(f"Rate limit reset for client {client_id}")
+        return removed
+
     def cleanup_old_entries(self) -> int:
-        """Limpia entradas antiguas y retorna el número de clientes limpiados"""
-        with self.lock:
-            now = time.time()
-            cleaned_clients = 0
-            
-            for client_id in list(self.requests_log.keys()):
-                client_requests = self.requests_log[client_id]
-                
-                # Limpiar solicitudes antiguas
-                initial_count = len(client_requests)
-                while client_requests and now - client_requests[0] > 60:
-                    client_requests.popleft()
-                
-                # Si no quedan solicitudes, eliminar el cliente
-                if not client_requests:
-                    del self.requests_log[client_id]
-                    cleaned_clients += 1
-                elif len(client_requests) < initial_count:
-                    logger.debug(f"Cleaned {initial_count - len(client_requests)} old requests for client {client_id}")
-            
-            if cleaned_clients > 0:
-                logger.info(f"Cleaned up {cleaned_clients} inactive clients")
-            
-            return cleaned_clients
+        """Limpia clientes inactivos y retorna el número de clientes limpiados"""
+        cleaned_clients = self.backend.cleanup()
+
+        if cleaned_clients > 0:
+            self._reaped_clients += cleaned_clients
+            logger.info(f"Cleaned up {cleaned_clients} inactive clients")
+
+        return cleaned_clients
+
+    def start_reaper(self) -> None:
+        """Inicia el hilo que descarta clientes inactivos en segundo plano"""
+        if self.reap_interval <= 0 or (self._reaper and self._reaper.is_alive()):
+            return
+
+        self._stop_reaper.clear()
+        self._reaper = threading.Thread(target=self._reap_loop, name="rate-limit-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self) -> None:
+        """Detiene el hilo de limpieza"""
+        self._stop_reaper.set()
+        if self._reaper:
+            self._reaper.join(timeout=1)
+            self._reaper = None
+
+    def _reap_loop(self) -> None:
+        while not self._stop_reaper.wait(self.reap_interval):
+            try:
+                self.cleanup_old_entries()
+            except Exception:
+                logger.exception("Error in rate limit reaper")
 
 # Instancia global del rate limiter
-rate_limit_service = RateLimitService()
\ No newline at end of file
+rate_limit_service = RateLimitService()
+rate_limit_service.start_reaper()
@@ -0,0 +1,171 @@
+"""
+Watchdog de solicitudes lentas para el Bot Asistente de Consultas
+
+``ProcessingPoolService`` solo detecta una consulta colgada al vencer
+``MAX_PROCESSING_TIME`` y la libera sin registrar por qué tardó. Este
+servicio revisa periódicamente las consultas en curso y, cuando una supera
+el presupuesto de latencia, captura la pila de su hilo, la pregunta analizada
+y la duración de cada etapa en un buffer circular acotado que se expone en
+``/api/v1/chat/history``.
+"""
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import logging
+
+from config.settings import config
+from src.services.processing_service import ProcessingPoolService, ProcessingTicket, processing_service
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUESTS_TOTAL = metrics.counter(
+    'chat_slow_requests_total', 'Consultas que superaron el presupuesto de latencia'
+).labels()
+
+
+class SlowRequestWatchdog:
+    """
+    Captura el estado de las consultas que superan ``budget`` segundos
+
+    Revisa el pool cada ``budget / 4`` segundos (la resolución de la
+    detección): una consulta que termina antes de la siguiente revisión no se
+    captura. Cada consulta se captura una vez; al terminar, su entrada se
+    completa con la duración total y las etapas finales.
+    """
+
+    def __init__(self, pool: ProcessingPoolService, budget: float = None,
+                 capacity: int = None, max_depth: int = 64):
+        self.pool = pool
+        self.budget = config.SLOW_REQUEST_SECONDS if budget is None else budget
+        self.interval = max(self.budget / 4, 0.05)
+        self.max_depth = max_depth
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity or config.SLOW_REQUEST_BUFFER_SIZE))
+        # Consultas capturadas que siguen en curso, para completar su entrada al terminar
+        self._pending: Dict[int, Tuple[ProcessingTicket, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {
+            'checks': 0,
+            'captured': 0,
+            'missing_stacks': 0
+        }
+
+    def start(self) -> None:
+        """Inicia el hilo del watchdog (no hace nada si budget <= 0)"""
+        if self.budget <= 0 or (self._thread and self._thread.is_alive()):
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch_loop, name="slow-request-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el hilo del watchdog"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def _watch_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Error in slow request watchdog")
+
+    def check(self, now: Optional[float] = None) -> int:
+        """Revisa el pool una vez; retorna cuántas consultas se capturaron"""
+        now = time.time() if now is None else now
+        tickets = self.pool.in_flight_tickets()
+        captured = 0
+        with self._lock:
+            self.stats['checks'] += 1
+            for ticket in tickets:
+                if ticket.ticket_id in self._pending or ticket.start_time is None:
+                    continue
+                elapsed = now - ticket.start_time
+                if elapsed > self.budget:
+                    self._capture(ticket, elapsed)
+                    captured += 1
+            self._finalize_finished()
+        return captured
+
+    def _capture(self, ticket: ProcessingTicket, elapsed: float) -> None:
+        frame = sys._current_frames().get(ticket.thread_id)
+        stack = self._format_stack(frame) if frame is not None else None
+        if stack is None:
+            self.stats['missing_stacks'] += 1
+
+        thread = next((t for t in threading.enumerate() if t.ident == ticket.thread_id), None)
+        entry = {
+            'query': ticket.query,
+            **ticket.trace.snapshot(),
+            'thread': thread.name if thread else None,
+            'start_time': ticket.start_time,
+            'wait_time': round(ticket.start_time - ticket.enqueued_at, 4),
+            'elapsed_at_capture': round(elapsed, 4),
+            'budget': self.budget,
+            'stack': stack,
+            'completed': None,
+            'duration': None
+        }
+        self.entries.append(entry)
+        self._pending[ticket.ticket_id] = (ticket, entry)
+        self.stats['captured'] += 1
+        SLOW_REQUESTS_TOTAL.inc()
+        logger.warning(
+            f"Consulta lenta ({elapsed:.2f}s > {self.budget}s) en etapa "
+            f"{entry['current_stage'] or 'desconocida'}: '{ticket.query}'"
+        )
+
+    def _format_stack(self, frame) -> List[str]:
+        return [
+            f"{summary.filename}:{summary.lineno} in {summary.name}" + (f": {summary.line}" if summary.line else "")
+            for summary in traceback.extract_stack(frame, limit=self.max_depth)
+        ]
+
+    def _finalize_finished(self) -> None:
+        """Completa las entradas de las consultas capturadas que ya terminaron"""
+        for ticket_id, (ticket, entry) in list(self._pending.items()):
+            if ticket.end_time is None:
+                continue
+            trace = ticket.trace.snapshot()
+            entry['completed'] = ticket.outcome == 'completed'
+            entry['duration'] = round(ticket.end_time - ticket.start_time, 4)
+            entry['stages_ms'] = trace['stages_ms']
+            entry['analyzed'] = entry['analyzed'] or trace['analyzed']
+            del self._pending[ticket_id]
+
+    def get_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Últimas consultas lentas capturadas, de la más antigua a la más reciente"""
+        with self._lock:
+            self._finalize_finished()
+            entries = list(self.entries)[-limit:] if limit > 0 else []
+            return [dict(entry) for entry in entries]
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'budget_seconds': self.budget,
+                'check_interval': self.interval,
+                'buffered': len(self.entries),
+                'capacity': self.entries.maxlen,
+                'in_progress': len(self._pending),
+                'active': bool(self._thread and self._thread.is_alive())
+            }
+
+    def clear(self) -> None:
+        """Vacía el buffer de consultas capturadas"""
+        with self._lock:
+            self.entries.clear()
+            self._pending.clear()
+
+
+# Instancia global del watchdog
+slow_request_watchdog = SlowRequestWatchdog(processing_service)
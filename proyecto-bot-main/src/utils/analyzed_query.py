@@ -0,0 +1,54 @@
+"""
+Consulta analizada una sola vez por solicitud para el Bot Asistente de Consultas
+"""
+from typing import FrozenSet, List, Tuple, Union
+
+from src.utils.text_utils import extract_numbers, filter_terms, normalize_text, stem_token
+
+
+def match_pattern(pattern: str) -> str:
+    """
+    Forma de un patrón de palabras clave comparable con ``AnalyzedQuery.match_text``
+
+    Palabras normalizadas y en singular, rodeadas de espacios: el patrón solo
+    coincide con palabras completas ("oferta" con "ofertas", pero "que tal" no
+    con "que tallas").
+    """
+    return f" {' '.join(stem_token(word) for word in normalize_text(pattern).split())} "
+
+
+class AnalyzedQuery:
+    """
+    Pregunta del usuario con todas sus formas derivadas, calculadas una vez.
+
+    Se construye al inicio de la solicitud y la consumen todas las etapas
+    (intenciones, categorías contextuales, FAQs, productos, cache), de modo que
+    el texto se normaliza y tokeniza exactamente una vez y todas las etapas ven
+    la misma versión sin acentos ni puntuación.
+    """
+
+    __slots__ = ('raw', 'normalized', 'words', 'match_text', 'tokens', 'token_set', 'ngrams', 'numbers')
+
+    def __init__(self, raw: str):
+        self.raw = raw or ""
+        # Minúsculas, sin acentos ni puntuación: es la forma que usan los patrones
+        self.normalized = normalize_text(self.raw)
+        self.words: Tuple[str, ...] = tuple(self.normalized.split())
+        # Texto para los autómatas de palabras clave (ver match_pattern)
+        self.match_text = f" {' '.join(stem_token(word) for word in self.words)} "
+        # Términos sin palabras vacías y en singular, como los de los índices
+        self.tokens: Tuple[str, ...] = tuple(filter_terms(self.words, min_length=1))
+        self.token_set: FrozenSet[str] = frozenset(self.tokens)
+        # Bigramas de palabras ("casaca cuero", "como llego")
+        self.ngrams: Tuple[str, ...] = tuple(
+            f"{first} {second}" for first, second in zip(self.words, self.words[1:])
+        )
+        self.numbers: List[float] = extract_numbers(self.raw)
+
+    @classmethod
+    def of(cls, query: Union[str, 'AnalyzedQuery']) -> 'AnalyzedQuery':
+        """Retorna la consulta tal cual si ya está analizada; si no, la analiza"""
+        return query if isinstance(query, cls) else cls(query)
+
+    def __repr__(self) -> str:
+        return f"AnalyzedQuery({self.normalized!r})"
@@ -0,0 +1,71 @@
+"""
+Respuestas pre-serializadas para el Bot Asistente de Consultas
+"""
+import json
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+
+def encode_json(payload: Any) -> bytes:
+    """Serializa a JSON UTF-8 compacto, tal como se envía al cliente"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class CompiledAnswer:
+    """
+    Respuesta del chat junto con su cuerpo JSON ya codificado.
+
+    Se construye una vez (al cargar el catálogo o al cachear una respuesta) y
+    luego se escribe tal cual. Es inmutable: ``payload`` es de solo lectura y
+    ``to_dict`` entrega una copia independiente, de modo que compartirla desde
+    el cache no filtra estado entre solicitudes. Los campos propios de cada
+    solicitud, como ``rate_limit_info``, se agregan con ``render`` empalmando
+    bytes, sin volver a serializar la respuesta.
+    """
+
+    __slots__ = ('_payload', 'body')
+
+    def __init__(self, payload: Optional[Dict[str, Any]] = None, body: Optional[bytes] = None):
+        if payload is None and body is None:
+            raise ValueError("CompiledAnswer requiere payload o body")
+        self.body = body if body is not None else encode_json(payload)
+        # El payload se reconstruye desde el cuerpo: cambios posteriores al dict original no afectan
+        self._payload = None
+
+    @classmethod
+    def from_body(cls, body: bytes) -> 'CompiledAnswer':
+        """Reconstruye una respuesta desde su cuerpo codificado (el payload se decodifica al usarlo)"""
+        return cls(body=body)
+
+    @property
+    def payload(self) -> Mapping[str, Any]:
+        """Vista de solo lectura del payload (decodificado al primer uso)"""
+        if self._payload is None:
+            self._payload = MappingProxyType(json.loads(self.body.decode('utf-8')))
+        return self._payload
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.payload.get(key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copia profunda y mutable del payload"""
+        return json.loads(self.body.decode('utf-8'))
+
+    def render(self, extra: Optional[Dict[str, Any]] = None) -> bytes:
+        """
+        Cuerpo JSON con ``extra`` agregado al objeto raíz
+
+        Las claves de ``extra`` no deben existir en el payload.
+        """
+        if not extra:
+            return self.body
+        extra_body = encode_json(extra)
+        if self.body == b'{}':
+            return extra_body
+        return b''.join((self.body[:-1], b',', extra_body[1:]))
+
+    def __len__(self) -> int:
+        return len(self.body)
+
+    def __repr__(self) -> str:
+        return f"CompiledAnswer({self.body[:60]!r}{'...' if len(self.body) > 60 else ''})"
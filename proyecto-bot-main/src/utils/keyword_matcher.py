@@ -0,0 +1,118 @@
+"""
+Búsqueda de palabras clave en una sola pasada (autómata Aho-Corasick)
+"""
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """Coincidencia de un patrón dentro de un texto"""
+    label: str
+    pattern: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """
+    Autómata Aho-Corasick construido una sola vez sobre grupos de patrones.
+
+    Cada patrón pertenece a una etiqueta (intención, categoría, FAQ...). Una sola
+    pasada por el texto devuelve todas las coincidencias, incluidas las solapadas,
+    con su posición. El costo de búsqueda depende del largo del texto y del número
+    de coincidencias, no del número de patrones.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        """
+        Args:
+            groups: Diccionario etiqueta -> patrones. El orden de las etiquetas
+                define su prioridad en ``first_label``.
+        """
+        self.labels: Tuple[str, ...] = tuple(groups)
+        self._priority = {label: i for i, label in enumerate(self.labels)}
+
+        # Tablas del autómata: transiciones, enlaces de fallo y salidas por estado
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[Tuple[str, str], ...]] = [()]
+
+        pending_outputs: List[List[Tuple[str, str]]] = [[]]
+        for label, patterns in groups.items():
+            for pattern in patterns:
+                if not pattern:
+                    continue
+                state = 0
+                for char in pattern:
+                    next_state = self._goto[state].get(char)
+                    if next_state is None:
+                        next_state = len(self._goto)
+                        self._goto[state][char] = next_state
+                        self._goto.append({})
+                        self._fail.append(0)
+                        pending_outputs.append([])
+                    state = next_state
+                pending_outputs[state].append((label, pattern))
+
+        self._build_failure_links(pending_outputs)
+
+    def _build_failure_links(self, pending_outputs: List[List[Tuple[str, str]]]) -> None:
+        """Calcula los enlaces de fallo en BFS y hereda las salidas de cada sufijo"""
+        outputs = pending_outputs
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+
+        self._output = [tuple(out) for out in outputs]
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Retorna todas las coincidencias en orden de aparición (por posición final)"""
+        matches = []
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                end = index + 1
+                for label, pattern in output[state]:
+                    matches.append(KeywordMatch(label, pattern, end - len(pattern), end))
+
+        return matches
+
+    def match_labels(self, text: str) -> Dict[str, List[Tuple[int, int]]]:
+        """Agrupa las coincidencias por etiqueta, en orden de prioridad"""
+        grouped: Dict[str, List[Tuple[int, int]]] = {}
+        for match in sorted(self.find_all(text), key=lambda m: (self._priority[m.label], m.start)):
+            grouped.setdefault(match.label, []).append((match.start, match.end))
+        return grouped
+
+    def first_label(self, text: str, labels: Optional[Sequence[str]] = None) -> Optional[str]:
+        """
+        Retorna la etiqueta de mayor prioridad con al menos una coincidencia
+
+        Args:
+            text: Texto donde buscar
+            labels: Restringe la búsqueda a estas etiquetas (opcional)
+        """
+        allowed = set(labels) if labels is not None else None
+        best = None
+        for match in self.find_all(text):
+            if allowed is not None and match.label not in allowed:
+                continue
+            if best is None or self._priority[match.label] < self._priority[best]:
+                best = match.label
+        return best
@@ -0,0 +1,318 @@
+"""
+Métricas en proceso para el Bot Asistente de Consultas
+
+Contadores e histogramas de buckets fijos pensados para el camino caliente:
+cada hilo escribe en su propio fragmento, sin locks ni contención, y la
+lectura suma los fragmentos. ``MetricsRegistry.render_prometheus`` expone
+todo en el formato de texto de Prometheus.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+# Latencias de 50µs a 10s: cubre desde una normalización hasta una espera en cola
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class _ShardedValues:
+    """
+    Vector de valores con un fragmento por hilo
+
+    Solo el hilo dueño escribe su fragmento, así que incrementar no requiere
+    lock. El lock solo se toma al registrar el fragmento de un hilo nuevo y al
+    leer; en ese momento los fragmentos de hilos terminados se acumulan en
+    ``_retired`` para que un servidor con un hilo por solicitud no los acumule.
+    """
+
+    __slots__ = ('_size', '_local', '_shards', '_retired', '_lock')
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[Tuple[threading.Thread, List[float]]] = []
+        self._retired = [0] * size
+        self._lock = threading.Lock()
+
+    def shard(self) -> List[float]:
+        """Fragmento del hilo actual (lo crea en la primera escritura)"""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._size
+            with self._lock:
+                self._retire_dead()
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+            return shard
+
+    def _retire_dead(self) -> None:
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                self._retired = [a + b for a, b in zip(self._retired, shard)]
+        self._shards = alive
+
+    def totals(self) -> List[float]:
+        """Suma de todos los fragmentos"""
+        with self._lock:
+            self._retire_dead()
+            totals = list(self._retired)
+            for _, shard in self._shards:
+                for i, value in enumerate(shard):
+                    totals[i] += value
+        return totals
+
+
+class Counter:
+    """Contador monótono"""
+
+    __slots__ = ('_values',)
+
+    def __init__(self):
+        self._values = _ShardedValues(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._values.shard()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._values.totals()[0]
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: 'Histogram'):
+        self.histogram = histogram
+
+    def __enter__(self) -> '_Timer':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class Histogram:
+    """
+    Histograma de buckets fijos (límite superior inclusivo, como Prometheus)
+
+    Cada fragmento guarda el conteo por bucket (más el de +Inf) y la suma.
+    """
+
+    __slots__ = ('buckets', '_values')
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._values = _ShardedValues(len(self.buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._values.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> _Timer:
+        """Context manager que observa la duración del bloque en segundos"""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[float], float, float]:
+        """(conteos acumulados por bucket incluido +Inf, cantidad, suma)"""
+        totals = self._values.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+    def percentile(self, q: float) -> float:
+        """Estimación del percentil ``q`` (0-100) por interpolación dentro del bucket"""
+        cumulative, count, _ = self.snapshot()
+        if not count:
+            return 0.0
+        rank = q / 100 * count
+        lower_bound, lower_count = 0.0, 0.0
+        for bound, cum in zip(self.buckets, cumulative):
+            if cum >= rank:
+                width = cum - lower_count
+                return lower_bound + (bound - lower_bound) * ((rank - lower_count) / width if width else 1.0)
+            lower_bound, lower_count = bound, cum
+        return self.buckets[-1]
+
+
+class MetricFamily:
+    """Métrica con etiquetas: un hijo (Counter o Histogram) por combinación de valores"""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Sequence[str],
+                 factory: Callable[[], Union[Counter, Histogram]]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._factory = factory
+        self._children: Dict[LabelValues, Union[Counter, Histogram]] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Union[Counter, Histogram]:
+        """Hijo para los valores de etiqueta dados (se crea una sola vez)"""
+        key = tuple(str(value) for value in values)
+        try:
+            return self._children[key]
+        except KeyError:
+            pass
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        with self._lock:
+            return self._children.setdefault(key, self._factory())
+
+    def children(self) -> List[Tuple[LabelValues, Union[Counter, Histogram]]]:
+        with self._lock:
+            return list(self._children.items())
+
+
+# Función que retorna el valor actual o {valores de etiqueta: valor}
+CallbackResult = Union[float, Mapping[LabelValues, float]]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso
+
+    Además de contadores e histogramas propios acepta callbacks que leen el
+    estado de otros servicios (cache, rate limiting, pool) solo al exportar.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._callbacks: Dict[str, Tuple[str, str, Tuple[str, ...], Callable[[], CallbackResult]]] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, family: MetricFamily) -> MetricFamily:
+        with self._lock:
+            existing = self._families.get(family.name)
+            if existing is not None:
+                if existing.kind != family.kind or existing.labelnames != family.labelnames:
+                    raise ValueError(f"Métrica {family.name} ya registrada con otra definición")
+                return existing
+            self._families[family.name] = family
+            return family
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, 'counter', labelnames, Counter))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._register(MetricFamily(name, documentation, 'histogram', labelnames,
+                                           lambda: Histogram(buckets)))
+
+    def register_callback(self, name: str, documentation: str, kind: str,
+                          fn: Callable[[], CallbackResult], labelnames: Sequence[str] = ()) -> None:
+        """Registra (o reemplaza) una métrica calculada al exportar; ``kind`` es 'gauge' o 'counter'"""
+        with self._lock:
+            self._callbacks[name] = (documentation, kind, tuple(labelnames), fn)
+
+    def render_prometheus(self) -> str:
+        """Todas las métricas en el formato de texto de Prometheus (versión 0.0.4)"""
+        with self._lock:
+            families = list(self._families.values())
+            callbacks = list(self._callbacks.items())
+
+        lines: List[str] = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {family.documentation}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for values, child in family.children():
+                if family.kind == 'counter':
+                    lines.append(f"{family.name}{_labels_text(family.labelnames, values)} "
+                                 f"{_format_value(child.value)}")
+                    continue
+                cumulative, count, total = child.snapshot()
+                for bound, cum in zip(child.buckets + (math.inf,), cumulative):
+                    labels = _labels_text(family.labelnames, values, ('le', _format_value(bound)))
+                    lines.append(f"{family.name}_bucket{labels} {_format_value(cum)}")
+                labels = _labels_text(family.labelnames, values)
+                lines.append(f"{family.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{family.name}_count{labels} {_format_value(count)}")
+
+        for name, (documentation, kind, labelnames, fn) in callbacks:
+            try:
+                result = fn()
+            except Exception:
+                # Un servicio con error no debe romper la exportación del resto
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            samples: Iterable[Tuple[LabelValues, float]] = (
+                result.items() if isinstance(result, Mapping) else [((), result)]
+            )
+            for values, value in samples:
+                lines.append(f"{name}{_labels_text(labelnames, values)} {_format_value(value)}")
+
+        return '\n'.join(lines) + '\n'
+
+
+class CounterSet:
+    """
+    Grupo de contadores con nombre, seguro entre hilos
+
+    Reemplaza a los diccionarios de estadísticas incrementados con ``+=``
+    (que pierden cuentas cuando varios hilos escriben a la vez).
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self._counters = {name: Counter() for name in names}
+
+    def inc(self, name: str, amount: float = 1) -> None:
+        self._counters[name].inc(amount)
+
+    def __getitem__(self, name: str) -> float:
+        return self._counters[name].value
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: int(counter.value) for name, counter in self._counters.items()}
+
+
+# Registro global del proceso
+metrics = MetricsRegistry()
+
+STAGE_SECONDS = metrics.histogram(
+    'chat_stage_duration_seconds', 'Duración de cada etapa del pipeline de respuesta', ['stage']
+)
+REQUEST_SECONDS = metrics.histogram(
+    'chat_request_duration_seconds', 'Duración de las solicitudes HTTP hasta enviar las cabeceras',
+    ['endpoint', 'method']
+)
+REQUESTS_TOTAL = metrics.counter(
+    'chat_requests_total', 'Solicitudes HTTP atendidas por endpoint y código de estado', ['endpoint', 'status']
+)
+
+
+def observe_request(endpoint: str, method: str, status: int, seconds: float) -> None:
+    """Registra una solicitud HTTP (lo usan Flask y aiohttp)"""
+    REQUEST_SECONDS.labels(endpoint, method).observe(seconds)
+    REQUESTS_TOTAL.labels(endpoint, status).inc()
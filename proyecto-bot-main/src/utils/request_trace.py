@@ -0,0 +1,103 @@
+"""
+Traza por solicitud de las etapas del pipeline de respuesta
+
+Cada consulta admitida en el pool lleva un ``RequestTrace``. El hilo que la
+procesa lo activa y las etapas del motor (``TracedStage``) acumulan ahí su
+duración además de observarla en el histograma de /metrics, de modo que el
+watchdog de solicitudes lentas puede ver en qué etapa está y cuánto llevó
+cada una. Sin traza activa (aciertos de cache, scripts) el costo es una
+lectura de ``threading.local``.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+from src.utils.analyzed_query import AnalyzedQuery
+from src.utils.metrics import Histogram
+
+_local = threading.local()
+
+
+class RequestTrace:
+    """Duración acumulada por etapa, etapa en curso y pregunta analizada de una solicitud"""
+
+    __slots__ = ('stages', 'current_stage', 'query')
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.current_stage: Optional[str] = None
+        self.query: Optional[AnalyzedQuery] = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.current_stage = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copia legible desde otro hilo (duraciones en milisegundos)"""
+        query = self.query
+        return {
+            'analyzed': {
+                'normalized': query.normalized,
+                'tokens': list(query.tokens),
+                'numbers': list(query.numbers)
+            } if query is not None else None,
+            'current_stage': self.current_stage,
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in dict(self.stages).items()}
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Traza activa en el hilo actual, o None"""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def activate(trace: RequestTrace) -> Iterator[RequestTrace]:
+    """Activa la traza en el hilo actual durante el bloque"""
+    previous = current_trace()
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def note_query(query: AnalyzedQuery) -> None:
+    """Asocia la pregunta analizada a la traza activa (se conserva la primera)"""
+    trace = current_trace()
+    if trace is not None and trace.query is None:
+        trace.query = query
+
+
+class _StageTimer:
+    __slots__ = ('stage', 'trace', 'start')
+
+    def __init__(self, stage: 'TracedStage'):
+        self.stage = stage
+
+    def __enter__(self) -> '_StageTimer':
+        self.trace = current_trace()
+        if self.trace is not None:
+            self.trace.current_stage = self.stage.name
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = time.perf_counter() - self.start
+        self.stage.histogram.observe(elapsed)
+        if self.trace is not None:
+            self.trace.record(self.stage.name, elapsed)
+
+
+class TracedStage:
+    """Etapa con nombre: ``time()`` observa el histograma y acumula en la traza activa"""
+
+    __slots__ = ('name', 'histogram')
+
+    def __init__(self, name: str, histogram: Histogram):
+        self.name = name
+        self.histogram = histogram
+
+    def time(self) -> _StageTimer:
+        return _StageTimer(self)
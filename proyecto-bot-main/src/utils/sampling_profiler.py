@@ -0,0 +1,160 @@
+"""
+Perfilador por muestreo para workers en producción
+
+Toma muestras periódicas de las pilas de todos los hilos con
+``sys._current_frames()`` desde un hilo propio, sin ``sys.setprofile`` ni
+trazas: mientras no hay una sesión activa no tiene ningún costo, y durante la
+sesión los hilos perfilados no ejecutan código extra. El resultado sale en
+formato de pilas colapsadas (``hilo;modulo:funcion;... cantidad``), la entrada
+de ``flamegraph.pl``, speedscope o inferno.
+"""
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Funciones en la cima de la pila que indican un hilo esperando, no trabajando
+IDLE_FUNCTIONS = frozenset({
+    'wait', 'wait_for', '_wait_for_tstate_lock', 'select', 'poll', 'accept', 'readinto'
+})
+
+_DIGITS_RE = re.compile(r'\d+')
+
+
+class ProfilerBusyError(Exception):
+    """Se lanza cuando ya hay una sesión de perfilado en curso"""
+
+
+class ProfileResult:
+    """Muestras agregadas de una sesión"""
+
+    def __init__(self, stacks: Counter, samples: int, duration: float, interval: float):
+        self.stacks = stacks
+        self.samples = samples
+        self.duration = duration
+        self.interval = interval
+
+    def collapsed(self) -> str:
+        """Una línea por pila distinta, de la más frecuente a la menos"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'samples': self.samples,
+            'stacks': len(self.stacks),
+            'duration': round(self.duration, 3),
+            'interval': self.interval
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get('__name__') or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}:{code.co_firstlineno}"
+
+
+def _thread_label(thread: Optional[threading.Thread]) -> str:
+    # Sin números, para que los hilos de un mismo pool se agrupen en el flamegraph
+    return _DIGITS_RE.sub('N', thread.name if thread else 'unknown').replace(';', ':').replace(' ', '_')
+
+
+class SamplingProfiler:
+    """
+    Una sesión de muestreo a la vez por proceso
+
+    ``profile`` bloquea al llamador durante ``duration`` segundos mientras el
+    muestreo corre en un hilo daemon dedicado (que se excluye de las muestras).
+    """
+
+    def __init__(self, max_duration: float = 30.0, min_interval: float = 0.001, max_depth: int = 128):
+        self.max_duration = max_duration
+        self.min_interval = min_interval
+        self.max_depth = max_depth
+        self._session_lock = threading.Lock()
+        self.stats = {
+            'sessions': 0,
+            'rejected_busy': 0,
+            'total_samples': 0
+        }
+
+    @property
+    def active(self) -> bool:
+        return self._session_lock.locked()
+
+    def profile(self, duration: float, interval: float = 0.005, include_idle: bool = False) -> ProfileResult:
+        """
+        Muestrea todos los hilos durante ``duration`` segundos
+
+        Args:
+            duration: Segundos de muestreo (acotado a ``max_duration``)
+            interval: Segundos entre muestras (mínimo ``min_interval``)
+            include_idle: Incluir hilos bloqueados esperando (cola, socket, lock)
+
+        Raises:
+            ProfilerBusyError: si ya hay una sesión en curso
+        """
+        duration = min(max(duration, interval), self.max_duration)
+        interval = max(interval, self.min_interval)
+
+        if not self._session_lock.acquire(blocking=False):
+            self.stats['rejected_busy'] += 1
+            raise ProfilerBusyError("Ya hay una sesión de perfilado en curso")
+
+        try:
+            self.stats['sessions'] += 1
+            logger.info(f"Sampling profiler started: {duration:.1f}s every {interval * 1000:.1f}ms")
+            result: Dict[str, ProfileResult] = {}
+            caller = threading.get_ident()
+            sampler = threading.Thread(
+                target=lambda: result.setdefault('profile', self._sample(duration, interval, include_idle, caller)),
+                name="sampling-profiler", daemon=True
+            )
+            sampler.start()
+            sampler.join()
+            profile = result['profile']
+            self.stats['total_samples'] += profile.samples
+            logger.info(f"Sampling profiler finished: {profile.samples} samples, {len(profile.stacks)} stacks")
+            return profile
+        finally:
+            self._session_lock.release()
+
+    def _sample(self, duration: float, interval: float, include_idle: bool, caller: int) -> ProfileResult:
+        # Ni el muestreador ni el hilo que espera el resultado aportan información
+        own_ids = {threading.get_ident(), caller}
+        stacks: Counter = Counter()
+        samples = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        next_tick = start
+
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            threads = {thread.ident: thread for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in own_ids:
+                    continue
+                if not include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(_thread_label(threads.get(thread_id)))
+                stacks[';'.join(reversed(labels))] += 1
+            samples += 1
+
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.perf_counter()))
+
+        return ProfileResult(stacks, samples, time.perf_counter() - start, interval)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {**self.stats, 'active': self.active, 'max_duration': self.max_duration}
@@ -0,0 +1,270 @@
+"""
+Cache en memoria de archivos estáticos con ETag y variantes comprimidas
+
+Cada archivo se lee, se identifica por el hash de su contenido y se comprime
+(gzip y, si el módulo ``brotli`` está instalado, brotli) una sola vez. Las
+solicitudes condicionales con el ETag vigente se responden con 304 y los
+archivos con huella en el nombre (``app.3f9a1c2b.js``) llevan Cache-Control
+``immutable``. Los archivos se cargan al primer pedido, con límites de tamaño
+por archivo y total; los que no caben se sirven desde disco como antes.
+"""
+import glob
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import stat
+import threading
+import time
+from email.utils import formatdate
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from config.settings import config
+from src.utils.metrics import CounterSet
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él solo se generan variantes gzip
+    brotli = None
+
+# Nombres con huella de contenido: app.3f9a1c2b.js, logo-3f9a1c2b4d.png
+FINGERPRINT_RE = re.compile(r'[.-][0-9a-f]{8,}\.[A-Za-z0-9]+$')
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# El HTML se revalida siempre: su ETag lo hace barato y los cambios se ven de inmediato
+HTML_CACHE_CONTROL = 'no-cache'
+
+COMPRESSIBLE_TYPES = frozenset({
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+    'application/vnd.ms-fontobject', 'font/ttf', 'font/otf'
+})
+
+# Por debajo de este tamaño la compresión no compensa las cabeceras
+MIN_COMPRESS_BYTES = 512
+
+
+class StaticResponse(NamedTuple):
+    """Respuesta lista para escribir: código, cabeceras y cuerpo (vacío en 304)"""
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+
+class StaticAsset:
+    """Contenido de un archivo con su ETag y sus variantes comprimidas"""
+
+    __slots__ = ('path', 'mtime_ns', 'size', 'etag', 'content_type', 'cache_control',
+                 'last_modified', 'variants', 'checked_at')
+
+    def __init__(self, path: str, data: bytes, mtime_ns: int, cache_control: str):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.size = len(data)
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        self.etag = f'"{digest}"'
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type == 'application/javascript':
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+        self.cache_control = cache_control
+        self.last_modified = formatdate(mtime_ns / 1e9, usegmt=True)
+        # Codificación -> (cuerpo, ETag de esa representación)
+        self.variants: Dict[str, tuple] = {'identity': (data, self.etag)}
+        if self._compressible(content_type, data):
+            self._add_variant('gzip', gzip.compress(data, compresslevel=9, mtime=0), digest)
+            if brotli is not None:
+                self._add_variant('br', brotli.compress(data, quality=11), digest)
+        self.checked_at = time.monotonic()
+
+    @staticmethod
+    def _compressible(content_type: str, data: bytes) -> bool:
+        base = content_type.split(';')[0]
+        return len(data) >= MIN_COMPRESS_BYTES and (base.startswith('text/') or base in COMPRESSIBLE_TYPES)
+
+    def _add_variant(self, encoding: str, body: bytes, digest: str) -> None:
+        # Solo vale la pena si ahorra al menos un 10%
+        if len(body) < self.size * 0.9:
+            self.variants[encoding] = (body, f'"{digest}-{encoding}"')
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(len(body) for body, _ in self.variants.values())
+
+    def matches(self, if_none_match: str) -> bool:
+        """True si If-None-Match contiene el ETag de alguna representación"""
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        tags |= {tag[2:] for tag in tags if tag.startswith('W/')}
+        return any(etag in tags for _, etag in self.variants.values())
+
+
+def choose_encoding(accept_encoding: str, available: Iterable[str]) -> str:
+    """Mejor codificación disponible según Accept-Encoding (br, luego gzip)"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name] = quality
+    for encoding in ('br', 'gzip'):
+        if encoding in available and accepted.get(encoding, accepted.get('*', 0.0)) > 0:
+            return encoding
+    return 'identity'
+
+
+class StaticAssetCache:
+    """
+    Archivos de un directorio servidos desde memoria
+
+    ``respond`` retorna None cuando el archivo no existe, es un directorio o
+    supera los límites del cache: el servidor lo sirve desde disco. Un archivo
+    cacheado se vuelve a leer si cambia su mtime o tamaño, revisado como mucho
+    cada ``revalidate_seconds``. Los assets se guardan bajo su ruta real
+    relativa a ``root``, así ``css/./a.css`` o ``css//a.css`` comparten la
+    entrada de ``css/a.css`` en lugar de ocupar otra copia del presupuesto.
+    """
+
+    def __init__(self, root: str, max_file_bytes: int = None, max_total_bytes: int = None,
+                 max_age: int = None, revalidate_seconds: float = None):
+        self.root = os.path.realpath(root)
+        self.max_file_bytes = config.STATIC_MAX_FILE_BYTES if max_file_bytes is None else max_file_bytes
+        self.max_total_bytes = config.STATIC_CACHE_MAX_BYTES if max_total_bytes is None else max_total_bytes
+        self.max_age = config.STATIC_MAX_AGE if max_age is None else max_age
+        self.revalidate_seconds = (config.STATIC_REVALIDATE_SECONDS if revalidate_seconds is None
+                                   else revalidate_seconds)
+        self._assets: Dict[str, StaticAsset] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.stats = CounterSet(['hits', 'not_modified', 'loads', 'reloads', 'uncached'])
+
+    def _resolve(self, relative_path: str) -> Optional[str]:
+        """Ruta absoluta dentro de ``root``, o None si escapa del directorio"""
+        path = os.path.realpath(os.path.join(self.root, relative_path.lstrip('/')))
+        if path != self.root and not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def _cache_control(self, relative_path: str, content_type: str) -> str:
+        if FINGERPRINT_RE.search(os.path.basename(relative_path)):
+            return IMMUTABLE_CACHE_CONTROL
+        if content_type.startswith('text/html'):
+            return HTML_CACHE_CONTROL
+        return f'public, max-age={self.max_age}'
+
+    def get(self, relative_path: str) -> Optional[StaticAsset]:
+        """Asset cacheado (cargándolo o recargándolo si hace falta), o None"""
+        path = self._resolve(relative_path)
+        if path is None:
+            return None
+        key = os.path.relpath(path, self.root).replace(os.sep, '/')
+        asset = self._assets.get(key)
+        now = time.monotonic()
+        if asset is not None and now - asset.checked_at < self.revalidate_seconds:
+            return asset
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self._evict(key)
+            return None
+        if not stat.S_ISREG(st.st_mode) or st.st_size > self.max_file_bytes:
+            self._evict(key)
+            return None
+
+        if asset is not None and asset.mtime_ns == st.st_mtime_ns and asset.size == st.st_size:
+            asset.checked_at = now
+            return asset
+
+        with self._lock:
+            if asset is None and self._total_bytes + st.st_size > self.max_total_bytes:
+                return None
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        content_type = mimetypes.guess_type(path)[0] or ''
+        new_asset = StaticAsset(path, data, st.st_mtime_ns, self._cache_control(key, content_type))
+        with self._lock:
+            previous = self._assets.get(key)
+            if previous is not None:
+                self._total_bytes -= previous.memory_bytes
+                self.stats.inc('reloads')
+            else:
+                self.stats.inc('loads')
+            self._assets[key] = new_asset
+            self._total_bytes += new_asset.memory_bytes
+        return new_asset
+
+    def _evict(self, key: str) -> None:
+        with self._lock:
+            asset = self._assets.pop(key, None)
+            if asset is not None:
+                self._total_bytes -= asset.memory_bytes
+
+    def respond(self, relative_path: str, if_none_match: str = '',
+                accept_encoding: str = '') -> Optional[StaticResponse]:
+        """
+        Respuesta para GET/HEAD del archivo, o None si hay que servirlo desde disco
+
+        Args:
+            relative_path: Ruta del archivo relativa a ``root``
+            if_none_match: Cabecera If-None-Match de la solicitud
+            accept_encoding: Cabecera Accept-Encoding de la solicitud
+        """
+        asset = self.get(relative_path)
+        if asset is None:
+            self.stats.inc('uncached')
+            return None
+
+        encoding = choose_encoding(accept_encoding, asset.variants)
+        body, etag = asset.variants[encoding]
+        headers = {
+            'ETag': etag,
+            'Cache-Control': asset.cache_control,
+            'Last-Modified': asset.last_modified
+        }
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if if_none_match and asset.matches(if_none_match):
+            self.stats.inc('not_modified')
+            return StaticResponse(304, headers, b'')
+
+        self.stats.inc('hits')
+        headers['Content-Type'] = asset.content_type
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return StaticResponse(200, headers, body)
+
+    def preload(self, patterns: Iterable[str]) -> int:
+        """Carga de antemano los archivos que coinciden con los patrones glob; retorna cuántos quedaron en cache"""
+        loaded = 0
+        for pattern in patterns:
+            for relative_path in sorted(glob.glob(pattern, root_dir=self.root)):
+                if self.get(relative_path.replace(os.sep, '/')) is not None:
+                    loaded += 1
+        logger.info(f"Static assets preloaded: {loaded} files, {self._total_bytes} bytes")
+        return loaded
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self.stats.as_dict(),
+                'assets': len(self._assets),
+                'memory_bytes': self._total_bytes,
+                'max_total_bytes': self.max_total_bytes,
+                'brotli': brotli is not None
+            }
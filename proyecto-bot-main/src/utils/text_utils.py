@@ -3,14 +3,97 @@ Utilidades para procesamiento de texto en el Bot Asistente de Consultas
 """
 import re
 import difflib
-from typing import List, Set
+from functools import lru_cache
+from typing import Dict, Iterable, List, Set
 import unicodedata
 
 
+# Palabras vacías en español
+STOP_WORDS = frozenset({
+    'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le',
+    'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las', 'una', 'como',
+    'pero', 'sus', 'me', 'hasta', 'hay', 'donde', 'han', 'quien', 'están', 'estado',
+    'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra', 'otros',
+    'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí', 'antes', 'algunos', 'qué', 'unos',
+    'yo', 'otro', 'otras', 'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 'quienes',
+    'nada', 'muchos', 'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 'nosotros'
+})
+
+
+def _normalize_slow(text: str) -> str:
+    """Normalización de referencia, carácter por carácter; sirve de respaldo para cualquier Unicode"""
+    # Convertir a minúsculas
+    text = text.lower().strip()
+    
+    # Normalizar caracteres Unicode (quitar acentos)
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    
+    # Remover caracteres especiales excepto espacios y números
+    text = _SPECIAL_CHARS_RE.sub('', text)
+    
+    # Normalizar espacios múltiples
+    text = _WHITESPACE_RE.sub(' ', text)
+    
+    return text.strip()
+
+
+_SPECIAL_CHARS_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Rangos que cubre la tabla de traducción: Latin-1, Latin Extended A/B y puntuación general
+# (comillas tipográficas, guiones, espacios especiales). Ahí la normalización de referencia
+# es carácter por carácter, así que se puede precalcular; el resto usa _normalize_slow.
+_TABLE_RANGES = ((0x0000, 0x024F), (0x2000, 0x206F))
+_UNSUPPORTED_RE = re.compile('[^' + ''.join(f'\\u{lo:04x}-\\u{hi:04x}' for lo, hi in _TABLE_RANGES) + ']')
+
+
+def _build_translation_table() -> Dict[int, str]:
+    table = {}
+    for lo, hi in _TABLE_RANGES:
+        for code in range(lo, hi + 1):
+            char = chr(code)
+            decomposed = unicodedata.normalize('NFD', char.lower())
+            mapped = _SPECIAL_CHARS_RE.sub('', ''.join(c for c in decomposed if unicodedata.category(c) != 'Mn'))
+            if mapped != char:
+                table[code] = mapped
+    return table
+
+
+# Minúsculas, sin acentos y sin signos de puntuación en una sola pasada de str.translate
+_TRANSLATION_TABLE = _build_translation_table()
+# Para normalize_many: igual, pero conserva el separador entre textos
+_BATCH_SEPARATOR = '\x00'
+_BATCH_TRANSLATION_TABLE = {**_TRANSLATION_TABLE, ord(_BATCH_SEPARATOR): _BATCH_SEPARATOR}
+
+# Para textos ASCII basta bytes.translate, bastante más rápido que str.translate con un dict
+_ASCII_TABLE = bytes(ord(_TRANSLATION_TABLE.get(code, chr(code)) or ' ') for code in range(128)) + bytes(range(128, 256))
+_ASCII_DELETE = bytes(code for code in range(128) if _TRANSLATION_TABLE.get(code) == '')
+
+# Los textos cortos (preguntas, palabras clave, opciones) se repiten mucho; los largos no se memorizan
+NORMALIZE_CACHE_SIZE = 4096
+NORMALIZE_CACHE_MAX_LENGTH = 256
+
+
+def _normalize(text: str) -> str:
+    if text.isascii():
+        return ' '.join(text.encode('ascii').translate(_ASCII_TABLE, _ASCII_DELETE).decode('ascii').split())
+    if _UNSUPPORTED_RE.search(text):
+        return _normalize_slow(text)
+    # str.split() sin argumentos corta en los mismos espacios que \s y descarta los extremos
+    return ' '.join(text.translate(_TRANSLATION_TABLE).split())
+
+
+_normalize_cached = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(_normalize)
+
+
 def normalize_text(text: str) -> str:
     """
     Normaliza texto para mejor comparación y búsqueda
     
+    Minúsculas, sin acentos, sin signos de puntuación y con los espacios
+    colapsados. Los textos cortos se memorizan en un LRU acotado.
+    
     Args:
         text: Texto a normalizar
         
@@ -20,20 +103,94 @@ def normalize_text(text: str) -> str:
     if not text:
         return ""
     
-    # Convertir a minúsculas
-    text = text.lower().strip()
+    if len(text) <= NORMALIZE_CACHE_MAX_LENGTH:
+        return _normalize_cached(text)
+    return _normalize(text)
+
+
+def normalize_many(texts: Iterable[str]) -> List[str]:
+    """
+    Normaliza varios textos de una vez
     
-    # Normalizar caracteres Unicode (quitar acentos)
-    text = unicodedata.normalize('NFD', text)
-    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn')
+    Traduce todos los textos en una sola llamada a ``str.translate`` y luego
+    los separa; equivale a ``[normalize_text(t) for t in texts]``.
     
-    # Remover caracteres especiales excepto espacios y números
-    text = re.sub(r'[^\w\s]', '', text)
+    Args:
+        texts: Textos a normalizar
+        
+    Returns:
+        Lista de textos normalizados, en el mismo orden
+    """
+    texts = [text or "" for text in texts]
+    if not texts:
+        return []
     
-    # Normalizar espacios múltiples
-    text = re.sub(r'\s+', ' ', text)
+    joined = _BATCH_SEPARATOR.join(texts)
+    if joined.count(_BATCH_SEPARATOR) != len(texts) - 1 or _UNSUPPORTED_RE.search(joined):
+        return [normalize_text(text) for text in texts]
     
-    return text.strip()
+    return [' '.join(part.split()) for part in joined.translate(_BATCH_TRANSLATION_TABLE).split(_BATCH_SEPARATOR)]
+
+
+def normalize_cache_info():
+    """Estadísticas del memo de normalize_text (hits, misses, maxsize, currsize)"""
+    return _normalize_cached.cache_info()
+
+
+def stem_token(word: str) -> str:
+    """
+    Reduce una palabra normalizada a una raíz simple (singular)
+    
+    Args:
+        word: Palabra ya normalizada
+        
+    Returns:
+        Palabra sin la terminación de plural
+    """
+    # Singular y plural deben llegar a la misma raíz aunque el plural en -es
+    # sea ambiguo ("colores" -> "color" pero "disponibles" -> "disponible"):
+    # se quita la "s" y luego la "e" final tras estas consonantes, en ambas formas.
+    # "devoluciones"/"devolucion" -> "devolucion", "talles"/"talle" -> "tall"
+    if len(word) > 3 and word.endswith('s'):
+        word = word[:-1]
+    if len(word) > 4 and word.endswith('e') and word[-2] in 'lnrdjz':
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str, min_length: int = 3, stem: bool = True) -> List[str]:
+    """
+    Divide un texto en términos normalizados para indexación y búsqueda
+    
+    Args:
+        text: Texto a tokenizar
+        min_length: Longitud mínima de los términos
+        stem: Si se reduce cada término a su raíz simple
+        
+    Returns:
+        Lista de términos (sin palabras vacías), en orden de aparición
+    """
+    return filter_terms(normalize_text(text).split(), min_length, stem)
+
+
+def filter_terms(words: Iterable[str], min_length: int = 3, stem: bool = True) -> List[str]:
+    """
+    Filtra palabras ya normalizadas igual que ``tokenize``
+    
+    Args:
+        words: Palabras normalizadas
+        min_length: Longitud mínima de los términos
+        stem: Si se reduce cada término a su raíz simple
+        
+    Returns:
+        Lista de términos (sin palabras vacías), en orden de aparición
+    """
+    terms = []
+    for word in words:
+        if len(word) < min_length or word in STOP_WORDS:
+            continue
+        terms.append(stem_token(word) if stem else word)
+    return terms
 
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
@@ -100,24 +257,13 @@ def extract_keywords(text: str, min_length: int = 3) -> List[str]:
     Returns:
         Lista de palabras clave
     """
-    # Palabras vacías en español
-    stop_words = {
-        'el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le',
-        'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las', 'una', 'como',
-        'pero', 'sus', 'me', 'hasta', 'hay', 'donde', 'han', 'quien', 'están', 'estado',
-        'desde', 'todo', 'nos', 'durante', 'todos', 'uno', 'les', 'ni', 'contra', 'otros',
-        'ese', 'eso', 'ante', 'ellos', 'e', 'esto', 'mí', 'antes', 'algunos', 'qué', 'unos',
-        'yo', 'otro', 'otras', 'otra', 'él', 'tanto', 'esa', 'estos', 'mucho', 'quienes',
-        'nada', 'muchos', 'cual', 'poco', 'ella', 'estar', 'estas', 'algunas', 'algo', 'nosotros'
-    }
-    
     normalized_text = normalize_text(text)
     words = normalized_text.split()
     
     keywords = []
     for word in words:
         if (len(word) >= min_length and 
-            word not in stop_words and 
+            word not in STOP_WORDS and 
             not word.isdigit()):
             keywords.append(word)
     
@@ -327,8 +473,7 @@ def fuzzy_match(query: str, choices: List[str], threshold: float = 0.6) -> List[
     matches = []
     normalized_query = normalize_text(query)
     
-    for choice in choices:
-        normalized_choice = normalize_text(choice)
+    for choice, normalized_choice in zip(choices, normalize_many(choices)):
         similarity = calculate_text_similarity(normalized_query, normalized_choice)
         
         if similarity >= threshold:
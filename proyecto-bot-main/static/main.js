@@ -13,10 +13,12 @@ const CONFIG = {
         NETWORK: "Parece que hay un problema de conexión. Por favor, verifica tu internet y vuelve a intentar.",
         SERVER: "El servidor está teniendo problemas. Por favor, intenta de nuevo en unos momentos.",
         GENERAL: "Ocurrió un error inesperado. Por favor, intenta de nuevo.",
-        RATE_LIMIT: "Has enviado muchas consultas. Espera un momento antes de intentar de nuevo."
+        RATE_LIMIT: "Has enviado muchas consultas. Espera un momento antes de intentar de nuevo.",
+        BUSY: "Estoy atendiendo muchas consultas en este momento. Intenta de nuevo en unos segundos."
     },
     API_ENDPOINTS: {
         ASK: '/api/v1/chat/ask',
+        ASK_STREAM: '/api/v1/chat/ask/stream',
         STATUS: '/api/v1/chat/status',
         SUGGESTIONS: '/api/v1/chat/suggestions',
         HEALTH: '/health'
@@ -55,6 +57,24 @@ const utils = {
             .replace(/\*(.*?)\*/g, '<em>$1</em>')
             .replace(/S\/(\d+(\.\d{2})?)/g, '<span class="price">S/$1</span>')
             .replace(/\n/g, '<br>');
+    },
+
+    parseSSEEvent(raw) {
+        const event = { type: 'message', data: null };
+        const data = [];
+        for (const line of raw.split('\n')) {
+            if (line.startsWith('event:')) {
+                event.type = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data.push(line.slice(5).replace(/^ /, ''));
+            }
+        }
+        try {
+            event.data = JSON.parse(data.join('\n'));
+        } catch (e) {
+            event.data = {};
+        }
+        return event;
     }
 };
 
@@ -346,7 +366,16 @@ class ChatAssistant {
         this.abortController = new AbortController();
 
         try {
-            const response = await this.askQuestion(question, this.abortController.signal);
+            // El texto se muestra a medida que llega; el indicador se quita con el primer trozo
+            let contentDiv = null;
+            const response = await this.askQuestionStream(question, this.abortController.signal, (text) => {
+                if (!contentDiv) {
+                    this.hideTypingIndicator();
+                    contentDiv = this.createBotMessage();
+                }
+                contentDiv.textContent += text;
+                this.scrollToBottom();
+            });
             this.hideTypingIndicator();
             
             if (response.canceled) {
@@ -357,7 +386,9 @@ class ChatAssistant {
                 throw new Error(response.error);
             }
 
-            await this.addBotMessageWithAnimation(response.answer);
+            if (!contentDiv) {
+                await this.addBotMessageWithAnimation(response.answer);
+            }
             
             // Actualizar sugerencias contextuales
             const contextualSuggestions = this.suggestionsManager.updateContextual(response.answer);
@@ -412,6 +443,9 @@ class ChatAssistant {
                 if (response.status === 429) {
                     throw new Error(CONFIG.ERROR_MESSAGES.RATE_LIMIT);
                 }
+                if (response.status === 503) {
+                    throw new Error(CONFIG.ERROR_MESSAGES.BUSY);
+                }
                 throw new Error('Error en la respuesta del servidor');
             }
 
@@ -432,6 +466,83 @@ class ChatAssistant {
         }
     }
 
+    async askQuestionStream(question, signal, onChunk) {
+        // Sin ReadableStream no se puede leer por partes: usar el endpoint normal
+        if (!window.ReadableStream || !window.TextDecoder) {
+            return this.askQuestion(question, signal);
+        }
+
+        const startTime = performance.now();
+        
+        try {
+            const response = await fetch(CONFIG.API_ENDPOINTS.ASK_STREAM, {
+                method: 'POST',
+                headers: { 
+                    'Content-Type': 'application/json',
+                    'Accept': 'text/event-stream',
+                    'X-Session-ID': this.sessionId
+                },
+                body: JSON.stringify({ 
+                    question,
+                    session_id: this.sessionId,
+                    timestamp: Date.now()
+                }),
+                signal: signal
+            });
+
+            if (!response.ok) {
+                if (response.status === 429) {
+                    throw new Error(CONFIG.ERROR_MESSAGES.RATE_LIMIT);
+                }
+                if (response.status === 503) {
+                    throw new Error(CONFIG.ERROR_MESSAGES.BUSY);
+                }
+                throw new Error('Error en la respuesta del servidor');
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = null;
+
+            while (result === null) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // Los eventos SSE terminan en una línea vacía
+                let boundary;
+                while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                    const event = utils.parseSSEEvent(buffer.slice(0, boundary));
+                    buffer = buffer.slice(boundary + 2);
+
+                    if (event.type === 'chunk') {
+                        onChunk(event.data.text);
+                    } else if (event.type === 'done' || event.type === 'error') {
+                        result = event.data;
+                    }
+                }
+            }
+
+            if (result === null) {
+                throw new Error('Respuesta incompleta del servidor');
+            }
+            
+            // Métricas de performance
+            const responseTime = performance.now() - startTime;
+            this.updatePerformanceMetrics(responseTime, false);
+            this.connectionMonitor.markHealthy();
+            
+            return result;
+            
+        } catch (error) {
+            const responseTime = performance.now() - startTime;
+            this.updatePerformanceMetrics(responseTime, true);
+            this.connectionMonitor.markUnhealthy();
+            throw error;
+        }
+    }
+
     async cancelCurrentRequest() {
         if (this.abortController) {
             this.abortController.abort();
@@ -480,7 +591,7 @@ class ChatAssistant {
         this.scrollToBottom();
     }
 
-    async addBotMessageWithAnimation(text, isError = false) {
+    createBotMessage(isError = false) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message bot${isError ? ' error' : ''}`;
         
@@ -499,6 +610,12 @@ class ChatAssistant {
             messageDiv.style.transform = 'translateY(0)';
         });
         
+        return contentDiv;
+    }
+
+    async addBotMessageWithAnimation(text, isError = false) {
+        const contentDiv = this.createBotMessage(isError);
+        
         // Esperar animación de entrada
         await new Promise(resolve => setTimeout(resolve, 300));
         